@@ -1,12 +1,378 @@
 import os
+import io
 import csv
-from collections import Counter
+import json
+import math
+import base64
+import hashlib
+import argparse
 from config import Config
 
+TRUE_VALUES = ("true", "1")
+# the only columns the metrics need; everything else is skipped while parsing
+METRIC_COLUMNS = ["timestamp", "event", "user_email", "recommended_picked"]
+
+
+def activity_path():
+    return os.path.join(Config.LOG_DIR, "activity.csv")
+
+
+def state_path():
+    return os.path.join(Config.LOG_DIR, "activity_state.json")
+
+
+class ActivityStats:
+    """Running totals for the activity metrics; fed one event at a time or in bulk."""
+
+    def __init__(self):
+        self.total_picks = 0
+        self.recommended_picks = 0
+        self.total_logins = 0
+        self.login_users = set()
+
+    def add(self, event, user_email, recommended_picked):
+        if event == "PICK_OPTION":
+            self.total_picks += 1
+            if recommended_picked.lower() in TRUE_VALUES:
+                self.recommended_picks += 1
+        elif event == "LOGIN":
+            self.total_logins += 1
+            self.login_users.add(user_email)
+
+    def merge_counts(self, total_picks, recommended_picks, total_logins, users):
+        self.total_picks += int(total_picks)
+        self.recommended_picks += int(recommended_picks)
+        self.total_logins += int(total_logins)
+        self.login_users.update(users)
+
+    def report(self):
+        print("Total PICK_OPTION events:", self.total_picks)
+        print("Picked recommended option:", self.recommended_picks)
+        print("Did not pick recommended option:", self.total_picks - self.recommended_picks)
+        if self.total_picks:
+            print(f"Percentage picked recommended: {self.recommended_picks/self.total_picks*100:.2f}%")
+        print("Total logins recorded:", self.total_logins)
+        print("Unique users who logged in:", len(self.login_users))
+
+
+def stream_stats(path, stats=None):
+    """One pass over the CSV with csv.reader; memory is O(unique login users)."""
+    stats = stats or ActivityStats()
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return stats
+        i_event = header.index("event")
+        i_user = header.index("user_email")
+        i_picked = header.index("recommended_picked")
+        width = max(i_event, i_user, i_picked) + 1
+        add = stats.add
+        for r in reader:
+            if len(r) >= width:
+                add(r[i_event], r[i_user], r[i_picked])
+    return stats
+
+
+def _aggregate_frame(df, stats):
+    events = df["event"]
+    picks = df.loc[events == "PICK_OPTION", "recommended_picked"]
+    logins = df.loc[events == "LOGIN", "user_email"]
+    stats.merge_counts(
+        len(picks),
+        picks.str.lower().isin(TRUE_VALUES).sum(),
+        len(logins),
+        logins.unique(),
+    )
+
+
+def pandas_stats(path, chunksize=1_000_000, stats=None):
+    """Chunked pandas pass reading only the metric columns as strings."""
+    import pandas as pd
+    stats = stats or ActivityStats()
+    reader = pd.read_csv(
+        path,
+        usecols=["event", "user_email", "recommended_picked"],
+        dtype="string",
+        keep_default_na=False,
+        chunksize=chunksize,
+    )
+    for chunk in reader:
+        _aggregate_frame(chunk, stats)
+    return stats
+
+
+def compact_to_parquet(path, out_dir, chunksize=1_000_000):
+    """
+    Roll activity.csv into date-partitioned Parquet files
+    (out_dir/date=YYYY-MM-DD/part-NNNNN.parquet) holding the metric columns.
+    Needs pyarrow.
+    """
+    import pandas as pd
+    written = 0
+    reader = pd.read_csv(path, usecols=METRIC_COLUMNS, dtype="string", keep_default_na=False, chunksize=chunksize)
+    for part, chunk in enumerate(reader):
+        chunk["event"] = chunk["event"].astype("category")
+        dates = chunk["timestamp"].str.slice(0, 10)
+        for date, frame in chunk.groupby(dates, sort=False):
+            partition = os.path.join(out_dir, f"date={date}")
+            os.makedirs(partition, exist_ok=True)
+            frame.to_parquet(os.path.join(partition, f"part-{part:05d}.parquet"), index=False)
+            written += len(frame)
+    return written
+
+
+def parquet_stats(out_dir, stats=None):
+    """Metrics over a compacted directory, reading only the needed columns."""
+    import pandas as pd
+    stats = stats or ActivityStats()
+    for root, _, files in os.walk(out_dir):
+        for name in sorted(files):
+            if name.endswith(".parquet"):
+                df = pd.read_parquet(os.path.join(root, name), columns=["event", "user_email", "recommended_picked"])
+                df["event"] = df["event"].astype("string")
+                _aggregate_frame(df, stats)
+    return stats
+
+
+class HyperLogLog:
+    """Fixed-size distinct counter (~1.04/sqrt(2**p) relative error)."""
+
+    def __init__(self, p=14, registers=None):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.m)
+
+    def add(self, value):
+        h = int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+        idx = h >> (64 - self.p)
+        rest = h & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def merge(self, other):
+        for i, r in enumerate(other.registers):
+            if r > self.registers[i]:
+                self.registers[i] = r
+
+    def count(self):
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            return round(m * math.log(m / zeros))
+        return round(estimate)
+
+    def to_json(self):
+        return {"p": self.p, "registers": base64.b64encode(bytes(self.registers)).decode("ascii")}
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data["p"], base64.b64decode(data["registers"]))
+
+
+class IncrementalAnalyzer:
+    """
+    Checkpointed metrics over the append-only activity.csv.
+
+    The state file stores the byte offset reached, the file identity (device,
+    inode and a hash of its first line) and the running aggregates: totals,
+    a HyperLogLog of login users, and per-hour event counts with a per-day
+    HyperLogLog of login users. A rerun reads only the bytes appended since
+    the last checkpoint. If the file was rotated, the rest of the old file is
+    finished first when it can still be found next to the new one (same
+    inode). If it was truncated or replaced, reading restarts at byte 0 of
+    the new file and the aggregates carry over.
+    """
+
+    STATE_VERSION = 1
+    READ_SIZE = 8 * 1024 * 1024
+    DAY_HLL_P = 10
+
+    def __init__(self, state=None):
+        state = state or {}
+        self.file = state.get("file")
+        self.offset = state.get("offset", 0)
+        self.header = state.get("header")
+        totals = state.get("totals", {})
+        self.total_picks = totals.get("picks", 0)
+        self.recommended_picks = totals.get("recommended_picks", 0)
+        self.total_logins = totals.get("logins", 0)
+        self.rows = totals.get("rows", 0)
+        self.users = HyperLogLog.from_json(state["users"]) if "users" in state else HyperLogLog()
+        self.hourly = state.get("hourly", {})
+        self.daily_users = {day: HyperLogLog.from_json(h) for day, h in state.get("daily_users", {}).items()}
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return cls()
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("version") != cls.STATE_VERSION:
+            return cls()
+        return cls(state)
+
+    def save(self, path):
+        state = {
+            "version": self.STATE_VERSION,
+            "file": self.file,
+            "offset": self.offset,
+            "header": self.header,
+            "totals": {
+                "picks": self.total_picks,
+                "recommended_picks": self.recommended_picks,
+                "logins": self.total_logins,
+                "rows": self.rows,
+            },
+            "users": self.users.to_json(),
+            "hourly": self.hourly,
+            "daily_users": {day: h.to_json() for day, h in self.daily_users.items()},
+        }
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _identity(path):
+        st = os.stat(path)
+        with open(path, "rb") as f:
+            first_line = f.readline()
+        return {"dev": st.st_dev, "inode": st.st_ino, "head": hashlib.sha1(first_line).hexdigest(), "size": st.st_size}
+
+    def _find_rotated(self, path):
+        # e.g. activity.csv.1 left behind by logrotate/RotatingFileHandler
+        directory = os.path.dirname(os.path.abspath(path))
+        for name in os.listdir(directory):
+            candidate = os.path.join(directory, name)
+            try:
+                st = os.stat(candidate)
+            except OSError:
+                continue
+            if st.st_ino == self.file["inode"] and st.st_dev == self.file["dev"]:
+                return candidate
+        return None
+
+    def update(self, path):
+        """Consume everything appended to path since the last checkpoint; returns rows read."""
+        identity = self._identity(path)
+        same_file = (
+            self.file is not None
+            and identity["inode"] == self.file["inode"]
+            and identity["dev"] == self.file["dev"]
+            and identity["head"] == self.file["head"]
+            and identity["size"] >= self.offset
+        )
+        consumed = 0
+        if not same_file:
+            if self.file is not None and identity["inode"] != self.file["inode"]:
+                rotated = self._find_rotated(path)
+                if rotated is not None:
+                    consumed += self._consume(rotated, self.offset)
+            self.offset = 0
+        self.file = identity
+        self.offset, rows = self._consume_with_offset(path, self.offset)
+        return consumed + rows
+
+    def _consume(self, path, offset):
+        _, rows = self._consume_with_offset(path, offset)
+        return rows
+
+    def _consume_with_offset(self, path, offset):
+        rows = 0
+        with open(path, "rb") as f:
+            if offset == 0:
+                first = f.readline()
+                if not first.endswith(b"\n"):
+                    return 0, 0
+                self.header = next(csv.reader([first.decode("utf-8")]))
+                offset = f.tell()
+            f.seek(offset)
+            pending = b""
+            while True:
+                chunk = f.read(self.READ_SIZE)
+                if not chunk:
+                    break
+                data = pending + chunk
+                cut = data.rfind(b"\n") + 1
+                pending = data[cut:]
+                if cut:
+                    rows += self._consume_text(data[:cut].decode("utf-8"))
+                    offset += cut
+        # an unterminated last line is left for the next run
+        return offset, rows
+
+    def _consume_text(self, text):
+        header = self.header
+        i_ts = header.index("timestamp")
+        i_event = header.index("event")
+        i_user = header.index("user_email")
+        i_picked = header.index("recommended_picked")
+        width = max(i_ts, i_event, i_user, i_picked) + 1
+        hourly = self.hourly
+        rows = 0
+        for r in csv.reader(io.StringIO(text)):
+            if len(r) < width:
+                continue
+            rows += 1
+            event = r[i_event]
+            hour = r[i_ts][:13]
+            bucket = hourly.get(hour)
+            if bucket is None:
+                bucket = hourly[hour] = {}
+            bucket[event] = bucket.get(event, 0) + 1
+            if event == "PICK_OPTION":
+                self.total_picks += 1
+                if r[i_picked].lower() in TRUE_VALUES:
+                    self.recommended_picks += 1
+                    bucket["PICK_RECOMMENDED"] = bucket.get("PICK_RECOMMENDED", 0) + 1
+            elif event == "LOGIN":
+                self.total_logins += 1
+                user = r[i_user]
+                self.users.add(user)
+                day = hour[:10]
+                day_users = self.daily_users.get(day)
+                if day_users is None:
+                    day_users = self.daily_users[day] = HyperLogLog(self.DAY_HLL_P)
+                day_users.add(user)
+        self.rows += rows
+        return rows
+
+    def rollup(self, period="hour"):
+        """{period: {event: count}} with period "hour" (YYYY-MM-DDTHH) or "day" (YYYY-MM-DD)."""
+        if period == "hour":
+            return {k: dict(v) for k, v in sorted(self.hourly.items())}
+        daily = {}
+        for hour, counts in self.hourly.items():
+            bucket = daily.setdefault(hour[:10], {})
+            for event, n in counts.items():
+                bucket[event] = bucket.get(event, 0) + n
+        for day, users in self.daily_users.items():
+            daily.setdefault(day, {})["UNIQUE_LOGIN_USERS"] = users.count()
+        return dict(sorted(daily.items()))
+
+    def report(self):
+        print("Total PICK_OPTION events:", self.total_picks)
+        print("Picked recommended option:", self.recommended_picks)
+        print("Did not pick recommended option:", self.total_picks - self.recommended_picks)
+        if self.total_picks:
+            print(f"Percentage picked recommended: {self.recommended_picks/self.total_picks*100:.2f}%")
+        print("Total logins recorded:", self.total_logins)
+        print("Unique users who logged in (approx.):", self.users.count())
+
+
+def print_rollup(rollup):
+    events = sorted({e for counts in rollup.values() for e in counts})
+    print("period".ljust(14) + "".join(e.rjust(20) for e in events))
+    for period, counts in rollup.items():
+        print(period.ljust(14) + "".join(str(counts.get(e, 0)).rjust(20) for e in events))
+
+
 def load_activity():
-    path = os.path.join(Config().LOG_DIR, "activity.csv") if hasattr(Config, "__call__") else Config.LOG_DIR
-    import config as cfg
-    activity_csv = os.path.join(cfg.BASE_DIR, "logs", "activity.csv")
+    activity_csv = activity_path()
     if not os.path.exists(activity_csv):
         print("No activity log found at", activity_csv)
         return []
@@ -17,27 +383,67 @@ def load_activity():
             rows.append(r)
     return rows
 
+def _stats_from_rows(rows):
+    stats = ActivityStats()
+    for r in rows:
+        stats.add(r.get("event"), r.get("user_email"), r.get("recommended_picked") or "")
+    return stats
+
 def analyze_recommended_pick(rows):
-    picks = [r for r in rows if r.get("event")=="PICK_OPTION"]
-    total_picks = len(picks)
-    recommended_true = sum(1 for r in picks if r.get("recommended_picked","").lower() in ("true","1","True","TRUE"))
-    recommended_false = total_picks - recommended_true
-    print("Total PICK_OPTION events:", total_picks)
-    print("Picked recommended option:", recommended_true)
-    print("Did not pick recommended option:", recommended_false)
-    if total_picks:
-        print(f"Percentage picked recommended: {recommended_true/total_picks*100:.2f}%")
+    stats = _stats_from_rows(rows)
+    print("Total PICK_OPTION events:", stats.total_picks)
+    print("Picked recommended option:", stats.recommended_picks)
+    print("Did not pick recommended option:", stats.total_picks - stats.recommended_picks)
+    if stats.total_picks:
+        print(f"Percentage picked recommended: {stats.recommended_picks/stats.total_picks*100:.2f}%")
 
 def analyze_logins(rows):
-    logins = [r for r in rows if r.get("event")=="LOGIN"]
-    print("Total logins recorded:", len(logins))
-    # unique users who logged in
-    users = set(r.get("user_email") for r in logins)
-    print("Unique users who logged in:", len(users))
+    stats = _stats_from_rows(rows)
+    print("Total logins recorded:", stats.total_logins)
+    print("Unique users who logged in:", len(stats.login_users))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize logs/activity.csv")
+    parser.add_argument("--path", default=activity_path(), help="activity CSV to read")
+    parser.add_argument("--engine", choices=("stream", "pandas", "parquet"), default="stream",
+                        help="stream: single csv pass; pandas: chunked, column-pruned; parquet: read a compacted directory")
+    parser.add_argument("--parquet-dir", default=os.path.join(Config.LOG_DIR, "activity_parquet"))
+    parser.add_argument("--compact", action="store_true", help="write the CSV into --parquet-dir before analyzing")
+    parser.add_argument("--chunksize", type=int, default=1_000_000)
+    parser.add_argument("--incremental", action="store_true", help="only read rows appended since the last checkpoint")
+    parser.add_argument("--state", default=state_path(), help="checkpoint file for --incremental")
+    parser.add_argument("--reset", action="store_true", help="discard the checkpoint and start from byte 0")
+    parser.add_argument("--rollup", choices=("hour", "day"), help="print per-hour or per-day counts (--incremental)")
+    args = parser.parse_args(argv)
+
+    if args.incremental or args.rollup:
+        analyzer = IncrementalAnalyzer() if args.reset else IncrementalAnalyzer.load(args.state)
+        if os.path.exists(args.path):
+            rows = analyzer.update(args.path)
+            analyzer.save(args.state)
+            print(f"Processed {rows} new rows (offset {analyzer.offset})")
+        analyzer.report()
+        if args.rollup:
+            print_rollup(analyzer.rollup(args.rollup))
+        return 0
+
+    if args.compact:
+        rows = compact_to_parquet(args.path, args.parquet_dir, chunksize=args.chunksize)
+        print(f"Compacted {rows} rows into {args.parquet_dir}")
+    if args.engine == "parquet":
+        stats = parquet_stats(args.parquet_dir)
+    else:
+        if not os.path.exists(args.path):
+            print("No activity log found at", args.path)
+            return 0
+        if args.engine == "pandas":
+            stats = pandas_stats(args.path, chunksize=args.chunksize)
+        else:
+            stats = stream_stats(args.path)
+    stats.report()
+    return 0
+
 
 if __name__ == "__main__":
-    rows = load_activity()
-    if not rows:
-        exit(0)
-    analyze_recommended_pick(rows)
-    analyze_logins(rows)
+    raise SystemExit(main())
@@ -1,30 +1,62 @@
+import csv
 import os
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from flasgger import Swagger
 from config import Config
-import pandas as pd
 
 db = SQLAlchemy()
 
-def create_app():
+def create_app(config_object=Config):
     app = Flask(__name__, template_folder=os.path.join(os.path.dirname(__file__), "..", "templates"))
-    app.config.from_object(Config)
+    app.config.from_object(config_object)
+    from .database import configure_database, install_sqlite_pragmas
+    configure_database(app)
     db.init_app(app)
-    Swagger(app)
+    install_sqlite_pragmas(app, db)
+    if app.config.get("SWAGGER_ENABLED", True):
+        # flasgger is slow to import; skip it entirely when the docs are off
+        from flasgger import Swagger
+        Swagger(app)
 
     # ensure dataset exists and logs dir
     ensure_dataset_and_dirs(app)
+    from .logger import init_activity_log, setup_app_logger
+    setup_app_logger(app)
+    init_activity_log(app)
+    from .metrics import init_metrics
+    init_metrics(app)
 
     from .controllers import main_bp
     app.register_blueprint(main_bp)
+    from .ingest import import_applications_command
+    app.cli.add_command(import_applications_command)
+    from .simulation import simulate_approvals_command
+    app.cli.add_command(simulate_approvals_command)
+    from .archive import archive_applications_command
+    app.cli.add_command(archive_applications_command)
 
+    from .migrations import ensure_indexes, upgrade_db_command
+    app.cli.add_command(upgrade_db_command)
     with app.app_context():
         db.create_all()
+        ensure_indexes()
+
+    # import the loan catalog once; requests only re-sync when the dataset changes
+    from .catalog import init_catalog
+    init_catalog(app)
+    from .services import init_recommendation_cache, init_custom_options_cache
+    init_recommendation_cache(app)
+    init_custom_options_cache(app)
+    from .response_cache import init_response_cache
+    init_response_cache(app)
+    from .decisions import init_decision_queue
+    init_decision_queue(app)
 
     # register error handlers
-    from .utils import register_error_handlers
+    from .utils import register_error_handlers, init_password_hasher, init_token_cache
     register_error_handlers(app)
+    init_password_hasher(app)
+    init_token_cache(app)
 
     return app
 
@@ -33,14 +65,17 @@ def ensure_dataset_and_dirs(app):
     if not os.path.exists(os.path.dirname(path)):
         os.makedirs(os.path.dirname(path), exist_ok=True)
     if not os.path.exists(path):
-        df = pd.DataFrame([
+        rows = [
             {"loan_type":"Personal Loan", "min_amount":5000, "max_amount":500000, "min_tenure":6, "max_tenure":60, "interest_rate":14.5, "eligibility_score":0.6},
             {"loan_type":"Home Loan", "min_amount":200000, "max_amount":5000000, "min_tenure":60, "max_tenure":360, "interest_rate":8.5, "eligibility_score":0.8},
             {"loan_type":"Auto Loan", "min_amount":20000, "max_amount":2000000, "min_tenure":12, "max_tenure":84, "interest_rate":9.9, "eligibility_score":0.7},
             {"loan_type":"Education Loan", "min_amount":10000, "max_amount":3000000, "min_tenure":12, "max_tenure":120, "interest_rate":10.0, "eligibility_score":0.65},
             {"loan_type":"Top-up Personal", "min_amount":10000, "max_amount":250000, "min_tenure":6, "max_tenure":60, "interest_rate":16.0, "eligibility_score":0.5}
-        ])
-        df.to_csv(path, index=False)
+        ]
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]), lineterminator="\n")
+            writer.writeheader()
+            writer.writerows(rows)
 
     log_dir = app.config["LOG_DIR"]
     if not os.path.exists(log_dir):
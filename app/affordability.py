@@ -0,0 +1,116 @@
+# Annuity (EMI) maths: monthly payment, total interest and amortization
+# schedules for one loan or for arrays of loans. The scalar functions are
+# plain Python so the request path never imports numpy; the batch functions
+# take each distinct (rate, tenure) factor from the same cached scalar, so
+# batch and single results are bit-identical.
+from functools import lru_cache
+
+FACTOR_CACHE_SIZE = 65536  # distinct (rate, tenure) pairs; catalogs have few rates
+MAX_FACTOR_TABLE = 4096  # above this many rate x tenure cells, only present pairs are computed
+
+
+def _months(tenure):
+    return max(1, int(tenure))
+
+
+@lru_cache(maxsize=FACTOR_CACHE_SIZE)
+def annuity_factor(interest_rate, tenure):
+    """Monthly payment per unit of principal at an annual rate in percent."""
+    n = _months(tenure)
+    r = interest_rate / 100 / 12
+    if r == 0:
+        return 1.0 / n
+    return r / (1.0 - (1.0 + r) ** -n)
+
+
+def emi(amount, interest_rate, tenure):
+    return amount * annuity_factor(float(interest_rate), _months(tenure))
+
+
+def total_interest(amount, interest_rate, tenure):
+    return emi(amount, interest_rate, tenure) * _months(tenure) - amount
+
+
+def amortization_schedule(amount, interest_rate, tenure):
+    """One dict per month: payment, interest, principal and remaining balance."""
+    n = _months(tenure)
+    r = interest_rate / 100 / 12
+    payment = emi(amount, interest_rate, n)
+    balance = float(amount)
+    rows = []
+    for month in range(1, n + 1):
+        interest = balance * r
+        principal = balance if month == n else payment - interest
+        balance -= principal
+        rows.append({
+            "month": month,
+            "payment": round(interest + principal, 2),
+            "interest": round(interest, 2),
+            "principal": round(principal, 2),
+            "balance": round(max(balance, 0.0), 2),
+        })
+    return rows
+
+
+def annuity_factors(interest_rates, tenures):
+    """annuity_factor over arrays, computed once per distinct (rate, tenure) pair."""
+    import numpy as np
+    rates = np.asarray(interest_rates, dtype=np.float64).ravel()
+    months = np.maximum(1, np.asarray(tenures, dtype=np.float64).ravel().astype(np.int64))
+    if rates.shape != months.shape:
+        raise ValueError("interest_rates and tenures must have the same length")
+    if not len(rates):
+        return np.empty(0, dtype=np.float64)
+    rate_values, rate_idx = np.unique(rates, return_inverse=True)
+    month_values, month_idx = np.unique(months, return_inverse=True)
+    rate_list, month_list = rate_values.tolist(), month_values.tolist()
+    if len(rate_list) * len(month_list) <= MAX_FACTOR_TABLE:
+        # few distinct rates and tenures: fill the whole (rate x tenure) table
+        table = np.array([[annuity_factor(rate, n) for n in month_list] for rate in rate_list], dtype=np.float64)
+        return table[rate_idx.ravel(), month_idx.ravel()]
+    pair_keys, inverse = np.unique(rate_idx.ravel() * len(month_list) + month_idx.ravel(), return_inverse=True)
+    factors = np.array([annuity_factor(rate_list[key // len(month_list)], month_list[key % len(month_list)])
+                        for key in pair_keys.tolist()], dtype=np.float64)
+    return factors[inverse.ravel()]
+
+
+def emi_batch(amounts, interest_rates, tenures):
+    import numpy as np
+    return np.asarray(amounts, dtype=np.float64).ravel() * annuity_factors(interest_rates, tenures)
+
+
+def total_interest_batch(amounts, interest_rates, tenures):
+    import numpy as np
+    months = np.maximum(1, np.asarray(tenures, dtype=np.float64).ravel().astype(np.int64))
+    return emi_batch(amounts, interest_rates, tenures) * months - np.asarray(amounts, dtype=np.float64).ravel()
+
+
+def amortization_schedules(amounts, interest_rates, tenures):
+    """
+    Schedules for many loans at once, as (N, max_tenure) arrays keyed
+    payment / interest / principal / balance. Months past a loan's own
+    tenure are zero. Memory is N x max_tenure floats per array.
+    """
+    import numpy as np
+    amounts = np.asarray(amounts, dtype=np.float64).ravel()
+    r = (np.asarray(interest_rates, dtype=np.float64).ravel() / 100 / 12)[:, None]
+    months = np.maximum(1, np.asarray(tenures, dtype=np.float64).ravel().astype(np.int64))
+    payment = emi_batch(amounts, interest_rates, tenures)[:, None]
+    m = np.arange(1, int(months.max(initial=1)) + 1)[None, :]
+    active = m <= months[:, None]
+    growth = (1.0 + r) ** (m - 1)
+    # balance before month m (closed form), so interest needs no running loop
+    with np.errstate(divide="ignore", invalid="ignore"):
+        paid = np.where(r > 0, payment * (growth - 1.0) / np.where(r > 0, r, 1.0), payment * (m - 1))
+    opening = amounts[:, None] * growth - paid
+    interest = opening * r
+    last = m == months[:, None]
+    principal = np.where(last, opening, payment - interest)
+    balance = np.maximum(opening - principal, 0.0)
+    zero = np.zeros_like(opening)
+    return {
+        "payment": np.where(active, interest + principal, zero),
+        "interest": np.where(active, interest, zero),
+        "principal": np.where(active, principal, zero),
+        "balance": np.where(active, balance, zero),
+    }
@@ -0,0 +1,185 @@
+import os
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import delete, func, literal, select, text
+
+from . import db
+from .models import LoanApplication, ArchivedLoanApplication, ApplicationStatus, DecisionJob, JobStatus
+
+DECIDED = (ApplicationStatus.APPROVED, ApplicationStatus.REJECTED)
+ACTIVE_JOBS = (JobStatus.QUEUED, JobStatus.RUNNING)
+# columns copied as-is; archived_at is set on the way in
+COLUMNS = ("id", "account_id", "requested_amount", "requested_tenure", "selected_loan_id", "custom_preferences",
+           "score", "status", "created_at", "manager_comment", "picked_recommended")
+
+
+def find_archived_application(app_id):
+    return db.session.get(ArchivedLoanApplication, app_id)
+
+
+def shares_database():
+    """True when the archive table lives in the main database."""
+    main, archive = db.engines[None].url, db.engines["archive"].url
+    return main.render_as_string(hide_password=False) == archive.render_as_string(hide_password=False) \
+        and main.database not in (None, "", ":memory:")
+
+
+def _decided_before(table, cutoff):
+    # coalesce() is a no-op on the values but keeps SQLite (without ANALYZE
+    # stats) from answering through (status, created_at), which scans every
+    # old decided row on each batch, instead of the id range
+    return (func.coalesce(table.c.status, "").in_(DECIDED),
+            func.coalesce(table.c.created_at, cutoff) < cutoff)
+
+
+def _archivable(table, ids, cutoff):
+    # re-checked inside every write, so an application re-opened after the
+    # candidate scan (new decision job, status change) stays in the hot table
+    active = (select(DecisionJob.id)
+              .where(DecisionJob.application_id == table.c.id, DecisionJob.status.in_(ACTIVE_JOBS))
+              .exists())
+    return (table.c.id.between(min(ids), max(ids)), table.c.id.in_(ids), *_decided_before(table, cutoff), ~active)
+
+
+def _candidate_ids(conn, after, upper, cutoff):
+    # an id window rather than ORDER BY id LIMIT n, which sorts every
+    # remaining candidate on each batch
+    table = LoanApplication.__table__
+    stmt = (select(table.c.id)
+            .where(table.c.id > after, table.c.id <= upper, *_decided_before(table, cutoff))
+            .order_by(table.c.id))
+    return conn.execute(stmt).scalars().all()
+
+
+def _delete_hot(conn, ids, cutoff):
+    table, jobs = LoanApplication.__table__, DecisionJob.__table__
+    moving = select(table.c.id).where(*_archivable(table, ids, cutoff))
+    # finished jobs of moved applications are queue bookkeeping; the outcome is on the application
+    conn.execute(delete(jobs).where(jobs.c.application_id.in_(moving)))
+    return conn.execute(delete(table).where(*_archivable(table, ids, cutoff))).rowcount
+
+
+def move_batch(ids, cutoff, shared=None):
+    """
+    Move the archivable applications among `ids` to the archive table.
+    Returns how many left loan_applications.
+
+    In one database this is a single transaction. Across databases the rows
+    are copied (replacing any earlier copy) and committed before they are
+    deleted from the hot table, so an interrupted move leaves a row in both
+    places, never in neither, and running again finishes it.
+    """
+    shared = shares_database() if shared is None else shared
+    table, archive = LoanApplication.__table__, ArchivedLoanApplication.__table__
+    now = datetime.utcnow()
+    columns = [table.c[name] for name in COLUMNS]
+    if shared:
+        with db.engines[None].begin() as conn:
+            conn.execute(delete(archive).where(archive.c.id.in_(ids)))
+            conn.execute(archive.insert().from_select(
+                COLUMNS + ("archived_at",), select(*columns, literal(now)).where(*_archivable(table, ids, cutoff))))
+            return _delete_hot(conn, ids, cutoff)
+    with db.engines[None].connect() as conn:
+        rows = conn.execute(select(*columns).where(*_archivable(table, ids, cutoff))).mappings().all()
+    if rows:
+        with db.engines["archive"].begin() as conn:
+            conn.execute(delete(archive).where(archive.c.id.in_([r["id"] for r in rows])))
+            conn.execute(archive.insert(), [dict(r, archived_at=now) for r in rows])
+    with db.engines[None].begin() as conn:
+        return _delete_hot(conn, [r["id"] for r in rows], cutoff) if rows else 0
+
+
+def archive_applications(older_than_days=None, batch_size=None, max_batches=None, pause=None, progress=None):
+    """
+    Move APPROVED/REJECTED applications created more than `older_than_days`
+    ago (and with no queued or running decision) out of loan_applications,
+    one window of `batch_size` ids at a time in id order. Each batch
+    commits on its own, so the run can be stopped at any point (or capped
+    with max_batches) and simply started again later.
+    """
+    config = current_app.config
+    older_than_days = config.get("ARCHIVE_AFTER_DAYS", 180) if older_than_days is None else older_than_days
+    batch_size = batch_size or config.get("ARCHIVE_BATCH_SIZE", 5000)
+    pause = config.get("ARCHIVE_BATCH_PAUSE", 0.0) if pause is None else pause
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    shared = shares_database()
+    started = time.perf_counter()
+    moved = batches = after = 0
+    with db.engines[None].connect() as conn:
+        # SQLite gives new rows max(id) + 1: keeping the newest row hot means
+        # an archived id is never handed out again
+        last = (conn.execute(select(func.max(LoanApplication.id))).scalar() or 1) - 1
+    while after < last and (max_batches is None or batches < max_batches):
+        upper = min(after + batch_size, last)
+        with db.engines[None].connect() as conn:
+            ids = _candidate_ids(conn, after, upper, cutoff)
+        after = upper
+        if not ids:
+            continue
+        moved += move_batch(ids, cutoff, shared)
+        batches += 1
+        if progress is not None:
+            progress(batches, moved, after)
+        if pause:
+            time.sleep(pause)
+    return {
+        "moved": moved,
+        "batches": batches,
+        "last_id": after,
+        "cutoff": cutoff.isoformat(),
+        "shared_database": shared,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def database_file_sizes():
+    """{bind: bytes} for the SQLite files behind the main and archive binds."""
+    sizes, seen = {}, set()
+    for key, engine in db.engines.items():
+        path = engine.url.database
+        if engine.dialect.name != "sqlite" or path in (None, "", ":memory:") or path in seen or not os.path.exists(path):
+            continue
+        seen.add(path)
+        wal = path + "-wal"
+        sizes[key or "main"] = os.path.getsize(path) + (os.path.getsize(wal) if os.path.exists(wal) else 0)
+    return sizes
+
+
+def vacuum_main_database():
+    """Rebuild the main SQLite file so the space archived rows used is returned."""
+    engine = db.engines[None]
+    if engine.dialect.name != "sqlite":
+        return False
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM"))
+        conn.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+    return True
+
+
+@click.command("archive-applications")
+@click.option("--older-than-days", type=int, default=None, help="Default: ARCHIVE_AFTER_DAYS.")
+@click.option("--batch-size", type=int, default=None, help="Ids per batch. Default: ARCHIVE_BATCH_SIZE.")
+@click.option("--max-batches", type=int, default=None, help="Stop after this many batches; run again to continue.")
+@click.option("--pause", type=float, default=None, help="Seconds between batches. Default: ARCHIVE_BATCH_PAUSE.")
+@click.option("--vacuum", is_flag=True, help="VACUUM the main SQLite database afterwards (locks it while running).")
+@with_appcontext
+def archive_applications_command(older_than_days, batch_size, max_batches, pause, vacuum):
+    """Move old decided applications to the archive table."""
+    def progress(batches, moved, last_id):
+        if batches % 20 == 0:
+            click.echo(f"  {batches} batches, {moved} moved, up to id {last_id}")
+
+    before = database_file_sizes()
+    report = archive_applications(older_than_days, batch_size, max_batches, pause, progress)
+    click.echo(f"moved {report['moved']} applications in {report['batches']} batches ({report['seconds']} s), "
+               f"created before {report['cutoff']}")
+    if vacuum and vacuum_main_database():
+        click.echo("vacuumed main database")
+    after = database_file_sizes()
+    for key, size in after.items():
+        click.echo(f"  {key}: {before.get(key, 0) / 2**20:.1f} MiB -> {size / 2**20:.1f} MiB")
+    current_app.logger.info(f"archive-applications moved={report['moved']} batches={report['batches']} cutoff={report['cutoff']}")
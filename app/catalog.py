@@ -0,0 +1,243 @@
+import csv
+import hashlib
+import os
+import threading
+import time
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from . import db
+from .models import LoanOption
+from .metrics import instrumented
+
+# loan_type is the upsert key; the rest are copied onto the LoanOption row
+CATALOG_FIELDS = ("min_amount", "max_amount", "min_tenure", "max_tenure", "interest_rate", "eligibility_score")
+FIELD_DEFAULTS = {"min_tenure": 6, "max_tenure": 60, "eligibility_score": 0.5}
+
+
+class CatalogOption:
+    """
+    Read-only, slot-based copy of a LoanOption row. Exposes the same
+    attributes as the model so services and templates can use either.
+    """
+
+    __slots__ = ("id", "loan_type") + CATALOG_FIELDS
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            object.__setattr__(self, name, values[name])
+
+    def __setattr__(self, name, value):
+        raise AttributeError("catalog options are immutable")
+
+    def __repr__(self):
+        return f"<CatalogOption {self.id} {self.loan_type!r}>"
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class CatalogSnapshot:
+    """
+    Immutable view of loan_options at one catalog version. A new snapshot is
+    built after every sync and swapped in with a single assignment, so readers
+    never see a half-updated catalog, or a version and content hash that
+    belong to different catalogs.
+    """
+
+    __slots__ = ("version", "content_hash", "options", "by_id", "_derived")
+
+    def __init__(self, version, options, content_hash=None):
+        object.__setattr__(self, "version", version)
+        object.__setattr__(self, "content_hash", content_hash)  # sha256 of the dataset file it was synced from
+        object.__setattr__(self, "options", tuple(options))
+        object.__setattr__(self, "by_id", {o.id: o for o in self.options})
+        object.__setattr__(self, "_derived", {})
+
+    def __setattr__(self, name, value):
+        raise AttributeError("catalog snapshots are immutable")
+
+    def __iter__(self):
+        return iter(self.options)
+
+    def __len__(self):
+        return len(self.options)
+
+    def get(self, loan_id):
+        return self.by_id.get(loan_id)
+
+    def derived(self, key, factory):
+        """
+        Memoize a structure computed from this snapshot (arrays, indexes).
+        It lives and dies with the snapshot, so it can never go stale.
+        """
+        value = self._derived.get(key)
+        if value is None:
+            value = self._derived.setdefault(key, factory(self))
+        return value
+
+
+def build_snapshot(version, content_hash=None):
+    columns = [getattr(LoanOption, name) for name in CatalogOption.__slots__]
+    rows = db.session.query(*columns).order_by(LoanOption.id).all()
+    return CatalogSnapshot(version, (CatalogOption(**row._asdict()) for row in rows), content_hash)
+
+
+class CatalogState:
+    """
+    Per-app record of the dataset revision currently loaded into loan_options.
+    version is bumped every time a sync actually changes the catalog; it and
+    the content hash are read off the current snapshot.
+    """
+
+    def __init__(self):
+        self.fingerprint = None  # (mtime_ns, size) of the dataset file at last check
+        self.synced_at = None
+        self.last_check = 0.0
+        self.snapshot = CatalogSnapshot(0, ())
+        self.lock = threading.Lock()
+
+    @property
+    def version(self):
+        return self.snapshot.version
+
+    @property
+    def content_hash(self):
+        return self.snapshot.content_hash
+
+    def to_dict(self):
+        return {
+            "version": self.version,
+            "content_hash": self.content_hash,
+            "synced_at": self.synced_at,
+        }
+
+
+def init_catalog(app):
+    app.extensions["loan_catalog"] = CatalogState()
+    app.cli.add_command(reload_catalog_command)
+    with app.app_context():
+        sync_catalog(force=True)
+
+
+def get_catalog_state():
+    return current_app.extensions["loan_catalog"]
+
+
+def catalog_version():
+    return get_catalog_state().version
+
+
+def get_catalog_snapshot():
+    return get_catalog_state().snapshot
+
+
+def _file_fingerprint(path):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _is_blank(value):
+    # what pandas.read_csv would have turned into NaN
+    return value is None or value.strip() == "" or value.strip().lower() in ("nan", "na", "n/a", "null")
+
+
+def read_dataset(path):
+    records = []
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            if any(_is_blank(row.get(field)) for field in ("loan_type", "min_amount", "max_amount")):
+                continue
+            record = {"loan_type": row["loan_type"].strip()}
+            for field in CATALOG_FIELDS:
+                value = row.get(field)
+                record[field] = FIELD_DEFAULTS.get(field) if _is_blank(value) else value
+            record["min_tenure"] = int(float(record["min_tenure"]))
+            record["max_tenure"] = int(float(record["max_tenure"]))
+            for field in ("min_amount", "max_amount", "interest_rate", "eligibility_score"):
+                record[field] = float(record[field])
+            records.append(record)
+    return records
+
+
+def upsert_catalog(records):
+    """
+    Write records into loan_options keyed on loan_type: one SELECT for the
+    existing rows, one executemany for updates, one for inserts, one commit.
+    """
+    existing = {lo.loan_type: lo.id for lo in db.session.query(LoanOption.id, LoanOption.loan_type)}
+    updates, inserts = [], []
+    for record in records:
+        loan_id = existing.get(record["loan_type"])
+        if loan_id is None:
+            inserts.append(record)
+        else:
+            updates.append(dict(record, id=loan_id))
+    if updates:
+        db.session.bulk_update_mappings(LoanOption, updates)
+    if inserts:
+        db.session.bulk_insert_mappings(LoanOption, inserts)
+    db.session.commit()
+    return len(updates), len(inserts)
+
+
+@instrumented("catalog.sync_catalog")
+def sync_catalog(force=False):
+    """
+    Bring loan_options in line with DATASET_PATH.
+    The file is only parsed when its (mtime, size) changed and its content
+    hash differs from the last sync, unless force is set.
+    Returns True when the catalog was rewritten.
+    """
+    state = get_catalog_state()
+    path = current_app.config["DATASET_PATH"]
+    with state.lock:
+        state.last_check = time.monotonic()
+        fingerprint = _file_fingerprint(path)
+        if not force and fingerprint == state.fingerprint:
+            return False
+        content_hash = _file_hash(path)
+        if not force and content_hash == state.content_hash:
+            state.fingerprint = fingerprint
+            return False
+        updated, inserted = upsert_catalog(read_dataset(path))
+        snapshot = build_snapshot(state.version + 1, content_hash)
+        state.fingerprint = fingerprint
+        state.synced_at = time.time()
+        state.snapshot = snapshot
+    current_app.logger.info(f"catalog synced version={state.version} updated={updated} inserted={inserted}")
+    return True
+
+
+def refresh_catalog_if_stale():
+    """
+    Cheap per-request check: at most one stat() of the dataset every
+    CATALOG_CHECK_INTERVAL seconds, and a sync only when it changed.
+    """
+    state = get_catalog_state()
+    interval = current_app.config.get("CATALOG_CHECK_INTERVAL", 2.0)
+    if interval is None or interval < 0:
+        return False
+    if time.monotonic() - state.last_check < interval:
+        return False
+    return sync_catalog()
+
+
+@click.command("reload-catalog")
+@click.option("--force", is_flag=True, help="Re-import even if the dataset is unchanged.")
+@with_appcontext
+def reload_catalog_command(force):
+    """Sync dataset/loans.csv into the loan_options table."""
+    changed = sync_catalog(force=force)
+    state = get_catalog_state()
+    click.echo(f"catalog version {state.version} ({'reloaded' if changed else 'unchanged'})")
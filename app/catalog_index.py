@@ -0,0 +1,152 @@
+import bisect
+import heapq
+
+# same weights as services.recommend_loans
+AMOUNT_WEIGHT = 0.6
+TENURE_WEIGHT = 0.4
+PROBE_FACTOR = 16  # options checked by eligibility before falling back to the interval tree
+
+
+def penalty_score(loan, requested_amount, requested_tenure):
+    """recommend_loans' base score for one option: eligibility minus range penalties."""
+    amt_penalty = 0.0
+    if requested_amount < loan.min_amount:
+        amt_penalty = (loan.min_amount - requested_amount) / loan.min_amount
+    elif requested_amount > loan.max_amount:
+        amt_penalty = (requested_amount - loan.max_amount) / loan.max_amount
+
+    tenure_penalty = 0.0
+    if requested_tenure < loan.min_tenure:
+        tenure_penalty = (loan.min_tenure - requested_tenure) / loan.min_tenure
+    elif requested_tenure > loan.max_tenure:
+        tenure_penalty = (requested_tenure - loan.max_tenure) / loan.max_tenure
+
+    return loan.eligibility_score - (amt_penalty * AMOUNT_WEIGHT + tenure_penalty * TENURE_WEIGHT)
+
+
+class IntervalTree:
+    """
+    Static centered interval tree over closed intervals. stab(x) returns the
+    payloads of every interval containing x in O(log n + matches).
+    """
+
+    __slots__ = ("center", "by_low", "by_high", "left", "right")
+
+    def __init__(self, intervals):
+        # intervals: non-empty list of (low, high, payload)
+        points = sorted(p for low, high, _ in intervals for p in (low, high))
+        self.center = points[len(points) // 2]
+        here, left, right = [], [], []
+        for interval in intervals:
+            if interval[1] < self.center:
+                left.append(interval)
+            elif interval[0] > self.center:
+                right.append(interval)
+            else:
+                here.append(interval)
+        self.by_low = sorted((low, payload) for low, _, payload in here)
+        self.by_high = sorted(((-high, payload) for _, high, payload in here))
+        self.left = IntervalTree(left) if left else None
+        self.right = IntervalTree(right) if right else None
+
+    def stab(self, x):
+        found = []
+        node = self
+        while node is not None:
+            if x < node.center:
+                # intervals here all end at or after center; keep those starting <= x
+                for low, payload in node.by_low:
+                    if low > x:
+                        break
+                    found.append(payload)
+                node = node.left
+            elif x > node.center:
+                for neg_high, payload in node.by_high:
+                    if -neg_high < x:
+                        break
+                    found.append(payload)
+                node = node.right
+            else:
+                found.extend(payload for _, payload in node.by_low)
+                break
+        return found
+
+
+class CatalogIndex:
+    """
+    Exact top-k search over a catalog snapshot without scoring every option.
+
+    A score is eligibility minus non-negative penalties, so an option can
+    only beat a threshold tau if its eligibility is >= tau. Options whose
+    amount x tenure box contains the request score exactly their
+    eligibility; the k-th best of those is tau, and only the
+    eligibility-sorted prefix with eligibility >= tau (the in-box options
+    plus a bounded set of near-misses) needs full scoring.
+    """
+
+    def __init__(self, snapshot):
+        self.options = snapshot.options
+        # positions by eligibility desc, ties in catalog order (like the stable sort)
+        self.by_eligibility = sorted(range(len(self.options)), key=lambda p: (-self.options[p].eligibility_score, p))
+        self.neg_eligibility = [-self.options[p].eligibility_score for p in self.by_eligibility]
+        intervals = [(o.min_amount, o.max_amount, p) for p, o in enumerate(self.options)]
+        self.amount_tree = IntervalTree(intervals) if intervals else None
+
+    def in_box(self, requested_amount, requested_tenure):
+        """Positions of options whose amount and tenure ranges contain the request."""
+        if self.amount_tree is None:
+            return []
+        options = self.options
+        return [p for p in self.amount_tree.stab(requested_amount)
+                if options[p].min_tenure <= requested_tenure <= options[p].max_tenure]
+
+    def _threshold(self, requested_amount, requested_tenure, k):
+        # cheap path: walk the top of the eligibility order, since the k best
+        # in-box options found there are the k best overall
+        options = self.options
+        found = 0
+        for p in self.by_eligibility[:PROBE_FACTOR * k]:
+            o = options[p]
+            if o.min_amount <= requested_amount <= o.max_amount and o.min_tenure <= requested_tenure <= o.max_tenure:
+                found += 1
+                if found == k:
+                    return o.eligibility_score
+        box = self.in_box(requested_amount, requested_tenure)
+        if len(box) < k:
+            return None
+        return heapq.nlargest(k, (options[p].eligibility_score for p in box))[-1]
+
+    def top_k(self, requested_amount, requested_tenure, k):
+        """
+        The k best (position, loan, score) tuples, best first, identical to
+        the first k rows of an exhaustive ranking.
+        """
+        options = self.options
+        k = min(k, len(options))
+        if k <= 0:
+            return ()
+        tau = self._threshold(requested_amount, requested_tenure, k)
+        if tau is not None:
+            end = bisect.bisect_right(self.neg_eligibility, -tau)
+            ranked = [(p, options[p], penalty_score(options[p], requested_amount, requested_tenure))
+                      for p in self.by_eligibility[:end]]
+        else:
+            # fewer than k in-box options: scan by eligibility, stopping once
+            # no remaining option can reach the current k-th best score
+            heap, ranked = [], []
+            for p in self.by_eligibility:
+                o = options[p]
+                if len(heap) == k and o.eligibility_score < heap[0]:
+                    break
+                score = penalty_score(o, requested_amount, requested_tenure)
+                ranked.append((p, o, score))
+                if len(heap) < k:
+                    heapq.heappush(heap, score)
+                elif score > heap[0]:
+                    heapq.heapreplace(heap, score)
+        ranked.sort(key=lambda x: (-x[2], x[0]))
+        return tuple(ranked[:k])
+
+
+def catalog_index(snapshot):
+    return snapshot.derived("interval_index", CatalogIndex)
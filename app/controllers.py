@@ -1,24 +1,43 @@
-from flask import Blueprint, render_template, request, redirect, url_for, current_app, jsonify, make_response, g
+from flask import Blueprint, render_template, request, redirect, url_for, current_app, jsonify, make_response, abort
 from . import db
-from .models import Account, LoanOption, LoanApplication, ApplicationStatus
-from .services import load_dataset_into_db, recommend_loans, generate_custom_options, score_application, manager_decision
-from .utils import AppError, hash_password, check_password, create_token, token_required, decode_token, get_token_from_request
-from .logger import log_activity, setup_app_logger
+from .models import Account, LoanApplication, ApplicationStatus, JobStatus
+from .services import recommend_loans, custom_options_for, score_application
+from .utils import AppError, hash_password_offloaded, verify_password, password_needs_rehash, create_token, token_required, decode_token, get_token_from_request, forget_token, current_account, admin_required, is_admin
+from .logger import log_activity
+from .catalog import refresh_catalog_if_stale, sync_catalog, get_catalog_state, get_catalog_snapshot
+from .decisions import enqueue_decision, wait_for_decision, latest_job, queue_depth, get_decision_queue
+from .response_cache import cached_response, cached_fragment
+from .archive import find_archived_application
 import json
 from datetime import datetime
+from sqlalchemy.orm import joinedload
 
 main_bp = Blueprint("main", __name__)
 
+def load_application(app_id, for_update=False):
+    # one query for the application and its applicant; archived ids resolve
+    # to their read-only copy
+    app_obj = LoanApplication.query.options(joinedload(LoanApplication.account)).filter_by(id=app_id).first()
+    if app_obj is None:
+        app_obj = find_archived_application(app_id)
+        if app_obj is None:
+            abort(404)
+        if for_update:
+            raise AppError("Application is archived and can no longer be changed", 409)
+    return app_obj
+
 @main_bp.before_app_request
 def init_app():
-    load_dataset_into_db()
-    setup_app_logger(current_app)
+    refresh_catalog_if_stale()
+    get_decision_queue().ensure_workers()
 
 @main_bp.route("/")
+@cached_response()
 def index():
     return render_template("index.html")
 
 @main_bp.route("/account/check", methods=["GET", "POST"])
+@cached_response()
 def account_check():
     if request.method == "GET":
         return render_template("account_check.html")
@@ -33,6 +52,7 @@ def account_check():
         return redirect(url_for("main.create_account", email=email))
 
 @main_bp.route("/account/create", methods=["GET", "POST"])
+@cached_response("email")
 def create_account():
     if request.method == "GET":
         email = request.args.get("email", "")
@@ -55,7 +75,7 @@ def create_account():
         monthly_income=float(data.get("monthly_income") or 0.0),
         pan=data.get("pan") or None,
         aadhaar=data.get("aadhaar") or None,
-        password_hash=hash_password(password)
+        password_hash=hash_password_offloaded(password)
     )
     db.session.add(account)
     db.session.commit()
@@ -63,6 +83,7 @@ def create_account():
     return redirect(url_for("main.login", email=account.email))
 
 @main_bp.route("/login", methods=["GET", "POST"])
+@cached_response("email")
 def login():
     if request.method == "GET":
         email = request.args.get("email", "")
@@ -75,8 +96,11 @@ def login():
     account = Account.query.filter_by(email=email).first()
     if not account:
         raise AppError("Account not found", 404)
-    if not account.password_hash or not check_password(password, account.password_hash):
+    if not account.password_hash or not verify_password(password, account.password_hash):
         raise AppError("Invalid credentials", 401)
+    if password_needs_rehash(account.password_hash):
+        account.password_hash = hash_password_offloaded(password)
+        db.session.commit()
     # create JWT
     token = create_token({"id": account.id, "email": account.email})
     resp = make_response(redirect(url_for("main.loan_request")))
@@ -94,30 +118,33 @@ def logout():
     token = get_token_from_request()
     user = None
     try:
-        user = decode_token(token) if token else None
+        user = db.session.get(Account, decode_token(token)) if token else None
     except Exception:
         user = None
+    if token:
+        forget_token(token)
     resp = make_response(redirect(url_for("main.index")))
     resp.delete_cookie("access_token")
     ip = request.remote_addr
     ua = request.headers.get("User-Agent")
     logout_time = datetime.utcnow().isoformat()
     if user:
-        log_activity(event="LOGOUT", user_id=user.get("id"), user_email=user.get("email"), logout_time=logout_time, ip=ip, user_agent=ua)
+        log_activity(event="LOGOUT", user_id=user.id, user_email=user.email, logout_time=logout_time, ip=ip, user_agent=ua)
     return resp
 
 @main_bp.route("/loan/request", methods=["GET", "POST"])
 @token_required
 def loan_request():
-    user_id = g.current_user
-    account = Account.query.get_or_404(user_id)
+    account = current_account()
     if request.method == "GET":
-        options = LoanOption.query.all()
-        return render_template("loan_request.html", account=account, options=options)
+        # the list only changes with the catalog; the rest of the page is per user
+        options_table = cached_fragment("loan_options_table", get_catalog_snapshot(),
+                                        lambda snapshot: render_template("_loan_options_table.html", options=snapshot.options))
+        return render_template("loan_request.html", account=account, options_table=options_table)
     requested_amount = float(request.form.get("amount"))
     requested_tenure = int(request.form.get("tenure"))
     flexible = request.form.get("flexible") == "on"
-    recs = recommend_loans(requested_amount, requested_tenure, flexible=flexible)
+    recs = recommend_loans(requested_amount, requested_tenure, flexible=flexible, limit=current_app.config.get("RECOMMENDATION_LIMIT"))
     top = recs[0]["loan"] if recs else None
     application = LoanApplication(
         account_id=account.id,
@@ -139,20 +166,24 @@ def loan_request():
 @main_bp.route("/loan/options/<int:app_id>/select", methods=["POST"])
 @token_required
 def loan_select(app_id):
-    app_obj = LoanApplication.query.get_or_404(app_id)
-    account = Account.query.get_or_404(app_obj.account_id)
+    app_obj = load_application(app_id)
+    account = app_obj.account
     choice = request.form.get("choice")
     ip = request.remote_addr
     ua = request.headers.get("User-Agent")
     if choice == "custom":
         base_loan_id = int(request.form.get("base_loan_id"))
-        base = LoanOption.query.get_or_404(base_loan_id)
-        custom_options = generate_custom_options(base, app_obj.requested_amount, app_obj.requested_tenure, n=3)
+        base = get_catalog_snapshot().get(base_loan_id)
+        if base is None:
+            raise AppError("Loan option not found", 404)
+        custom_options = custom_options_for(app_obj, base, n=3)
         return render_template("loan_options.html", account=account, application=app_obj, recs=None, custom_options=custom_options, base=base)
     else:
+        if app_obj.archived:
+            raise AppError("Application is archived and can no longer be changed", 409)
         selected_id = int(choice)
         # detect if selected loan equals the top recommended (we stored earlier in selected_loan_id but recalc)
-        recs = recommend_loans(app_obj.requested_amount, app_obj.requested_tenure, flexible=False)
+        recs = recommend_loans(app_obj.requested_amount, app_obj.requested_tenure, flexible=False, limit=1)
         top_id = recs[0]["loan"].id if recs else None
         app_obj.selected_loan_id = selected_id
         app_obj.status = ApplicationStatus.PENDING
@@ -165,22 +196,126 @@ def loan_select(app_id):
 @main_bp.route("/manager/review/<int:app_id>", methods=["GET", "POST"])
 @token_required
 def manager_review(app_id):
-    app_obj = LoanApplication.query.get_or_404(app_id)
-    account = Account.query.get_or_404(app_obj.account_id)
+    app_obj = load_application(app_id, for_update=request.method == "POST")
+    account = app_obj.account
     if request.method == "GET":
-        return render_template("manager_review.html", application=app_obj)
-    approved, comment = manager_decision(app_obj)
-    app_obj.manager_comment = comment
-    app_obj.status = ApplicationStatus.APPROVED if approved else ApplicationStatus.REJECTED
-    db.session.commit()
-    # log manager decision
-    ip = request.remote_addr
-    ua = request.headers.get("User-Agent")
-    log_activity(event="MANAGER_DECISION", user_id=account.id, user_email=account.email, application_id=app_obj.id, loan_amount=app_obj.requested_amount, loan_status=app_obj.status.value, recommended_picked=app_obj.picked_recommended, ip=ip, user_agent=ua, extra={"comment": comment})
-    recs = recommend_loans(app_obj.requested_amount, app_obj.requested_tenure, flexible=True)
+        selected_loan = get_catalog_snapshot().get(app_obj.selected_loan_id)
+        return render_template("manager_review.html", application=app_obj, selected_loan=selected_loan)
+    # the decision itself runs on a decision worker (see app/decisions.py)
+    job = enqueue_decision(app_obj, context={"ip": request.remote_addr, "user_agent": request.headers.get("User-Agent")})
+    if job.status == JobStatus.DONE:
+        return render_result(app_obj)
+    return redirect(url_for("main.decision_result", app_id=app_obj.id))
+
+def render_result(app_obj):
+    recs = recommend_loans(app_obj.requested_amount, app_obj.requested_tenure, flexible=True, limit=2)
     second_best = recs[1] if len(recs) > 1 else None
     return render_template("result.html", application=app_obj, second_best=second_best)
 
+@main_bp.route("/manager/review/<int:app_id>/result", methods=["GET"])
+@token_required
+def decision_result(app_id):
+    job = wait_for_decision(app_id, current_app.config.get("DECISION_PAGE_WAIT", 2.0))
+    app_obj = load_application(app_id)
+    if job is not None and job.status in (JobStatus.QUEUED, JobStatus.RUNNING):
+        return render_template("decision_pending.html", application=app_obj, job=job), 202
+    return render_result(app_obj)
+
+@main_bp.route("/api/decisions/<int:app_id>", methods=["POST"])
+@token_required
+def api_enqueue_decision(app_id):
+    app_obj = load_application(app_id, for_update=True)
+    job = enqueue_decision(app_obj, context={"ip": request.remote_addr, "user_agent": request.headers.get("User-Agent")})
+    return jsonify({"job": job.to_dict(), "status_url": url_for("main.api_decision_status", app_id=app_id)}), 202
+
+@main_bp.route("/api/decisions/<int:app_id>", methods=["GET"])
+@token_required
+def api_decision_status(app_id):
+    # ?wait=<seconds> long-polls until the decision is finished
+    wait = min(float(request.args.get("wait", 0) or 0), current_app.config.get("DECISION_MAX_WAIT", 30.0))
+    job = wait_for_decision(app_id, wait) if wait > 0 else latest_job(app_id)
+    app_obj = load_application(app_id)
+    return jsonify({
+        "application_id": app_obj.id,
+        "application_status": app_obj.status.value,
+        "manager_comment": app_obj.manager_comment,
+        "job": job.to_dict() if job else None,
+    })
+
+@main_bp.route("/api/decisions/metrics", methods=["GET"])
+@token_required
+@admin_required
+def api_decision_metrics():
+    queue = get_decision_queue()
+    return jsonify({"depth": queue_depth(), "workers": queue.workers, **queue.metrics.to_dict()})
+
+@main_bp.route("/api/recommendations/batch", methods=["POST"])
+@token_required
+def api_recommend_batch():
+    from .recommender import recommend_batch, catalog_arrays
+    data = request.get_json() or {}
+    amounts = data.get("amounts")
+    tenures = data.get("tenures")
+    if not isinstance(amounts, list) or not isinstance(tenures, list) or len(amounts) != len(tenures):
+        raise AppError("amounts and tenures must be lists of equal length", 400)
+    flexible = data.get("flexible", False)
+    if not (isinstance(flexible, bool) or isinstance(flexible, list) and len(flexible) == len(amounts)
+            and all(isinstance(f, bool) for f in flexible)):
+        raise AppError("flexible must be a boolean or a list of booleans matching amounts", 400)
+    try:
+        k = int(data.get("k", 3))
+        snapshot = get_catalog_snapshot()
+        indices, scores = recommend_batch(amounts, tenures, flexible=flexible, k=k, snapshot=snapshot)
+    except (TypeError, ValueError) as e:
+        raise AppError(f"Invalid batch request: {e}", 400)
+    loan_ids = catalog_arrays(snapshot).ids[indices]
+    return jsonify({
+        "catalog_version": snapshot.version,
+        "loan_ids": loan_ids.tolist(),
+        "scores": [[round(s, 4) for s in row] for row in scores.tolist()],
+    })
+
+@main_bp.route("/api/applications", methods=["GET"])
+@token_required
+def api_list_applications():
+    from .listing import stream_applications
+    account = current_account()
+    # customers page through their own applications; back office sees all
+    account_id = None if is_admin(account) else account.id
+    return stream_applications(request.args, current_app.config["API_PAGE_DEFAULT_LIMIT"], current_app.config["API_PAGE_MAX_LIMIT"],
+                               account_id=account_id)
+
+@main_bp.route("/api/applications/bulk", methods=["POST"])
+@token_required
+@admin_required
+def api_bulk_applications():
+    from .ingest import ingest_applications, parser_for, detect_format, text_stream
+    fmt = request.args.get("format") or detect_format(request.content_type)
+    try:
+        parse = parser_for(fmt)
+    except ValueError as e:
+        raise AppError(str(e), 400)
+    report = ingest_applications(parse(text_stream(request.stream)), source="api")
+    if report["parse_error"]:
+        # rows before parse_error["row"] are already committed
+        return jsonify(report), 400
+    return jsonify(report), 207 if report["failed"] else 200
+
+@main_bp.route("/api/accounts", methods=["GET"])
+@token_required
+@admin_required
+def api_list_accounts():
+    from .listing import stream_accounts
+    return stream_accounts(request.args, current_app.config["API_PAGE_DEFAULT_LIMIT"], current_app.config["API_PAGE_MAX_LIMIT"])
+
+@main_bp.route("/api/catalog/reload", methods=["POST"])
+@token_required
+@admin_required
+def api_reload_catalog():
+    force = request.args.get("force") in ("1", "true", "yes")
+    changed = sync_catalog(force=force)
+    return jsonify({"changed": changed, "catalog": get_catalog_state().to_dict()})
+
 # API endpoint (swagger) to create account via JSON
 @main_bp.route("/api/accounts", methods=["POST"])
 def api_create_account():
@@ -193,7 +328,7 @@ def api_create_account():
     existing = Account.query.filter_by(email=email).first()
     if existing:
         raise AppError("Account already exists", 400)
-    account = Account(name=name, email=email, monthly_income=float(data.get("monthly_income") or 0.0), password_hash=hash_password(password))
+    account = Account(name=name, email=email, monthly_income=float(data.get("monthly_income") or 0.0), password_hash=hash_password_offloaded(password))
     db.session.add(account)
     db.session.commit()
     return jsonify({"account": account.to_dict()})
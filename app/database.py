@@ -0,0 +1,106 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# Applied to every new SQLite connection. WAL lets readers run alongside the
+# single writer, NORMAL sync is safe under WAL, busy_timeout makes writers
+# wait for the lock instead of failing with "database is locked".
+DEFAULT_SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -16000,  # KiB
+    "temp_store": "MEMORY",
+}
+
+PROFILES = {
+    # file-backed SQLite: small pool, threads may share connections across checkouts
+    "sqlite": {
+        "pool_size": 10,
+        "max_overflow": 10,
+        "pool_timeout": 30,
+        "connect_args": {"check_same_thread": False, "timeout": 30},
+    },
+    # PostgreSQL/MySQL: long-lived pool sized per worker process, with liveness checks
+    "server": {
+        "pool_size": 10,
+        "max_overflow": 20,
+        "pool_timeout": 30,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+        "pool_use_lifo": True,
+    },
+}
+
+
+def detect_profile(uri):
+    backend = make_url(uri).get_backend_name()
+    return "sqlite" if backend == "sqlite" else "server"
+
+
+def engine_options_for(uri, profile=None, overrides=None):
+    """SQLALCHEMY_ENGINE_OPTIONS for a database URI; overrides win over the profile."""
+    profile = profile or detect_profile(uri)
+    if profile not in PROFILES:
+        raise ValueError(f"unknown database profile {profile!r}")
+    options = {k: (dict(v) if isinstance(v, dict) else v) for k, v in PROFILES[profile].items()}
+    url = make_url(uri)
+    if profile == "sqlite" and url.database in (None, "", ":memory:"):
+        # in-memory databases use a single static connection; pool sizing does not apply
+        options = {"connect_args": options["connect_args"]}
+    for key, value in (overrides or {}).items():
+        if isinstance(value, dict) and isinstance(options.get(key), dict):
+            options[key].update(value)
+        else:
+            options[key] = value
+    return options
+
+
+def configure_database(app):
+    """
+    Fill SQLALCHEMY_ENGINE_OPTIONS from DATABASE_PROFILE before db.init_app,
+    and point the "archive" bind at ARCHIVE_DATABASE_URL (the main database
+    when unset).
+    """
+    uri = app.config["SQLALCHEMY_DATABASE_URI"]
+    overrides = app.config.get("SQLALCHEMY_ENGINE_OPTIONS")
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options_for(
+        uri,
+        profile=app.config.get("DATABASE_PROFILE"),
+        overrides=overrides,
+    )
+    archive_uri = app.config.get("ARCHIVE_DATABASE_URL") or uri
+    binds = dict(app.config.get("SQLALCHEMY_BINDS") or {})
+    if "archive" not in binds:
+        profile = app.config.get("DATABASE_PROFILE") if archive_uri == uri else None
+        binds["archive"] = {"url": archive_uri, **engine_options_for(archive_uri, profile=profile, overrides=overrides)}
+    app.config["SQLALCHEMY_BINDS"] = binds
+
+
+def _pragma_listener(pragmas):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+    return set_pragmas
+
+
+def install_sqlite_pragmas(app, db):
+    """Register the connect-time PRAGMAs on every SQLite engine of the app."""
+    pragmas = app.config.get("SQLITE_PRAGMAS")
+    if pragmas is None:
+        pragmas = DEFAULT_SQLITE_PRAGMAS
+    if not pragmas:
+        return
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name != "sqlite":
+                continue
+            engine_pragmas = dict(pragmas)
+            if engine.url.database in (None, "", ":memory:"):
+                engine_pragmas.pop("journal_mode", None)
+                engine_pragmas.pop("mmap_size", None)
+            event.listen(engine, "connect", _pragma_listener(engine_pragmas))
@@ -0,0 +1,350 @@
+import atexit
+import json
+import os
+import socket
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import select, update, func
+from sqlalchemy.exc import IntegrityError
+
+from . import db
+from .logger import log_activity
+from .models import DecisionJob, JobStatus, LoanApplication, ApplicationStatus
+from .services import manager_decision
+from .utils import AppError
+
+ACTIVE = (JobStatus.QUEUED, JobStatus.RUNNING)
+DECIDED = (ApplicationStatus.APPROVED, ApplicationStatus.REJECTED)
+
+
+class DecisionMetrics:
+    """In-process counters and recent timings for the decision queue."""
+
+    def __init__(self, window=1000):
+        self.lock = threading.Lock()
+        self.enqueued = 0
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+        self.processing = deque(maxlen=window)  # seconds spent deciding a job
+        self.turnaround = deque(maxlen=window)  # seconds from enqueue to finish
+        self.processing_total = 0.0
+
+    def record(self, outcome, processing_s, turnaround_s=None):
+        with self.lock:
+            if outcome == "done":
+                self.completed += 1
+            elif outcome == "failed":
+                self.failed += 1
+            else:
+                self.retried += 1
+            self.processing.append(processing_s)
+            self.processing_total += processing_s
+            if turnaround_s is not None:
+                self.turnaround.append(turnaround_s)
+
+    @staticmethod
+    def _pct(samples, pct):
+        ordered = sorted(samples)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+    def to_dict(self):
+        with self.lock:
+            processing, turnaround = list(self.processing), list(self.turnaround)
+            return {
+                "enqueued": self.enqueued,
+                "completed": self.completed,
+                "failed": self.failed,
+                "retried": self.retried,
+                "processing_seconds_total": round(self.processing_total, 6),
+                "processing_p50_s": self._pct(processing, 50),
+                "processing_p95_s": self._pct(processing, 95),
+                "turnaround_p50_s": self._pct(turnaround, 50),
+                "turnaround_p95_s": self._pct(turnaround, 95),
+            }
+
+
+class DecisionQueue:
+    """
+    Per-app decision queue state: metrics, the in-process worker pool and a
+    condition that wakes idle workers and long-polling clients.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.workers = app.config.get("DECISION_WORKERS", 2)
+        self.max_attempts = app.config.get("DECISION_MAX_ATTEMPTS", 3)
+        self.retry_delay = app.config.get("DECISION_RETRY_DELAY", 1.0)
+        self.poll_interval = app.config.get("DECISION_POLL_INTERVAL", 1.0)
+        self.lease = app.config.get("DECISION_JOB_LEASE", 60)
+        self.metrics = DecisionMetrics()
+        self.changed = threading.Condition()
+        self._threads = []
+        self._pid = None
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+
+    def notify(self):
+        with self.changed:
+            self.changed.notify_all()
+
+    def wait(self, timeout):
+        with self.changed:
+            self.changed.wait(timeout)
+
+    def ensure_workers(self):
+        # threads do not survive fork(); each worker process starts its own pool
+        if self.workers <= 0 or self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._threads = []
+            for i in range(self.workers):
+                worker_id = f"{socket.gethostname()}:{os.getpid()}:{i}"
+                t = threading.Thread(target=self._run, args=(worker_id,), name=f"decision-worker-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def _run(self, worker_id):
+        with self.app.app_context():
+            run_worker(worker_id, self, stop=self._stop)
+
+    def stop(self, timeout=5.0):
+        if self._pid != os.getpid():
+            return
+        self._stop.set()
+        self.notify()
+        for t in self._threads:
+            t.join(timeout)
+        self._pid = None
+
+
+def init_decision_queue(app):
+    queue = DecisionQueue(app)
+    app.extensions["decision_queue"] = queue
+    app.cli.add_command(decision_worker_command)
+    atexit.register(queue.stop)
+    return queue
+
+
+def get_decision_queue():
+    return current_app.extensions["decision_queue"]
+
+
+def enqueue_decision(application, context=None):
+    """
+    Queue a manager decision for the application, or return the job already
+    waiting for it. With DECISION_WORKERS = 0 the job is processed right away
+    in the calling thread. An application that is already decided gets its
+    finished job back (409 when there is none); it is never decided again.
+    """
+    queue = get_decision_queue()
+    if application.status in DECIDED:
+        job = (DecisionJob.query.filter_by(application_id=application.id, status=JobStatus.DONE)
+               .order_by(DecisionJob.id.desc()).first())
+        if job is None:
+            raise AppError("Application has already been decided", 409)
+        return job
+    job = active_job(application.id)
+    if job is None:
+        job = DecisionJob(application_id=application.id, max_attempts=queue.max_attempts,
+                          context=json.dumps(context) if context else None)
+        db.session.add(job)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # a concurrent request queued one first (ux_decision_jobs_active_application)
+            db.session.rollback()
+            job = active_job(application.id)
+            if job is None:
+                raise
+        else:
+            with queue.metrics.lock:
+                queue.metrics.enqueued += 1
+    if queue.workers <= 0:
+        claimed = claim_job(f"inline:{os.getpid()}", job_id=job.id)
+        if claimed is not None:
+            process_job(claimed, queue)
+        db.session.refresh(job)
+    else:
+        queue.ensure_workers()
+        queue.notify()
+    return job
+
+
+def active_job(application_id):
+    return (DecisionJob.query
+            .filter(DecisionJob.application_id == application_id, DecisionJob.status.in_(ACTIVE))
+            .order_by(DecisionJob.id.desc()).first())
+
+
+def claim_job(worker_id, job_id=None):
+    """
+    Atomically move one claimable job from QUEUED to RUNNING for this worker.
+    The conditional UPDATE (status still QUEUED) is the claim: when two
+    workers race for the same row only one update matches, so jobs are never
+    processed twice. Returns the claimed job id or None.
+    """
+    now = datetime.utcnow()
+    for _ in range(5):
+        if job_id is None:
+            candidate = (select(DecisionJob.id)
+                         .where(DecisionJob.status == JobStatus.QUEUED, DecisionJob.available_at <= now)
+                         .order_by(DecisionJob.id).limit(1))
+            if db.engine.dialect.name == "postgresql":
+                candidate = candidate.with_for_update(skip_locked=True)
+            target = db.session.execute(candidate).scalar()
+            if target is None:
+                db.session.commit()
+                return None
+        else:
+            target = job_id
+        result = db.session.execute(
+            update(DecisionJob)
+            .where(DecisionJob.id == target, DecisionJob.status == JobStatus.QUEUED)
+            .values(status=JobStatus.RUNNING, claimed_by=worker_id, claimed_at=now, attempts=DecisionJob.attempts + 1)
+        )
+        db.session.commit()
+        if result.rowcount == 1:
+            return target
+        if job_id is not None:
+            return None
+    return None
+
+
+def requeue_stale_jobs(lease_seconds):
+    """Return RUNNING jobs whose worker vanished (lease expired) to the queue."""
+    cutoff = datetime.utcnow() - timedelta(seconds=lease_seconds)
+    result = db.session.execute(
+        update(DecisionJob)
+        .where(DecisionJob.status == JobStatus.RUNNING, DecisionJob.claimed_at < cutoff)
+        .values(status=JobStatus.QUEUED, claimed_by=None, available_at=datetime.utcnow())
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def process_job(job_id, queue):
+    job = db.session.get(DecisionJob, job_id)
+    started = time.perf_counter()
+    try:
+        application = db.session.get(LoanApplication, job.application_id)
+        if application is None:
+            raise LookupError(f"application {job.application_id} not found")
+        # decided by an earlier job: close this one without deciding again
+        decided_now = application.status not in DECIDED
+        if decided_now:
+            approved, comment = manager_decision(application)
+            application.manager_comment = comment
+            application.status = ApplicationStatus.APPROVED if approved else ApplicationStatus.REJECTED
+        job.status = JobStatus.DONE
+        job.finished_at = datetime.utcnow()
+        job.last_error = None
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(DecisionJob, job_id)
+        job.last_error = f"{type(e).__name__}: {e}"
+        if job.attempts < job.max_attempts:
+            job.status = JobStatus.QUEUED
+            job.available_at = datetime.utcnow() + timedelta(seconds=queue.retry_delay * 2 ** (job.attempts - 1))
+            outcome = "retry"
+        else:
+            job.status = JobStatus.FAILED
+            job.finished_at = datetime.utcnow()
+            outcome = "failed"
+        db.session.commit()
+        current_app.logger.warning(f"decision job {job_id} {outcome}: {job.last_error}")
+        queue.metrics.record(outcome, time.perf_counter() - started)
+    else:
+        # the job is DONE from here on; a failure below must not requeue it
+        queue.metrics.record("done", time.perf_counter() - started, (job.finished_at - job.enqueued_at).total_seconds())
+        if not decided_now:
+            return
+        context = json.loads(job.context) if job.context else {}
+        account = application.account
+        log_activity(event="MANAGER_DECISION", user_id=account.id, user_email=account.email, application_id=application.id, loan_amount=application.requested_amount, loan_status=application.status.value, recommended_picked=application.picked_recommended, ip=context.get("ip"), user_agent=context.get("user_agent"), extra={"comment": comment})
+    finally:
+        queue.notify()
+
+
+def run_worker(worker_id, queue, stop, max_jobs=None):
+    """Claim and process jobs until stop is set (or max_jobs were handled)."""
+    handled = 0
+    last_sweep = 0.0
+    while not stop.is_set():
+        try:
+            if time.monotonic() - last_sweep > queue.lease / 2:
+                requeue_stale_jobs(queue.lease)
+                last_sweep = time.monotonic()
+            job_id = claim_job(worker_id)
+            if job_id is not None:
+                process_job(job_id, queue)
+        except Exception:
+            current_app.logger.exception(f"decision worker {worker_id} error")
+            job_id = None
+        db.session.remove()
+        if job_id is None:
+            queue.wait(queue.poll_interval)
+            continue
+        handled += 1
+        if max_jobs is not None and handled >= max_jobs:
+            break
+    db.session.remove()
+    return handled
+
+
+def queue_depth():
+    rows = db.session.execute(select(DecisionJob.status, func.count()).group_by(DecisionJob.status)).all()
+    depth = {status.value: 0 for status in JobStatus}
+    depth.update({status.value: n for status, n in rows})
+    return depth
+
+
+def latest_job(application_id):
+    return (DecisionJob.query.filter_by(application_id=application_id)
+            .order_by(DecisionJob.id.desc()).first())
+
+
+def wait_for_decision(application_id, timeout):
+    """Long-poll: return the latest job once it is DONE/FAILED or timeout passes."""
+    queue = get_decision_queue()
+    deadline = time.monotonic() + timeout
+    while True:
+        job = latest_job(application_id)
+        if job is None or job.status not in ACTIVE:
+            return job
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return job
+        db.session.rollback()  # end the read transaction so the next poll sees new commits
+        queue.wait(min(remaining, queue.poll_interval))
+
+
+@click.command("decision-worker")
+@click.option("--concurrency", type=int, default=None, help="Worker threads (DECISION_WORKERS).")
+@with_appcontext
+def decision_worker_command(concurrency):
+    """Run decision workers in this process until interrupted."""
+    queue = get_decision_queue()
+    if concurrency is not None:
+        queue.workers = concurrency
+    queue.workers = max(1, queue.workers)
+    queue.ensure_workers()
+    click.echo(f"decision workers running: {queue.workers}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        queue.stop()
@@ -0,0 +1,250 @@
+import csv
+import io
+import json
+import math
+import time
+from itertools import islice
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import insert, or_
+
+from . import db
+from .catalog import get_catalog_snapshot
+from .logger import log_activity_batch
+from .models import Account, LoanApplication, ApplicationStatus
+from .services import score_applications_batch
+
+TRUE_VALUES = ("1", "true", "yes", "on")
+
+
+def parse_csv(stream):
+    """Yield dict rows from a CSV text stream with a header line."""
+    yield from csv.DictReader(stream)
+
+
+def parse_ndjson(stream):
+    """Yield one dict per non-empty line; malformed lines yield the error instead."""
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield ValueError(f"invalid JSON: {e}")
+            continue
+        yield record if isinstance(record, dict) else ValueError("each line must be a JSON object")
+
+
+def _flag(value):
+    if isinstance(value, bool):
+        return value
+    return str(value or "").strip().lower() in TRUE_VALUES
+
+
+def _validate(record):
+    """(account key, amount, tenure, flexible) or raise ValueError with a message for the report."""
+    if isinstance(record, Exception):
+        raise record
+    account_id = record.get("account_id")
+    email = record.get("email")
+    if account_id in (None, "") and not email:
+        raise ValueError("account_id or email is required")
+    try:
+        amount = float(record.get("amount"))
+        tenure = int(float(record.get("tenure")))
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError("amount and tenure must be numbers")
+    if not math.isfinite(amount):
+        raise ValueError("amount and tenure must be numbers")
+    if amount <= 0 or tenure <= 0:
+        raise ValueError("amount and tenure must be positive")
+    try:
+        key = ("id", int(account_id)) if account_id not in (None, "") else ("email", str(email).strip())
+    except (TypeError, ValueError):
+        raise ValueError("account_id must be an integer")
+    return key, amount, tenure, _flag(record.get("flexible"))
+
+
+class IngestReport:
+    def __init__(self, max_errors):
+        self.max_errors = max_errors
+        self.received = 0
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+        self.parse_error = None  # {"row", "error"} when the input could not be read to the end
+        self.started = time.perf_counter()
+
+    def error(self, row, message):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"row": row, "error": message})
+
+    def to_dict(self):
+        elapsed = time.perf_counter() - self.started
+        return {
+            "received": self.received,
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "errors": sorted(self.errors, key=lambda e: e["row"]),
+            "errors_truncated": self.failed > len(self.errors),
+            "parse_error": self.parse_error,
+            "last_row": self.received,
+            "elapsed_s": round(elapsed, 3),
+            "rows_per_sec": round(self.received / elapsed, 1) if elapsed else None,
+            "catalog_version": get_catalog_snapshot().version,
+        }
+
+
+def _load_accounts(keys):
+    ids = {v for k, v in keys if k == "id"}
+    emails = {v for k, v in keys if k == "email"}
+    clauses = []
+    if ids:
+        clauses.append(Account.id.in_(ids))
+    if emails:
+        clauses.append(Account.email.in_(emails))
+    found = {}
+    if clauses:
+        for row in db.session.query(Account.id, Account.email, Account.monthly_income).filter(or_(*clauses)):
+            found[("id", row.id)] = row
+            found[("email", row.email)] = row
+    return found
+
+
+def _ingest_chunk(numbered, report, source):
+    valid = []
+    for row_no, record in numbered:
+        try:
+            valid.append((row_no,) + _validate(record))
+        except ValueError as e:
+            report.error(row_no, str(e))
+    if not valid:
+        return
+
+    accounts = _load_accounts({v[1] for v in valid})
+    rows = []
+    for row_no, key, amount, tenure, flexible in valid:
+        account = accounts.get(key)
+        if account is None:
+            report.error(row_no, f"unknown account {key[1]}")
+        else:
+            rows.append((row_no, account, amount, tenure, flexible))
+    if not rows:
+        return
+
+    snapshot = get_catalog_snapshot()
+    if not snapshot.options:
+        for row_no, *_ in rows:
+            report.error(row_no, "loan catalog is empty")
+        return
+    # numpy is only needed here, so keep it off the app's import path
+    from .recommender import recommend_batch, catalog_arrays
+    arrays = catalog_arrays(snapshot)
+    amounts = [r[2] for r in rows]
+    tenures = [r[3] for r in rows]
+    top, _ = recommend_batch(amounts, tenures, flexible=[r[4] for r in rows], k=1, snapshot=snapshot)
+    top = top[:, 0]
+    scores = score_applications_batch(
+        [r[1].monthly_income or 0.0 for r in rows],
+        arrays.eligibility_score[top],
+        arrays.interest_rate[top],
+        amounts,
+        tenures,
+    ).tolist()
+    loan_ids = arrays.ids[top].tolist()
+
+    mappings = [{
+        "account_id": account.id,
+        "requested_amount": amount,
+        "requested_tenure": tenure,
+        "selected_loan_id": loan_id,
+        "custom_preferences": "{}",
+        "score": round(score, 4),
+        "status": ApplicationStatus.SUGGESTED,
+        "picked_recommended": False,
+    } for (_, account, amount, tenure, _), loan_id, score in zip(rows, loan_ids, scores)]
+    # executemany with RETURNING (insertmanyvalues) gives ids back in input order
+    ids = db.session.scalars(
+        insert(LoanApplication).returning(LoanApplication.id, sort_by_parameter_order=True), mappings).all()
+    db.session.commit()
+    report.inserted += len(ids)
+
+    log_activity_batch([{
+        "event": "APPLICATION_CREATED",
+        "user_id": account.id,
+        "user_email": account.email,
+        "application_id": app_id,
+        "loan_amount": amount,
+        "loan_status": ApplicationStatus.SUGGESTED.value,
+        "extra": {"source": source},
+    } for (_, account, amount, _, _), app_id in zip(rows, ids)])
+
+
+def ingest_applications(records, chunk_size=None, source="bulk"):
+    """
+    Create applications from an iterable of dicts (account_id or email,
+    amount, tenure, optional flexible). Records are consumed lazily in chunks;
+    each chunk is scored with the vectorized recommender and score formula,
+    inserted in one transaction and logged as one activity batch.
+    Returns the report dict, including per-row errors. Input that stops
+    being readable (bad encoding, malformed CSV) ends the import after the
+    rows read so far; report["parse_error"] says where.
+    """
+    chunk_size = chunk_size or current_app.config.get("BULK_INGEST_CHUNK_SIZE", 5000)
+    report = IngestReport(current_app.config.get("BULK_INGEST_MAX_ERRORS", 1000))
+    numbered = enumerate(records, start=1)
+    while report.parse_error is None:
+        chunk = []
+        try:
+            for item in islice(numbered, chunk_size):
+                chunk.append(item)
+        except (csv.Error, UnicodeDecodeError) as e:
+            report.parse_error = {"row": report.received + len(chunk) + 1, "error": f"unreadable input: {e}"}
+        if not chunk:
+            break
+        report.received += len(chunk)
+        try:
+            _ingest_chunk(chunk, report, source)
+        except Exception:
+            db.session.rollback()
+            raise
+    return report.to_dict()
+
+
+def parser_for(fmt):
+    if fmt == "csv":
+        return parse_csv
+    if fmt == "ndjson":
+        return parse_ndjson
+    raise ValueError(f"unsupported format {fmt!r}")
+
+
+def detect_format(content_type, filename=None):
+    content_type = (content_type or "").lower()
+    if "ndjson" in content_type or "jsonl" in content_type or (filename or "").endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return "csv"
+
+
+def text_stream(binary):
+    return io.TextIOWrapper(binary, encoding="utf-8", newline="")
+
+
+@click.command("import-applications")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(["csv", "ndjson"]), help="Defaults to the file extension.")
+@click.option("--chunk-size", type=int, help="Rows per transaction (BULK_INGEST_CHUNK_SIZE).")
+@with_appcontext
+def import_applications_command(path, fmt, chunk_size):
+    """Bulk-create loan applications from a CSV or NDJSON file."""
+    fmt = fmt or detect_format(None, path)
+    with open(path, encoding="utf-8", newline="") as f:
+        report = ingest_applications(parser_for(fmt)(f), chunk_size=chunk_size, source=f"cli:{path}")
+    click.echo(json.dumps(report, indent=2))
+    if report["parse_error"]:
+        raise click.ClickException(f"stopped at row {report['parse_error']['row']}: {report['parse_error']['error']}")
+
@@ -0,0 +1,124 @@
+import json
+
+from flask import Response, stream_with_context
+from sqlalchemy import select
+
+from . import db
+from .catalog import get_catalog_snapshot
+from .models import Account, LoanApplication, ApplicationStatus
+from .utils import AppError
+
+STREAM_BATCH = 1000  # rows fetched from the cursor per round trip
+
+
+def page_args(args, default_limit, max_limit):
+    try:
+        after = int(args.get("after", 0))
+        limit = int(args.get("limit", default_limit))
+    except ValueError:
+        raise AppError("after and limit must be integers", 400)
+    if limit < 1 or limit > max_limit:
+        raise AppError(f"limit must be between 1 and {max_limit}", 400)
+    return after, limit
+
+
+def applications_page_query(after, limit, status=None, account_id=None):
+    """
+    Keyset page of applications (id > after, ascending) projected to the
+    columns the listing needs, with the applicant joined in the same query.
+    The selected loan comes from the catalog snapshot, not a join.
+    """
+    stmt = (
+        select(
+            LoanApplication.id,
+            LoanApplication.account_id,
+            Account.name,
+            Account.email,
+            LoanApplication.requested_amount,
+            LoanApplication.requested_tenure,
+            LoanApplication.selected_loan_id,
+            LoanApplication.custom_preferences,
+            LoanApplication.score,
+            LoanApplication.status,
+            LoanApplication.manager_comment,
+            LoanApplication.picked_recommended,
+            LoanApplication.created_at,
+        )
+        .join(Account, Account.id == LoanApplication.account_id)
+        .where(LoanApplication.id > after)
+        .order_by(LoanApplication.id)
+        .limit(limit)
+    )
+    if status is not None:
+        try:
+            stmt = stmt.where(LoanApplication.status == ApplicationStatus(status))
+        except ValueError:
+            raise AppError(f"Unknown status {status}", 400)
+    if account_id is not None:
+        stmt = stmt.where(LoanApplication.account_id == account_id)
+    return stmt
+
+
+def accounts_page_query(after, limit):
+    # no phone or identity documents (pan, aadhaar) in bulk exports
+    columns = [getattr(Account, name) for name in
+               ("id", "name", "email", "gender", "occupation", "monthly_income", "created_at")]
+    return select(*columns).where(Account.id > after).order_by(Account.id).limit(limit)
+
+
+def application_json(row, snapshot, dumps=json.dumps):
+    loan = snapshot.get(row.selected_loan_id)
+    # custom_preferences is stored as JSON text; embed it as-is instead of parsing
+    prefs = row.custom_preferences or "null"
+    head = dumps({
+        "id": row.id,
+        "account": {"id": row.account_id, "name": row.name, "email": row.email},
+        "requested_amount": row.requested_amount,
+        "requested_tenure": row.requested_tenure,
+        "selected_loan": {"id": loan.id, "loan_type": loan.loan_type} if loan else None,
+        "score": row.score,
+        "status": row.status.value if row.status else None,
+        "manager_comment": row.manager_comment,
+        "picked_recommended": row.picked_recommended,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+    })
+    return head[:-1] + ', "custom_preferences": ' + prefs + "}"
+
+
+def account_json(row, dumps=json.dumps):
+    data = row._asdict()
+    data["created_at"] = data["created_at"].isoformat() if data["created_at"] else None
+    return dumps(data)
+
+
+def stream_page(stmt, serialize, limit):
+    """
+    Stream {"items": [...], "next_after": id|null, "count": n} straight from
+    the cursor. Memory stays flat however large the page: rows are fetched
+    STREAM_BATCH at a time and written out as they arrive.
+    """
+    def generate():
+        count, last_id = 0, None
+        result = db.session.execute(stmt.execution_options(yield_per=STREAM_BATCH))
+        yield '{"items": ['
+        for row in result:
+            yield ("," if count else "") + serialize(row)
+            count += 1
+            last_id = row.id
+        next_after = last_id if count == limit else None
+        yield f'], "count": {count}, "next_after": {json.dumps(next_after)}}}'
+    return Response(stream_with_context(generate()), mimetype="application/json")
+
+
+def stream_applications(args, default_limit, max_limit, account_id=None):
+    """account_id, when given, overrides the account_id query arg."""
+    after, limit = page_args(args, default_limit, max_limit)
+    account_id = args.get("account_id", type=int) if account_id is None else account_id
+    stmt = applications_page_query(after, limit, status=args.get("status"), account_id=account_id)
+    snapshot = get_catalog_snapshot()
+    return stream_page(stmt, lambda row: application_json(row, snapshot), limit)
+
+
+def stream_accounts(args, default_limit, max_limit):
+    after, limit = page_args(args, default_limit, max_limit)
+    return stream_page(accounts_page_query(after, limit), account_json, limit)
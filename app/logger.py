@@ -1,38 +1,265 @@
 import os
 import csv
+import io
+import queue
+import threading
+import time
+import atexit
 from datetime import datetime
 from flask import current_app
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 import json
+from .metrics import instrumented
+
+# listeners started in this process, restarted in children after fork()
+_listeners = []
+
+class AppLogListener:
+    """
+    A QueueHandler and the QueueListener thread that drains its queue into
+    `handler`. Each start() gives the handler a new queue and listener:
+    after fork() the parent's thread is gone, and a waiter it left on the
+    old queue would swallow the child's first wake-up.
+    """
+
+    def __init__(self, handler, maxsize):
+        self.handler = handler
+        self.maxsize = maxsize
+        self.queue_handler = QueueHandler(queue.Queue(maxsize=maxsize))
+        self.listener = None
+
+    def start(self):
+        log_queue = queue.Queue(maxsize=self.maxsize)
+        self.queue_handler.queue = log_queue
+        self.listener = QueueListener(log_queue, self.handler, respect_handler_level=True)
+        self.listener.start()
+
+    def stop(self):
+        # QueueListener.stop() fails if called twice
+        listener, self.listener = self.listener, None
+        if listener is not None:
+            listener.stop()
+
+    def restart_after_fork(self):
+        if self.listener is not None:
+            self.listener = None  # its thread stayed in the parent
+            self.start()
+
+def _restart_listeners_after_fork():
+    for listener in _listeners:
+        listener.restart_after_fork()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_listeners_after_fork)
 
 # Setup application logger
 def setup_app_logger(app):
+    """
+    Install the app.log handler once. Records go through a QueueHandler to a
+    QueueListener thread that owns the RotatingFileHandler, so the file I/O
+    happens off the request thread. Calling this again is a no-op; a new app
+    using the same logger name replaces the previous app's handler.
+    """
+    listener = app.extensions.get("app_log_listener")
+    if listener is not None:
+        return listener
     log_dir = app.config.get("LOG_DIR")
     if not os.path.exists(log_dir):
         os.makedirs(log_dir, exist_ok=True)
     log_path = os.path.join(log_dir, "app.log")
-    handler = RotatingFileHandler(log_path, maxBytes=1_000_000, backupCount=3)
-    handler.setLevel(logging.INFO)
+
+    for handler in list(app.logger.handlers):
+        previous = getattr(handler, "loan_app_listener", None)
+        if previous is not None:
+            app.logger.removeHandler(handler)
+            previous.stop()
+            _listeners.remove(previous)
+
+    file_handler = RotatingFileHandler(log_path, maxBytes=1_000_000, backupCount=3)
+    file_handler.setLevel(logging.INFO)
     formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
-    handler.setFormatter(formatter)
-    app.logger.addHandler(handler)
+    file_handler.setFormatter(formatter)
+    listener = AppLogListener(file_handler, app.config.get("APP_LOG_QUEUE_SIZE", 10000))
+    queue_handler = listener.queue_handler
+    queue_handler.setLevel(logging.INFO)
+    queue_handler.loan_app_listener = listener
+    listener.start()
+    _listeners.append(listener)
+    atexit.register(listener.stop)
+
+    app.logger.addHandler(queue_handler)
     app.logger.setLevel(logging.INFO)
+    app.extensions["app_log_listener"] = listener
+    return listener
+
+class ActivityLogWriter:
+    """
+    Appends activity rows to a CSV file from a background thread.
+
+    Rows are queued by request threads and written in batches, one open()
+    and one write() per batch, when batch_size rows are waiting or
+    flush_interval seconds after the batch's first row, whichever comes
+    first. flush() and close() write what is pending straight away. When
+    the queue is full the overflow policy decides what the caller does:
+      "block"  - wait for room (backpressure on the request thread)
+      "inline" - write the row synchronously in the caller
+      "drop"   - discard the row and count it in .dropped
+    """
+
+    def __init__(self, path, max_queue=10000, batch_size=256, flush_interval=0.5, overflow="block"):
+        if overflow not in ("block", "inline", "drop"):
+            raise ValueError(f"unknown activity log overflow policy {overflow!r}")
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.written = 0
+        self.writes = 0  # file writes, one per batch
+        self._write_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._closed = False
 
+    def _ensure_started(self):
+        # threads do not survive fork(), so a pre-fork worker starts its own
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            if self._pid != os.getpid():
+                self.queue = queue.Queue(maxsize=self.queue.maxsize)
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="activity-log-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, row):
+        if self._closed:
+            self._write_rows([row])
+            return
+        self._ensure_started()
+        try:
+            self.queue.put_nowait(row)
+        except queue.Full:
+            if self.overflow == "block":
+                self.queue.put(row)
+            elif self.overflow == "inline":
+                self._write_rows([row])
+            else:
+                self.dropped += 1
+
+    def submit_many(self, rows):
+        for row in rows:
+            self.submit(row)
+
+    def _run(self):
+        q = self.queue
+        while True:
+            item = q.get()
+            # the first row opens a batch; it is written once batch_size rows
+            # are in or flush_interval has passed since, whichever comes first
+            deadline = time.monotonic() + self.flush_interval
+            batch, waiters, stop = [], [], False
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                # flush() and close() want the rows on disk now
+                if stop or waiters or len(batch) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                try:
+                    item = q.get(timeout=remaining) if remaining > 0 else q.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    self._write_rows(batch)
+                except OSError:
+                    logging.getLogger(__name__).exception("failed to write %d activity rows", len(batch))
+            for event in waiters:
+                event.set()
+            if stop:
+                return
+
+    def _write_rows(self, rows):
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerows(rows)
+        with self._write_lock:
+            with open(self.path, "a", encoding="utf-8", newline="") as f:
+                f.write(buf.getvalue())
+            self.written += len(rows)
+            self.writes += 1
+
+    def flush(self, timeout=5.0):
+        """Block until every row queued before this call is on disk."""
+        if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        self.queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout=5.0):
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            self.queue.put(None)
+            self._thread.join(timeout)
+
+    def stats(self):
+        return {"queued": self.queue.qsize(), "written": self.written, "writes": self.writes, "dropped": self.dropped}
+
+
+def init_activity_log(app):
+    path = os.path.join(app.config["LOG_DIR"], "activity.csv")
+    writer = ActivityLogWriter(
+        path,
+        max_queue=app.config.get("ACTIVITY_LOG_QUEUE_SIZE", 10000),
+        batch_size=app.config.get("ACTIVITY_LOG_BATCH_SIZE", 256),
+        flush_interval=app.config.get("ACTIVITY_LOG_FLUSH_INTERVAL", 0.5),
+        overflow=app.config.get("ACTIVITY_LOG_OVERFLOW", "block"),
+    )
+    app.extensions["activity_writer"] = writer
+    atexit.register(writer.close)
+    return writer
+
+def get_activity_writer():
+    return current_app.extensions["activity_writer"]
+
+def activity_row(event, user_id=None, user_email=None, application_id=None, loan_amount=None, loan_status=None, recommended_picked=None, login_time=None, logout_time=None, ip=None, user_agent=None, extra=None, ts=None):
+    ts = ts or datetime.utcnow().isoformat()
+    extra_str = json.dumps(extra) if extra else ""
+    return [ts, event, user_id or "", user_email or "", application_id or "", loan_amount or "", loan_status or "", bool(recommended_picked) if recommended_picked is not None else "", login_time or "", logout_time or "", ip or "", user_agent or "", extra_str]
+
+def log_activity_batch(events):
+    """
+    Queue many activity records at once; each item is a dict of log_activity
+    keyword arguments. The app logger gets one summary line per batch.
+    """
+    ts = datetime.utcnow().isoformat()
+    rows = [activity_row(ts=ts, **e) for e in events]
+    get_activity_writer().submit_many(rows)
+    if rows:
+        current_app.logger.info(f"event=BATCH rows={len(rows)} first={rows[0][1]}")
+
+@instrumented("activity.log_activity")
 def log_activity(event, user_id=None, user_email=None, application_id=None, loan_amount=None, loan_status=None, recommended_picked=None, login_time=None, logout_time=None, ip=None, user_agent=None, extra=None):
     """
-    Append a record to logs/activity.csv with fields:
+    Queue a record for logs/activity.csv (written by ActivityLogWriter) with fields:
     timestamp,event,user_id,user_email,application_id,loan_amount,loan_status,recommended_picked,login_time,logout_time,ip,user_agent,extra
     event: LOGIN, LOGOUT, APPLICATION_CREATED, MANAGER_DECISION, PICK_OPTION
     """
-    log_dir = current_app.config.get("LOG_DIR")
-    activity_csv = os.path.join(log_dir, "activity.csv")
-    ts = datetime.utcnow().isoformat()
-    extra_str = json.dumps(extra) if extra else ""
     # ensure file exists and headers present handled by create_app
-    row = [ts, event, user_id or "", user_email or "", application_id or "", loan_amount or "", loan_status or "", bool(recommended_picked) if recommended_picked is not None else "", login_time or "", logout_time or "", ip or "", user_agent or "", extra_str]
-    with open(activity_csv, "a", encoding="utf-8", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow(row)
+    row = activity_row(event, user_id, user_email, application_id, loan_amount, loan_status, recommended_picked, login_time, logout_time, ip, user_agent, extra)
+    get_activity_writer().submit(row)
     # also log to app logger
     current_app.logger.info(f"event={event} user={user_email or user_id} app={application_id} amount={loan_amount} status={loan_status} recommended_picked={recommended_picked}")
@@ -0,0 +1,306 @@
+import bisect
+import hmac
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, g, request, has_app_context, has_request_context, Response, abort
+from flask.signals import before_render_template, template_rendered
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense."""
+
+    __slots__ = ("buckets", "counts", "sum", "count", "lock")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.counts), self.sum, self.count
+
+
+class HistogramFamily:
+    """Histograms of one metric, one per label combination."""
+
+    def __init__(self, name, help, labelnames, buckets):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self.children = {}
+        self.lock = threading.Lock()
+
+    def observe(self, labels, value):
+        child = self.children.get(labels)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(labels, Histogram(self.buckets))
+        child.observe(value)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, child in sorted(self.children.items()):
+            counts, total, count = child.snapshot()
+            base = _labels(self.labelnames, labels)
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(f"{self.name}_bucket{{{base}{',' if base else ''}le=\"{le}\"}} {cumulative}")
+            suffix = f"{{{base}}}" if base else ""
+            lines.append(f"{self.name}_sum{suffix} {total!r}")
+            lines.append(f"{self.name}_count{suffix} {count}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values):
+    return ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+
+
+class RequestStats:
+    """Per-request breakdown, kept on g while the request runs."""
+
+    __slots__ = ("started", "queries", "query_seconds", "spans")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.spans = {}  # name -> [calls, seconds]
+
+    def add_span(self, name, seconds):
+        entry = self.spans.get(name)
+        if entry is None:
+            self.spans[name] = [1, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.requests = HistogramFamily(
+            "loan_app_request_duration_seconds", "Request latency by route.", ("route", "method", "status"), LATENCY_BUCKETS)
+        self.request_queries = HistogramFamily(
+            "loan_app_request_db_queries", "SQL statements executed per request.", ("route",), QUERY_COUNT_BUCKETS)
+        self.queries = HistogramFamily(
+            "loan_app_db_query_duration_seconds", "SQL statement latency.", (), QUERY_BUCKETS)
+        self.spans = HistogramFamily(
+            "loan_app_span_duration_seconds", "Time spent in instrumented functions and templates.", ("span",), LATENCY_BUCKETS)
+        self.slow_requests = 0
+        self.started = time.time()
+        self.queue_depth = None  # (monotonic expiry, decision job counts by status)
+
+    def record_span(self, name, seconds):
+        self.spans.observe((name,), seconds)
+        if has_request_context():
+            stats = g.get("_request_metrics")
+            if stats is not None:
+                stats.add_span(name, seconds)
+
+    def record_query(self, seconds):
+        self.queries.observe((), seconds)
+        if has_request_context():
+            stats = g.get("_request_metrics")
+            if stats is not None:
+                stats.queries += 1
+                stats.query_seconds += seconds
+
+    def render(self):
+        lines = []
+        for family in (self.requests, self.request_queries, self.queries, self.spans):
+            lines.extend(family.render())
+        lines.append("# TYPE loan_app_slow_requests_total counter")
+        lines.append(f"loan_app_slow_requests_total {self.slow_requests}")
+        lines.append("# TYPE loan_app_start_time_seconds gauge")
+        lines.append(f"loan_app_start_time_seconds {self.started!r}")
+        lines.extend(_app_gauges(self))
+        return "\n".join(lines) + "\n"
+
+
+def _gauge(lines, name, value, labels=""):
+    if value is not None:
+        lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+
+
+def _queue_depth(registry):
+    # a GROUP BY over decision_jobs: reused for a few seconds, not run per scrape
+    now = time.monotonic()
+    cached = registry.queue_depth
+    if cached is None or now >= cached[0]:
+        from .decisions import queue_depth
+        cached = registry.queue_depth = (now + current_app.config.get("METRICS_QUEUE_DEPTH_TTL", 5.0), queue_depth())
+    return cached[1]
+
+
+def _app_gauges(registry):
+    """Point-in-time values of the caches, queues and catalog of this app."""
+    ext = current_app.extensions
+    entries = ["# TYPE loan_app_cache_entries gauge"]
+    events = ["# TYPE loan_app_cache_events_total counter"]
+    caches = {name: ext.get(name) for name in ("recommendation_cache", "custom_options_cache", "token_cache",
+                                                 "response_cache", "fragment_cache")}
+    hasher = ext.get("password_hasher")
+    caches["credential_cache"] = getattr(hasher, "verified", None)
+    for name, cache in caches.items():
+        if cache is None:
+            continue
+        stats = cache.stats()
+        _gauge(entries, "loan_app_cache_entries", stats["size"], f'cache="{name}"')
+        for kind in ("hits", "misses", "evictions", "expirations"):
+            _gauge(events, "loan_app_cache_events_total", stats[kind], f'cache="{name}",event="{kind}"')
+    lines = entries + events
+
+    catalog = ext.get("loan_catalog")
+    if catalog is not None:
+        _gauge(lines, "loan_app_catalog_version", catalog.version)
+        _gauge(lines, "loan_app_catalog_options", len(catalog.snapshot))
+
+    writer = ext.get("activity_writer")
+    if writer is not None:
+        stats = writer.stats()
+        _gauge(lines, "loan_app_activity_log_queued", stats["queued"])
+        lines.append("# TYPE loan_app_activity_log_rows_total counter")
+        _gauge(lines, "loan_app_activity_log_rows_total", stats["written"], 'outcome="written"')
+        _gauge(lines, "loan_app_activity_log_rows_total", stats["dropped"], 'outcome="dropped"')
+
+    queue = ext.get("decision_queue")
+    if queue is not None:
+        lines.append("# TYPE loan_app_decision_jobs gauge")
+        for status, count in _queue_depth(registry).items():
+            _gauge(lines, "loan_app_decision_jobs", count, f'status="{status}"')
+        decided = queue.metrics.to_dict()
+        lines.append("# TYPE loan_app_decision_outcomes_total counter")
+        for outcome in ("enqueued", "completed", "failed", "retried"):
+            _gauge(lines, "loan_app_decision_outcomes_total", decided[outcome], f'outcome="{outcome}"')
+        _gauge(lines, "loan_app_decision_processing_seconds_total", decided["processing_seconds_total"])
+    return lines
+
+
+def get_metrics():
+    return current_app.extensions.get("metrics")
+
+
+def instrumented(name):
+    """
+    Decorator: time every call into the span histogram (and the current
+    request's breakdown). A no-op outside an app or with metrics disabled.
+    """
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            registry = current_app.extensions.get("metrics") if has_app_context() else None
+            if registry is None:
+                return fn(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                registry.record_span(name, time.perf_counter() - started)
+        return wrapper
+    return decorate
+
+
+def _route_label():
+    # the URL rule, not the path, so /loan/options/1 and /loan/options/2 share a series
+    rule = request.url_rule
+    return rule.rule if rule is not None else "<unmatched>"
+
+
+def _install_query_listeners(app, registry):
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("metrics_query_start")
+        if starts:
+            registry.record_query(time.perf_counter() - starts.pop())
+
+    from . import db
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, "before_cursor_execute", before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+
+def _slow_request_line(route, status, elapsed, stats):
+    spans = " ".join(f"{name}={seconds * 1000:.1f}ms/{calls}" for name, (calls, seconds)
+                     in sorted(stats.spans.items(), key=lambda item: -item[1][1]))
+    return (f"slow request {request.method} {route} status={status} total={elapsed * 1000:.1f}ms "
+            f"queries={stats.queries} query_time={stats.query_seconds * 1000:.1f}ms {spans}").rstrip()
+
+
+def init_metrics(app):
+    if not app.config.get("METRICS_ENABLED", True):
+        return None
+    registry = MetricsRegistry()
+    app.extensions["metrics"] = registry
+    _install_query_listeners(app, registry)
+
+    @app.before_request
+    def start_request_timer():
+        g._request_metrics = RequestStats()
+
+    @app.after_request
+    def record_request(response):
+        stats = g.pop("_request_metrics", None)
+        if stats is None:
+            return response
+        elapsed = time.perf_counter() - stats.started
+        route = _route_label()
+        registry.requests.observe((route, request.method, str(response.status_code)), elapsed)
+        registry.request_queries.observe((route,), stats.queries)
+        slow_ms = current_app.config.get("SLOW_REQUEST_MS")
+        if slow_ms is not None and elapsed * 1000 >= slow_ms:
+            registry.slow_requests += 1
+            current_app.logger.warning(_slow_request_line(route, response.status_code, elapsed, stats))
+        return response
+
+    def template_started(sender, template, context, **extra):
+        if has_request_context():
+            g.setdefault("_template_started", []).append(time.perf_counter())
+
+    def template_finished(sender, template, context, **extra):
+        starts = g.get("_template_started") if has_request_context() else None
+        if starts:
+            registry.record_span(f"template:{template.name}", time.perf_counter() - starts.pop())
+
+    before_render_template.connect(template_started, app, weak=False)
+    template_rendered.connect(template_finished, app, weak=False)
+
+    def metrics_endpoint():
+        # not behind token_required: scrapers have no account, they present METRICS_TOKEN
+        token = current_app.config.get("METRICS_TOKEN")
+        if not token:
+            abort(404)
+        supplied = request.headers.get("Authorization", "")
+        if not hmac.compare_digest(supplied.encode(), f"Bearer {token}".encode()):
+            abort(401)
+        return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+    path = app.config.get("METRICS_PATH", "/metrics")
+    if path:
+        app.add_url_rule(path, "metrics", metrics_endpoint)
+    return registry
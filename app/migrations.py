@@ -0,0 +1,79 @@
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import inspect, text
+
+from . import db
+
+
+def _dedupe_loan_types(conn):
+    # the unique loan_type index cannot be built over duplicate rows that older
+    # per-row imports may have left; keep the lowest id and repoint applications
+    dupes = conn.execute(text(
+        "SELECT loan_type, MIN(id) FROM loan_options GROUP BY loan_type HAVING COUNT(*) > 1"
+    )).all()
+    for loan_type, keep_id in dupes:
+        conn.execute(text(
+            "UPDATE loan_applications SET selected_loan_id = :keep "
+            "WHERE selected_loan_id IN (SELECT id FROM loan_options WHERE loan_type = :t AND id != :keep)"
+        ), {"keep": keep_id, "t": loan_type})
+        conn.execute(text("DELETE FROM loan_options WHERE loan_type = :t AND id != :keep"), {"keep": keep_id, "t": loan_type})
+    return len(dupes)
+
+
+def _dedupe_active_jobs(conn):
+    # the unique active-job index cannot be built while an application has two
+    # queued/running jobs; keep the oldest and fail the rest
+    dupes = conn.execute(text(
+        "SELECT application_id, MIN(id) FROM decision_jobs WHERE status IN ('QUEUED', 'RUNNING') "
+        "GROUP BY application_id HAVING COUNT(*) > 1"
+    )).all()
+    for application_id, keep_id in dupes:
+        conn.execute(text(
+            "UPDATE decision_jobs SET status = 'FAILED', last_error = 'duplicate of job ' || :keep "
+            "WHERE application_id = :a AND id != :keep AND status IN ('QUEUED', 'RUNNING')"
+        ), {"keep": keep_id, "a": application_id})
+    return len(dupes)
+
+
+def ensure_indexes():
+    """
+    Create any index declared on the models that an existing database lacks.
+    db.create_all() only builds indexes together with new tables, so databases
+    created before an index was declared are brought up to date here.
+    Returns the names of the indexes created.
+    """
+    created = []
+    for bind_key, engine in db.engines.items():
+        inspector = inspect(engine)
+        tables = set(inspector.get_table_names())
+        for table in db.metadatas[bind_key].sorted_tables:
+            if table.name not in tables:
+                continue
+            existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in existing:
+                    continue
+                with engine.begin() as conn:
+                    if table.name == "loan_options" and index.unique:
+                        removed = _dedupe_loan_types(conn)
+                        if removed:
+                            current_app.logger.warning(f"merged {removed} duplicate loan_type rows before indexing")
+                    if table.name == "decision_jobs" and index.unique:
+                        removed = _dedupe_active_jobs(conn)
+                        if removed:
+                            current_app.logger.warning(f"failed duplicate active decision jobs of {removed} applications before indexing")
+                    index.create(conn)
+                created.append(index.name)
+    if created:
+        current_app.logger.info(f"created indexes: {', '.join(created)}")
+    return created
+
+
+@click.command("upgrade-db")
+@with_appcontext
+def upgrade_db_command():
+    """Create missing tables and indexes in the configured database."""
+    db.create_all()
+    created = ensure_indexes()
+    click.echo(f"created {len(created)} index(es)" + (f": {', '.join(created)}" if created else ""))
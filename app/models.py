@@ -37,6 +37,9 @@ class Account(db.Model):
 
 class LoanOption(db.Model):
     __tablename__ = "loan_options"
+    __table_args__ = (
+        db.Index("ux_loan_options_loan_type", "loan_type", unique=True),  # catalog upsert key
+    )
     id = db.Column(db.Integer, primary_key=True)
     loan_type = db.Column(db.String(120), nullable=False)
     min_amount = db.Column(db.Float, nullable=False)
@@ -66,8 +69,44 @@ class ApplicationStatus(enum.Enum):
     REJECTED = "REJECTED"
 
 
-class LoanApplication(db.Model):
+class ApplicationMixin:
+    """Behaviour shared by live and archived applications."""
+
+    archived = False
+
+    @property
+    def preferences(self):
+        # parsed once per instance; custom_preferences is only written as JSON text
+        raw = self.custom_preferences
+        cached = self.__dict__.get("_preferences_cache")
+        if cached is None or cached[0] != raw:
+            cached = (raw, json.loads(raw) if raw else None)
+            self.__dict__["_preferences_cache"] = cached
+        return cached[1]
+
+    def to_dict(self, include_account=True):
+        return {
+            "id": self.id,
+            "account": self.account.to_dict() if include_account else {"id": self.account_id},
+            "requested_amount": self.requested_amount,
+            "requested_tenure": self.requested_tenure,
+            "selected_loan": self.selected_loan.to_dict() if self.selected_loan else None,
+            "custom_preferences": self.preferences,
+            "score": self.score,
+            "status": self.status.value,
+            "manager_comment": self.manager_comment,
+            "picked_recommended": self.picked_recommended,
+            "created_at": self.created_at.isoformat()
+        }
+
+
+class LoanApplication(ApplicationMixin, db.Model):
     __tablename__ = "loan_applications"
+    __table_args__ = (
+        db.Index("ix_loan_applications_account_created", "account_id", "created_at"),  # per-account history
+        db.Index("ix_loan_applications_status_created", "status", "created_at"),  # status queues, time ranges
+        db.Index("ix_loan_applications_status_id", "status", "id"),  # keyset pages filtered by status
+    )
     id = db.Column(db.Integer, primary_key=True)
     account_id = db.Column(db.Integer, db.ForeignKey("accounts.id"), nullable=False)
     requested_amount = db.Column(db.Float, nullable=False)
@@ -83,17 +122,83 @@ class LoanApplication(db.Model):
     account = db.relationship("Account", back_populates="applications")
     selected_loan = db.relationship("LoanOption")
 
+
+class ArchivedLoanApplication(ApplicationMixin, db.Model):
+    """
+    A decided application moved out of loan_applications by app/archive.py.
+    Lives on the "archive" bind, which may be a separate database, so it has
+    no foreign keys or relationships; account and selected_loan are looked
+    up on access.
+    """
+    __tablename__ = "loan_applications_archive"
+    __bind_key__ = "archive"
+    __table_args__ = (
+        db.Index("ix_loan_applications_archive_account_created", "account_id", "created_at"),
+    )
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # the id it had in loan_applications
+    account_id = db.Column(db.Integer, nullable=False)
+    requested_amount = db.Column(db.Float, nullable=False)
+    requested_tenure = db.Column(db.Integer, nullable=False)
+    selected_loan_id = db.Column(db.Integer, nullable=True)
+    custom_preferences = db.Column(db.Text, nullable=True)
+    score = db.Column(db.Float, default=0.0)
+    status = db.Column(db.Enum(ApplicationStatus), nullable=False)
+    created_at = db.Column(db.DateTime)
+    manager_comment = db.Column(db.String(512), nullable=True)
+    picked_recommended = db.Column(db.Boolean, default=False)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    archived = True
+
+    @property
+    def account(self):
+        return db.session.get(Account, self.account_id)
+
+    @property
+    def selected_loan(self):
+        return db.session.get(LoanOption, self.selected_loan_id) if self.selected_loan_id is not None else None
+
+
+class JobStatus(enum.Enum):
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    DONE = "DONE"
+    FAILED = "FAILED"
+
+
+class DecisionJob(db.Model):
+    """Durable queue entry for a manager decision, claimed by decision workers."""
+    __tablename__ = "decision_jobs"
+    __table_args__ = (
+        db.Index("ix_decision_jobs_status_available", "status", "available_at"),  # claim scan
+        db.Index("ix_decision_jobs_application", "application_id"),
+        # at most one queued or running job per application, so concurrent enqueues cannot both insert
+        db.Index("ux_decision_jobs_active_application", "application_id", unique=True,
+                 sqlite_where=db.text("status IN ('QUEUED', 'RUNNING')"),
+                 postgresql_where=db.text("status IN ('QUEUED', 'RUNNING')")),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    application_id = db.Column(db.Integer, db.ForeignKey("loan_applications.id"), nullable=False)
+    status = db.Column(db.Enum(JobStatus), default=JobStatus.QUEUED, nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    max_attempts = db.Column(db.Integer, default=3, nullable=False)
+    enqueued_at = db.Column(db.DateTime, default=datetime.utcnow)
+    available_at = db.Column(db.DateTime, default=datetime.utcnow)  # not claimable before this (retry backoff)
+    claimed_by = db.Column(db.String(120), nullable=True)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    context = db.Column(db.Text, nullable=True)  # JSON: request ip/user agent for the activity log
+
     def to_dict(self):
         return {
             "id": self.id,
-            "account": self.account.to_dict(),
-            "requested_amount": self.requested_amount,
-            "requested_tenure": self.requested_tenure,
-            "selected_loan": self.selected_loan.to_dict() if self.selected_loan else None,
-            "custom_preferences": json.loads(self.custom_preferences) if self.custom_preferences else None,
-            "score": self.score,
+            "application_id": self.application_id,
             "status": self.status.value,
-            "manager_comment": self.manager_comment,
-            "picked_recommended": self.picked_recommended,
-            "created_at": self.created_at.isoformat()
+            "attempts": self.attempts,
+            "max_attempts": self.max_attempts,
+            "enqueued_at": self.enqueued_at.isoformat() if self.enqueued_at else None,
+            "claimed_at": self.claimed_at.isoformat() if self.claimed_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "last_error": self.last_error,
         }
@@ -0,0 +1,107 @@
+import numpy as np
+
+from .catalog import get_catalog_snapshot
+from .catalog_index import AMOUNT_WEIGHT, TENURE_WEIGHT
+
+MAX_CELLS_PER_CHUNK = 4_000_000  # bounds the (requests x options) score matrix
+
+
+class CatalogArrays:
+    """Parallel column arrays over a catalog snapshot, in snapshot order."""
+
+    def __init__(self, snapshot):
+        options = snapshot.options
+        self.ids = np.array([o.id for o in options], dtype=np.int64)
+        self.min_amount = np.array([o.min_amount for o in options], dtype=np.float64)
+        self.max_amount = np.array([o.max_amount for o in options], dtype=np.float64)
+        self.min_tenure = np.array([o.min_tenure for o in options], dtype=np.int64)
+        self.max_tenure = np.array([o.max_tenure for o in options], dtype=np.int64)
+        self.interest_rate = np.array([o.interest_rate for o in options], dtype=np.float64)
+        self.eligibility_score = np.array([o.eligibility_score for o in options], dtype=np.float64)
+
+
+def catalog_arrays(snapshot=None):
+    snapshot = snapshot or get_catalog_snapshot()
+    return snapshot.derived("arrays", CatalogArrays)
+
+
+def score_matrix(arrays, amounts, tenures, flexible, flexibility_factor=0.15):
+    """
+    Raw (unrounded) recommend_loans scores for every request x option pair.
+    The arithmetic mirrors the scalar loop operation for operation, so
+    round(score, 4) equals the score recommend_loans reports.
+    """
+    a = amounts[:, None]
+    t = tenures[:, None]
+    amt_penalty = np.where(
+        a < arrays.min_amount, (arrays.min_amount - a) / arrays.min_amount,
+        np.where(a > arrays.max_amount, (a - arrays.max_amount) / arrays.max_amount, 0.0))
+    tenure_penalty = np.where(
+        t < arrays.min_tenure, (arrays.min_tenure - t) / arrays.min_tenure,
+        np.where(t > arrays.max_tenure, (t - arrays.max_tenure) / arrays.max_tenure, 0.0))
+    scores = arrays.eligibility_score - (amt_penalty * AMOUNT_WEIGHT + tenure_penalty * TENURE_WEIGHT)
+    return scores + np.where(flexible, flexibility_factor * 0.5, 0.0)[:, None]
+
+
+def top_k(scores, k):
+    """
+    Column indices of the k best scores per row, best first. Ties keep
+    catalog order, like the stable sort in recommend_loans. argpartition
+    avoids a full sort; rows whose k-th score is tied beyond the cut fall
+    back to a stable sort so the result is identical to exhaustive ranking.
+    """
+    n, m = scores.shape
+    k = min(k, m)
+    if k == 0:
+        return np.empty((n, 0), dtype=np.int64)
+    if k == m:
+        return np.argsort(-scores, axis=1, kind="stable")
+    picked = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    picked.sort(axis=1)
+    picked_scores = np.take_along_axis(scores, picked, axis=1)
+    order = np.take_along_axis(picked, np.argsort(-picked_scores, axis=1, kind="stable"), axis=1)
+    kth = np.take_along_axis(scores, order[:, -1:], axis=1)
+    ambiguous = (scores >= kth).sum(axis=1) > k
+    if ambiguous.any():
+        order[ambiguous] = np.argsort(-scores[ambiguous], axis=1, kind="stable")[:, :k]
+    return order
+
+
+def recommend_batch(amounts, tenures, flexible=False, k=3, flexibility_factor=0.15, snapshot=None):
+    """
+    Score many loan requests against the catalog at once.
+
+    amounts, tenures: array-likes of equal length; flexible: bool or
+    array-like of bools. Returns (indices, scores), both shaped (N, k):
+    indices point into snapshot.options (best first) and scores are the raw
+    recommend_loans scores for those options.
+    """
+    snapshot = snapshot or get_catalog_snapshot()
+    arrays = catalog_arrays(snapshot)
+    amounts = np.asarray(amounts, dtype=np.float64).ravel()
+    tenures = np.asarray(tenures, dtype=np.float64).ravel()
+    if amounts.shape != tenures.shape:
+        raise ValueError("amounts and tenures must have the same length")
+    for name, values in (("amounts", amounts), ("tenures", tenures)):
+        bad = np.flatnonzero(~np.isfinite(values))
+        if len(bad):
+            raise ValueError(f"{name}[{bad[0]}] is not a finite number")
+    tenures = tenures.astype(np.int64)
+    # np.asarray("false", dtype=bool) is True: only accept real booleans
+    flexible = np.asarray(flexible)
+    if flexible.size and flexible.dtype != np.bool_:
+        raise ValueError("flexible must be a boolean or a list of booleans")
+    flexible = np.broadcast_to(flexible.astype(bool), amounts.shape)
+
+    n, m = len(amounts), len(arrays.ids)
+    k = min(k, m)
+    indices = np.empty((n, k), dtype=np.int64)
+    scores = np.empty((n, k), dtype=np.float64)
+    step = max(1, MAX_CELLS_PER_CHUNK // max(1, m))
+    for start in range(0, n, step):
+        end = min(n, start + step)
+        chunk = score_matrix(arrays, amounts[start:end], tenures[start:end], flexible[start:end], flexibility_factor)
+        order = top_k(chunk, k)
+        indices[start:end] = order
+        scores[start:end] = np.take_along_axis(chunk, order, axis=1)
+    return indices, scores
@@ -0,0 +1,248 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from functools import wraps
+
+from flask import current_app, request, Response
+from markupsafe import Markup
+from werkzeug.http import http_date, parse_date, parse_etags, quote_etag
+
+from .cache import LRUCache
+from .catalog import get_catalog_snapshot
+
+
+class CachedResponse:
+    """A rendered 200 response: body plus the validators sent with it."""
+
+    __slots__ = ("body", "mimetype", "etag", "last_modified", "validators")
+
+    def __init__(self, body, mimetype, etag, last_modified):
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = etag
+        self.last_modified = last_modified  # unix time it was rendered
+        # formatted once; werkzeug's set_etag / make_conditional cost more than a hit
+        self.validators = [("ETag", quote_etag(etag)), ("Last-Modified", http_date(int(last_modified)))]
+
+    def not_modified(self, headers):
+        """True when the request's conditional headers match this entry."""
+        if_none_match = headers.get("If-None-Match")
+        if if_none_match is not None:
+            # If-None-Match wins over If-Modified-Since; weak comparison for GET
+            return parse_etags(if_none_match).contains_weak(self.etag)
+        if_modified_since = headers.get("If-Modified-Since")
+        if if_modified_since is not None:
+            since = parse_date(if_modified_since)
+            return since is not None and int(self.last_modified) <= since.timestamp()
+        return False
+
+    def to_response(self, cache_control, not_modified=False):
+        headers = self.validators + [("Cache-Control", cache_control)]
+        if not_modified:
+            return Response(status=304, headers=headers)
+        return Response(self.body, mimetype=self.mimetype, headers=headers)
+
+
+class DiskResponseStore:
+    """
+    Rendered pages as files in one directory, shared by every worker
+    process. Writes go through a temp file and os.replace, so readers see
+    a whole entry or none.
+    """
+
+    def __init__(self, directory, ttl=None, max_entries=10000):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.writes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        digest = hashlib.blake2b(repr(key).encode("utf-8"), digest_size=20).hexdigest()
+        return os.path.join(self.directory, digest + ".page")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                header = json.loads(f.readline())
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        if header.get("key") != repr(key):
+            return None
+        if self.ttl is not None and header["last_modified"] + self.ttl <= time.time():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return CachedResponse(body, header["mimetype"], header["etag"], header["last_modified"])
+
+    def set(self, key, entry):
+        header = {"key": repr(key), "mimetype": entry.mimetype, "etag": entry.etag, "last_modified": entry.last_modified}
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(json.dumps(header).encode("utf-8") + b"\n")
+                f.write(entry.body)
+            os.replace(tmp, self._path(key))
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+        self.writes += 1
+        if self.writes % 256 == 0:
+            self.prune()
+
+    def prune(self):
+        """Drop the oldest files beyond max_entries (query args make keys unbounded)."""
+        paths = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".page"):
+                path = os.path.join(self.directory, name)
+                try:
+                    paths.append((os.stat(path).st_mtime, path))
+                except OSError:
+                    pass
+        paths.sort()
+        for _, path in paths[:max(0, len(paths) - self.max_entries)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith(".page"):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+
+class ResponseCache:
+    """
+    Two-level page cache: a per-process LRU in front of an optional
+    DiskResponseStore. A disk hit is copied into the LRU.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None, directory=None, max_disk_entries=10000):
+        self.memory = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.disk = DiskResponseStore(directory, ttl, max_disk_entries) if directory else None
+        self.disk_hits = 0
+
+    def get(self, key):
+        entry = self.memory.get(key)
+        if entry is None and self.disk is not None:
+            entry = self.disk.get(key)
+            if entry is not None:
+                self.disk_hits += 1
+                self.memory.set(key, entry)
+        return entry
+
+    def store(self, key, response):
+        body = response.get_data()
+        entry = CachedResponse(body, response.mimetype, hashlib.blake2b(body, digest_size=16).hexdigest(), time.time())
+        self.memory.set(key, entry)
+        if self.disk is not None:
+            self.disk.set(key, entry)
+        return entry
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self):
+        stats = self.memory.stats()
+        stats["disk_hits"] = self.disk_hits
+        return stats
+
+
+def template_fingerprint(app):
+    # part of every key, so a deploy with changed templates never serves old pages
+    # from the disk store
+    folder = os.path.join(app.root_path, app.template_folder)
+    digest = hashlib.blake2b(digest_size=8)
+    for root, _, files in sorted(os.walk(folder)):
+        for name in sorted(files):
+            st = os.stat(os.path.join(root, name))
+            digest.update(f"{os.path.relpath(os.path.join(root, name), folder)}:{st.st_mtime_ns}:{st.st_size};".encode())
+    return digest.hexdigest()
+
+
+def init_response_cache(app):
+    if app.config.get("JINJA_BYTECODE_CACHE", True):
+        from jinja2 import FileSystemBytecodeCache
+        # compiled templates persist across restarts and are shared by the workers;
+        # no directory means jinja's private per-user temp directory
+        directory = app.config.get("JINJA_BYTECODE_CACHE_DIR")
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+    if not app.config.get("RESPONSE_CACHE_ENABLED", True):
+        return None
+    cache = ResponseCache(
+        maxsize=app.config.get("RESPONSE_CACHE_SIZE", 1024),
+        ttl=app.config.get("RESPONSE_CACHE_TTL", 3600),
+        directory=app.config.get("RESPONSE_CACHE_DIR"),
+        max_disk_entries=app.config.get("RESPONSE_CACHE_DIR_MAX_ENTRIES", 10000),
+    )
+    app.extensions["response_cache"] = cache
+    app.extensions["fragment_cache"] = LRUCache(maxsize=app.config.get("FRAGMENT_CACHE_SIZE", 256))
+    app.extensions["template_fingerprint"] = template_fingerprint(app)
+    return cache
+
+
+def _catalog_key(snapshot=None):
+    # the dataset's content hash, not the per-process version counter, so
+    # keys agree across workers and restarts
+    if snapshot is None:
+        snapshot = get_catalog_snapshot()
+    return snapshot.content_hash
+
+
+def cached_response(*arg_names):
+    """
+    Cache a view's GET output, keyed on the endpoint, its URL values, the
+    query args in `arg_names` and the catalog. Responses carry an ETag and
+    Last-Modified and are answered with 304 when the client's copy matches.
+    Only plain 200 responses without cookies are stored; other methods pass
+    straight through.
+    """
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            cache = current_app.extensions.get("response_cache")
+            if cache is None or request.method not in ("GET", "HEAD"):
+                return fn(*args, **kwargs)
+            key = (request.endpoint, request.script_root, tuple(sorted(kwargs.items())),
+                   tuple(request.args.get(name, "") for name in arg_names),
+                   _catalog_key(), current_app.extensions["template_fingerprint"])
+            entry = cache.get(key)
+            if entry is None:
+                response = current_app.make_response(fn(*args, **kwargs))
+                if response.status_code != 200 or response.direct_passthrough or "Set-Cookie" in response.headers:
+                    return response
+                entry = cache.store(key, response)
+            cache_control = f"public, max-age={current_app.config.get('RESPONSE_CACHE_MAX_AGE', 0)}"
+            return entry.to_response(cache_control, entry.not_modified(request.headers))
+        return wrapper
+    return decorate
+
+
+def cached_fragment(name, snapshot, render):
+    """
+    Rendered template fragment for `name` at catalog `snapshot`;
+    render(snapshot) fills a miss. Key and content come from the same
+    snapshot, so a concurrent catalog swap cannot mix them.
+    """
+    cache = current_app.extensions.get("fragment_cache")
+    if cache is None:
+        return Markup(render(snapshot))
+    key = (name, _catalog_key(snapshot), current_app.extensions["template_fingerprint"])
+    return cache.get_or_compute(key, lambda: Markup(render(snapshot)))
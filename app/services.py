@@ -1,92 +1,230 @@
-from .models import LoanOption, Account, LoanApplication, ApplicationStatus
-from . import db
-import pandas as pd
-import json
+from .models import Account, LoanApplication
+from .catalog import sync_catalog, get_catalog_snapshot, CatalogOption
+from .cache import LRUCache
+from .catalog_index import catalog_index, penalty_score
+from .affordability import emi, emi_batch, total_interest
+from .metrics import instrumented
+import bisect
+import hashlib
 import random
 
 from flask import current_app
 
+@instrumented("services.load_dataset_into_db")
 def load_dataset_into_db():
-    path = current_app.config["DATASET_PATH"]
-    df = pd.read_csv(path)
-    df = df.dropna(subset=["loan_type", "min_amount", "max_amount"])
-    df["interest_rate"] = df["interest_rate"].astype(float)
-    df["eligibility_score"] = df.get("eligibility_score", 0.5).astype(float)
-
-    for _, row in df.iterrows():
-        existing = LoanOption.query.filter_by(loan_type=row["loan_type"]).first()
-        if existing:
-            existing.min_amount = row["min_amount"]
-            existing.max_amount = row["max_amount"]
-            existing.min_tenure = int(row.get("min_tenure", existing.min_tenure if existing.min_tenure else 0))
-            existing.max_tenure = int(row.get("max_tenure", existing.max_tenure if existing.max_tenure else 0))
-            existing.interest_rate = row["interest_rate"]
-            existing.eligibility_score = row["eligibility_score"]
-        else:
-            lo = LoanOption(
-                loan_type=row["loan_type"],
-                min_amount=row["min_amount"],
-                max_amount=row["max_amount"],
-                min_tenure=int(row.get("min_tenure", 6)),
-                max_tenure=int(row.get("max_tenure", 60)),
-                interest_rate=row["interest_rate"],
-                eligibility_score=row["eligibility_score"]
-            )
-            db.session.add(lo)
-    db.session.commit()
-
-def recommend_loans(requested_amount, requested_tenure, flexible=False, flexibility_factor=0.15):
-    query = LoanOption.query
-    loans = query.all()
-    candidates = []
-    for l in loans:
-        amt_penalty = 0.0
-        if requested_amount < l.min_amount:
-            amt_penalty = (l.min_amount - requested_amount) / l.min_amount
-        elif requested_amount > l.max_amount:
-            amt_penalty = (requested_amount - l.max_amount) / l.max_amount
-
-        tenure_penalty = 0.0
-        if requested_tenure < l.min_tenure:
-            tenure_penalty = (l.min_tenure - requested_tenure) / l.min_tenure
-        elif requested_tenure > l.max_tenure:
-            tenure_penalty = (requested_tenure - l.max_tenure) / l.max_tenure
-
-        base_score = l.eligibility_score - (amt_penalty * 0.6 + tenure_penalty * 0.4)
+    # kept for scripts; the app itself syncs through app.catalog
+    return sync_catalog(force=True)
+
+def init_recommendation_cache(app):
+    app.extensions["recommendation_cache"] = LRUCache(
+        maxsize=app.config.get("RECOMMENDATION_CACHE_SIZE", 4096),
+        ttl=app.config.get("RECOMMENDATION_CACHE_TTL", 300),
+    )
+
+def get_recommendation_cache():
+    return current_app.extensions["recommendation_cache"]
+
+def _rank_catalog(snapshot, requested_amount, requested_tenure):
+    candidates = [(position, l, penalty_score(l, requested_amount, requested_tenure))
+                  for position, l in enumerate(snapshot.options)]
+    candidates.sort(key=lambda x: x[2], reverse=True)
+    return tuple(candidates)
+
+@instrumented("services.recommend_loans")
+def recommend_loans(requested_amount, requested_tenure, flexible=False, flexibility_factor=0.15, limit=None):
+    """
+    Catalog options ranked for a request, best first. With limit, only the
+    top `limit` are returned; on large catalogs those come from the interval
+    index instead of scoring every option, with identical results.
+    """
+    # One cached ranking per (amount, tenure, catalog version) serves both
+    # the flexible and the strict views of an application, and every limit.
+    # The flexibility bonus is the same for every option, but adding it can
+    # round two nearly equal scores to the same value, which then order by
+    # catalog position: so the flexible view is re-sorted before it is
+    # sliced, and a cached top-of-ranking is deepened while a row below it
+    # could still tie with the last one returned.
+    snapshot = get_catalog_snapshot()
+    bonus = flexibility_factor * 0.5
+    depth = limit
+    while True:
+        ranked = _cached_ranking(snapshot, requested_amount, requested_tenure, depth)
         if flexible:
-            base_score += flexibility_factor * 0.5
+            ranked = sorted(((p, l, s + bonus) for p, l, s in ranked), key=lambda x: (-x[2], x[0]))
+        if limit is None or not flexible or not limit or len(ranked) == len(snapshot):
+            break
+        if len(ranked) >= limit and ranked[-1][2] < ranked[limit - 1][2]:
+            break
+        depth = 2 * len(ranked)
+    if limit is not None:
+        ranked = ranked[:limit]
+    return [{"loan": l, "score": round(float(s), 4)} for _, l, s in ranked]
+
+def _cached_ranking(snapshot, requested_amount, requested_tenure, depth=None):
+    """
+    The ranking for a request, best first: all of it, or (on large
+    catalogs) at least its top `depth` rows, from the interval index.
+    A deeper call extends what is cached.
+    """
+    cache = get_recommendation_cache()
+    key = (requested_amount, requested_tenure, snapshot.version)
+    ranked = cache.get(key)
+    if ranked is None or (len(ranked) < len(snapshot) and (depth is None or len(ranked) < depth)):
+        if depth is not None and len(snapshot) >= current_app.config.get("RECOMMENDATION_INDEX_MIN_OPTIONS", 256):
+            depth = max(depth, current_app.config.get("RECOMMENDATION_LIMIT") or 0)
+            ranked = catalog_index(snapshot).top_k(requested_amount, requested_tenure, depth)
+        else:
+            ranked = _rank_catalog(snapshot, requested_amount, requested_tenure)
+        cache.set(key, ranked)
+    return ranked
 
-        candidates.append((l, base_score))
+# relative spreads around the request for custom suggestions
+CUSTOM_AMOUNT_SPREAD = (-0.25, 0.25)
+CUSTOM_TENURE_SPREAD = (-0.3, 0.3)
+CUSTOM_RATE_SPREAD = (-0.08, 0.12)
+CUSTOM_MIN_RATE = 5.0
 
-    candidates.sort(key=lambda x: x[1], reverse=True)
-    return [{"loan": c[0], "score": round(float(c[1]), 4)} for c in candidates]
+def init_custom_options_cache(app):
+    app.extensions["custom_options_cache"] = LRUCache(
+        maxsize=app.config.get("CUSTOM_OPTIONS_CACHE_SIZE", 4096),
+        ttl=app.config.get("CUSTOM_OPTIONS_CACHE_TTL", 3600),
+    )
 
-def generate_custom_options(base_loan: LoanOption, requested_amount, requested_tenure, n=3):
+def get_custom_options_cache():
+    return current_app.extensions["custom_options_cache"]
+
+def custom_options_rng(application_id, base_loan_id, requested_amount, requested_tenure, seed=0):
+    """
+    Private RNG for one (application, base loan, seed). blake2b instead of
+    hash() so the stream is identical across processes and restarts.
+    """
+    key = f"{seed}|{application_id}|{base_loan_id}|{requested_amount!r}|{requested_tenure!r}"
+    digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+    return random.Random(int.from_bytes(digest, "big"))
+
+def _with_emi(option):
+    option["emi"] = round(emi(option["amount"], option["interest_rate"], option["tenure"]), 2)
+    option["total_interest"] = round(total_interest(option["amount"], option["interest_rate"], option["tenure"]), 2)
+    return option
+
+def generate_custom_options(base_loan: CatalogOption, requested_amount, requested_tenure, n=3, rng=None):
+    # rng=None draws from the global random module (the old, unseeded behaviour)
+    rng = rng or random
     custom = []
     for i in range(n):
-        amt = max(base_loan.min_amount, min(base_loan.max_amount, requested_amount * (1 + random.uniform(-0.25, 0.25))))
-        tenure = max(base_loan.min_tenure, min(base_loan.max_tenure, int(requested_tenure * (1 + random.uniform(-0.3, 0.3)))))
-        interest = max(5.0, base_loan.interest_rate * (1 + random.uniform(-0.08, 0.12)))
-        custom.append({
+        amt = max(base_loan.min_amount, min(base_loan.max_amount, requested_amount * (1 + rng.uniform(*CUSTOM_AMOUNT_SPREAD))))
+        tenure = max(base_loan.min_tenure, min(base_loan.max_tenure, int(requested_tenure * (1 + rng.uniform(*CUSTOM_TENURE_SPREAD)))))
+        interest = max(CUSTOM_MIN_RATE, base_loan.interest_rate * (1 + rng.uniform(*CUSTOM_RATE_SPREAD)))
+        custom.append(_with_emi({
             "loan_type": f"{base_loan.loan_type} (custom {i+1})",
             "amount": round(amt, 2),
             "tenure": tenure,
             "interest_rate": round(interest, 2),
-        })
+        }))
     return custom
 
-def score_application(account: Account, loan_option: LoanOption, requested_amount, requested_tenure):
-    monthly_rate = loan_option.interest_rate / 100 / 12
-    n = max(1, requested_tenure)
-    monthly_payment = requested_amount / n + (requested_amount * monthly_rate)
-    income_factor = min(1.0, account.monthly_income / (monthly_payment * 3))
+class OptionGrid:
+    """
+    Precomputed amount x tenure x rate grid for one loan option. Amounts and
+    tenures span the option's own bounds, so every grid point is already
+    clamped; rates cover CUSTOM_RATE_SPREAD around the option's rate.
+    """
+
+    __slots__ = ("amounts", "tenures", "rates")
+
+    def __init__(self, loan: CatalogOption, size):
+        steps = [i / (size - 1) for i in range(size)] if size > 1 else [0.0]
+        self.amounts = tuple(round(loan.min_amount + (loan.max_amount - loan.min_amount) * s, 2) for s in steps)
+        self.tenures = tuple(sorted({int(round(loan.min_tenure + (loan.max_tenure - loan.min_tenure) * s)) for s in steps}))
+        low, high = CUSTOM_RATE_SPREAD
+        self.rates = tuple(round(max(CUSTOM_MIN_RATE, loan.interest_rate * (1 + low + (high - low) * s)), 2) for s in steps)
+
+def option_grid(snapshot, loan: CatalogOption, size):
+    # grids are built on first use per option and dropped with the snapshot
+    grids = snapshot.derived(("custom_grid", size), lambda _: {})
+    grid = grids.get(loan.id)
+    if grid is None:
+        grid = grids.setdefault(loan.id, OptionGrid(loan, size))
+    return grid
+
+def _grid_window(values, low, high):
+    # index range of sorted values inside [low, high]; nearest point when none are
+    lo = bisect.bisect_left(values, low)
+    hi = bisect.bisect_right(values, high)
+    if lo >= hi:
+        lo = min(lo, len(values) - 1)
+        hi = lo + 1
+    return lo, hi
+
+def grid_custom_options(base_loan: CatalogOption, grid: OptionGrid, requested_amount, requested_tenure, n=3, rng=None):
+    rng = rng or random
+    a_lo, a_hi = _grid_window(grid.amounts, requested_amount * (1 + CUSTOM_AMOUNT_SPREAD[0]), requested_amount * (1 + CUSTOM_AMOUNT_SPREAD[1]))
+    t_lo, t_hi = _grid_window(grid.tenures, requested_tenure * (1 + CUSTOM_TENURE_SPREAD[0]), requested_tenure * (1 + CUSTOM_TENURE_SPREAD[1]))
+    custom = []
+    for i in range(n):
+        custom.append(_with_emi({
+            "loan_type": f"{base_loan.loan_type} (custom {i+1})",
+            "amount": grid.amounts[rng.randrange(a_lo, a_hi)],
+            "tenure": grid.tenures[rng.randrange(t_lo, t_hi)],
+            "interest_rate": grid.rates[rng.randrange(len(grid.rates))],
+        }))
+    return custom
+
+@instrumented("services.custom_options_for")
+def custom_options_for(application: LoanApplication, base_loan: CatalogOption, n=3):
+    """
+    Custom suggestions for an application, reproducible for a given
+    CUSTOM_OPTIONS_SEED and cached per (application, base loan, catalog version).
+    """
+    config = current_app.config
+    seed = config.get("CUSTOM_OPTIONS_SEED", 0)
+    mode = config.get("CUSTOM_OPTIONS_MODE", "random")
+    size = config.get("CUSTOM_OPTIONS_GRID_SIZE", 21)
+    snapshot = get_catalog_snapshot()
+    amount, tenure = application.requested_amount, application.requested_tenure
+    key = (application.id, base_loan.id, amount, tenure, n, seed, mode, size, snapshot.version)
+
+    def compute():
+        rng = custom_options_rng(application.id, base_loan.id, amount, tenure, seed)
+        if mode == "grid":
+            options = grid_custom_options(base_loan, option_grid(snapshot, base_loan, size), amount, tenure, n, rng)
+        else:
+            options = generate_custom_options(base_loan, amount, tenure, n, rng)
+        return tuple(options)
+
+    return [dict(o) for o in get_custom_options_cache().get_or_compute(key, compute)]
+
+@instrumented("services.score_application")
+def score_application(account: Account, loan_option: CatalogOption, requested_amount, requested_tenure):
+    monthly_payment = emi(requested_amount, loan_option.interest_rate, requested_tenure)
+    income_factor = min(1.0, (account.monthly_income or 0.0) / (monthly_payment * 3))
     base_score = float(loan_option.eligibility_score) * 0.6 + income_factor * 0.4
     return round(base_score, 4)
 
+def score_applications_batch(incomes, eligibility, interest_rates, amounts, tenures):
+    """
+    score_application over arrays. EMIs come from the same cached annuity
+    factors, so round(result, 4) equals the scalar score for every row.
+    """
+    import numpy as np
+    monthly_payment = emi_batch(amounts, interest_rates, tenures)
+    income_factor = np.minimum(1.0, np.asarray(incomes, dtype=np.float64) / (monthly_payment * 3))
+    return np.asarray(eligibility, dtype=np.float64) * 0.6 + income_factor * 0.4
+
+# manager_decision's approval curve: base + slope * score, clamped to [floor, cap]
+APPROVAL_BASE = 0.3
+APPROVAL_SLOPE = 0.6
+APPROVAL_FLOOR = 0.05
+APPROVAL_CAP = 0.95
+
+def approval_probability(score, base=APPROVAL_BASE, slope=APPROVAL_SLOPE, floor=APPROVAL_FLOOR, cap=APPROVAL_CAP):
+    score = max(0.0, min(1.0, score))
+    prob = base + slope * score
+    return max(floor, min(cap, prob))
+
+@instrumented("services.manager_decision")
 def manager_decision(application: LoanApplication):
-    score = max(0.0, min(1.0, application.score))
-    prob = 0.3 + 0.6 * score
-    prob = max(0.05, min(0.95, prob))
+    prob = approval_probability(application.score)
     approved = random.random() < prob
     comment = "Approved by system-sim manager" if approved else "Rejected by system-sim manager (low credit match)"
     return approved, comment
@@ -0,0 +1,148 @@
+import gc
+import os
+import time
+
+from sqlalchemy import text
+
+from . import db
+
+
+def warm_up(app):
+    """
+    Do the first-request work up front, before the server forks or accepts
+    traffic: catalog indexes, compiled templates and a checked DB connection.
+    Returns the seconds spent per step.
+    """
+    timings = {}
+    with app.app_context():
+        started = time.perf_counter()
+        from .catalog import get_catalog_snapshot
+        from .catalog_index import catalog_index
+        from .services import option_grid
+        snapshot = get_catalog_snapshot()
+        if len(snapshot) >= app.config.get("RECOMMENDATION_INDEX_MIN_OPTIONS", 256):
+            catalog_index(snapshot)
+        if app.config.get("CUSTOM_OPTIONS_MODE", "random") == "grid":
+            size = app.config.get("CUSTOM_OPTIONS_GRID_SIZE", 21)
+            for loan in snapshot:
+                option_grid(snapshot, loan, size)
+        timings["catalog"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for name in app.jinja_env.list_templates(extensions=("html",)):
+            app.jinja_env.get_template(name)
+        timings["templates"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for engine in db.engines.values():
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            # connections must not be shared across fork(); each worker opens its own
+            engine.dispose()
+        timings["database"] = time.perf_counter() - started
+    return timings
+
+
+def freeze_heap():
+    # move everything allocated so far out of the GC's reach, so collections in
+    # the workers do not touch (and un-share) the preloaded pages
+    if hasattr(gc, "freeze"):
+        gc.collect()
+        gc.freeze()
+
+
+def warm_worker(app, connections=None):
+    """Per-worker start after fork: fresh DB pools, opened ahead of the first request."""
+    connections = app.config.get("SERVER_WARM_CONNECTIONS", 2) if connections is None else connections
+    with app.app_context():
+        for engine in db.engines.values():
+            # drop pool entries inherited from the parent without closing its sockets
+            engine.dispose(close=False)
+            opened = []
+            try:
+                for _ in range(max(0, connections)):
+                    conn = engine.connect()
+                    conn.execute(text("SELECT 1"))
+                    opened.append(conn)
+            finally:
+                for conn in opened:
+                    conn.close()  # back to this worker's pool
+
+
+def server_options(config, **overrides):
+    """gunicorn settings from the SERVER_* keys of a config object; overrides win."""
+    threads = getattr(config, "SERVER_THREADS", 4)
+    options = {
+        "bind": getattr(config, "SERVER_BIND", "127.0.0.1:8000"),
+        "workers": getattr(config, "SERVER_WORKERS", None) or (os.cpu_count() or 1) * 2 + 1,
+        "threads": threads,
+        "max_requests": getattr(config, "SERVER_MAX_REQUESTS", 10000),
+        "max_requests_jitter": getattr(config, "SERVER_MAX_REQUESTS_JITTER", 1000),
+        "timeout": getattr(config, "SERVER_TIMEOUT", 30),
+        "graceful_timeout": getattr(config, "SERVER_GRACEFUL_TIMEOUT", 30),
+        "keepalive": getattr(config, "SERVER_KEEPALIVE", 5),
+        "preload_app": getattr(config, "SERVER_PRELOAD", True),
+    }
+    options.update({k: v for k, v in overrides.items() if v is not None})
+    # jitter beyond a tenth of the limit would make recycling effectively random
+    options["max_requests_jitter"] = min(options["max_requests_jitter"], options["max_requests"] // 10)
+    options["worker_class"] = "gthread" if options["threads"] > 1 else "sync"
+    return options
+
+
+def run_server(config_object, **overrides):
+    """
+    Serve create_app(config_object) under gunicorn. With preload_app the
+    app is created and warmed once in the master and the workers are
+    forked from it, sharing its memory copy-on-write; otherwise each
+    worker builds and warms its own.
+
+    SIGHUP replaces every worker gracefully (new processes, fresh DB
+    pools); the preloaded code is kept, so deploying new code takes a
+    restart or gunicorn's USR2 re-exec. SIGTERM drains and stops. Workers
+    are recycled after max_requests (+ jitter) requests.
+    """
+    from gunicorn.app.base import BaseApplication
+    from . import create_app
+
+    class LoanAppServer(BaseApplication):
+        def __init__(self):
+            self.application = None
+            super().__init__()
+
+        def load_config(self):
+            for key, value in server_options(config_object, **overrides).items():
+                self.cfg.set(key, value)
+            self.cfg.set("post_fork", self.post_fork)
+            self.cfg.set("worker_exit", self.worker_exit)
+
+        def load(self):
+            if self.application is None:
+                app = create_app(config_object)
+                timings = warm_up(app)
+                app.logger.info("warm-up done: " + " ".join(f"{k}={v * 1000:.1f}ms" for k, v in timings.items()))
+                if self.cfg.preload_app:
+                    freeze_heap()
+                self.application = app
+            return self.application
+
+        def post_fork(self, server, worker):
+            # only set when preloaded; otherwise the worker builds the app itself
+            if self.application is not None:
+                warm_worker(self.application)
+
+        def worker_exit(self, server, worker):
+            if self.application is not None:
+                close_app(self.application)
+
+    LoanAppServer().run()
+
+
+def close_app(app):
+    """Stop this process's decision workers and flush buffered activity rows."""
+    queue = app.extensions.get("decision_queue")
+    if queue is not None:
+        queue.stop()
+    writer = app.extensions.get("activity_writer")
+    if writer is not None:
+        writer.close()
@@ -0,0 +1,243 @@
+import json
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import select
+
+from . import db
+from .models import Account, LoanApplication, LoanOption, ApplicationStatus
+from .services import APPROVAL_BASE, APPROVAL_SLOPE, APPROVAL_FLOOR, APPROVAL_CAP
+
+MAX_DRAW_CELLS = 8_000_000  # trials x applications drawn at once per shard
+UNASSIGNED = "(no loan selected)"
+
+
+class ApprovalCurve:
+    """manager_decision's score -> probability mapping, with tunable knobs."""
+
+    def __init__(self, base=APPROVAL_BASE, slope=APPROVAL_SLOPE, floor=APPROVAL_FLOOR, cap=APPROVAL_CAP):
+        self.base = base
+        self.slope = slope
+        self.floor = floor
+        self.cap = cap
+
+    def probabilities(self, scores):
+        import numpy as np
+        prob = self.base + self.slope * np.clip(scores, 0.0, 1.0)
+        return np.clip(prob, self.floor, self.cap)
+
+    def to_dict(self):
+        return {"base": self.base, "slope": self.slope, "floor": self.floor, "cap": self.cap}
+
+
+class ApplicationColumns:
+    """Applications as parallel numpy arrays; loan types are integer-coded."""
+
+    def __init__(self, ids, scores, amounts, tenures, incomes, eligibility, rates, type_codes, loan_types):
+        self.ids = ids
+        self.scores = scores
+        self.amounts = amounts
+        self.tenures = tenures
+        self.incomes = incomes
+        self.eligibility = eligibility
+        self.rates = rates
+        self.type_codes = type_codes
+        self.loan_types = loan_types
+
+    def __len__(self):
+        return len(self.ids)
+
+    def rescore(self, eligibility_weight):
+        """score_application with a different eligibility/income split."""
+        import numpy as np
+        from .affordability import emi_batch
+        payment = emi_batch(self.amounts, self.rates, self.tenures)
+        income_factor = np.minimum(1.0, self.incomes / (payment * 3))
+        return self.eligibility * eligibility_weight + income_factor * (1.0 - eligibility_weight)
+
+
+def load_application_columns(statuses=None, chunk_size=50_000):
+    """
+    Read applications (joined to their account and selected loan) in
+    columnar form, streaming rows in chunks rather than building ORM objects.
+    """
+    import numpy as np
+    stmt = (select(LoanApplication.id, LoanApplication.score, LoanApplication.requested_amount,
+                   LoanApplication.requested_tenure, Account.monthly_income, LoanOption.eligibility_score,
+                   LoanOption.interest_rate, LoanOption.loan_type)
+            .join(Account, Account.id == LoanApplication.account_id)
+            .outerjoin(LoanOption, LoanOption.id == LoanApplication.selected_loan_id)
+            .order_by(LoanApplication.id))
+    if statuses:
+        stmt = stmt.where(LoanApplication.status.in_(statuses))
+    columns = [[] for _ in range(7)]
+    type_codes, loan_types = [], {}
+    result = db.session.execute(stmt.execution_options(yield_per=chunk_size))
+    for partition in result.partitions():
+        for row in partition:
+            for column, value in zip(columns, row[:7]):
+                column.append(value)
+            loan_type = row[7] or UNASSIGNED
+            type_codes.append(loan_types.setdefault(loan_type, len(loan_types)))
+    ids, scores, amounts, tenures, incomes, eligibility, rates = columns
+    floats = lambda values: np.array([v if v is not None else 0.0 for v in values], dtype=np.float64)  # noqa: E731
+    return ApplicationColumns(
+        ids=np.array(ids, dtype=np.int64),
+        scores=floats(scores),
+        amounts=floats(amounts),
+        tenures=np.array(tenures, dtype=np.int64),
+        incomes=floats(incomes),
+        eligibility=floats(eligibility),
+        rates=floats(rates),
+        type_codes=np.array(type_codes, dtype=np.int64),
+        loan_types=list(loan_types),
+    )
+
+
+def _run_shard(probabilities, amounts, type_codes, n_types, trials, seed_seq):
+    """
+    One shard of trials. Returns (approvals, volume), each shaped
+    (trials, n_types): approved count and approved amount per loan type.
+    """
+    import numpy as np
+    rng = np.random.default_rng(seed_seq)
+    n = len(probabilities)
+    approvals = np.empty((trials, n_types), dtype=np.float64)
+    volume = np.empty((trials, n_types), dtype=np.float64)
+    block = max(1, MAX_DRAW_CELLS // max(1, n))
+    for start in range(0, trials, block):
+        end = min(trials, start + block)
+        # one uniform per (trial, application): approved when below its probability
+        rows, cols = np.nonzero(rng.random((end - start, n)) < probabilities)
+        keys = rows * n_types + type_codes[cols]
+        cells = (end - start) * n_types
+        approvals[start:end] = np.bincount(keys, minlength=cells).reshape(end - start, n_types)
+        volume[start:end] = np.bincount(keys, weights=amounts[cols], minlength=cells).reshape(end - start, n_types)
+    return approvals, volume
+
+
+def _interval(samples, confidence):
+    import numpy as np
+    tail = (1.0 - confidence) / 2 * 100
+    low, high = np.percentile(samples, [tail, 100 - tail])
+    return float(low), float(high)
+
+
+def simulate_approvals(columns, trials=1000, seed=0, curve=None, eligibility_weight=None,
+                       workers=1, trials_per_shard=250, confidence=0.95):
+    """
+    Replay manager_decision over `columns` for `trials` independent trials.
+
+    Trials are split into fixed-size shards, each with its own child of
+    SeedSequence(seed), so results depend only on the seed and
+    trials_per_shard, not on the number of worker processes.
+    """
+    import numpy as np
+    if trials < 1 or trials_per_shard < 1:
+        raise ValueError("trials and trials_per_shard must be positive")
+    curve = curve or ApprovalCurve()
+    scores = columns.rescore(eligibility_weight) if eligibility_weight is not None else columns.scores
+    probabilities = curve.probabilities(scores)
+    n_types = len(columns.loan_types)
+    shard_sizes = [min(trials_per_shard, trials - start) for start in range(0, trials, trials_per_shard)]
+    seeds = np.random.SeedSequence(seed).spawn(len(shard_sizes))
+    args = [(probabilities, columns.amounts, columns.type_codes, n_types, size, s) for size, s in zip(shard_sizes, seeds)]
+
+    started = time.perf_counter()
+    if workers > 1 and len(args) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            shards = list(pool.map(_run_shard, *zip(*args)))
+    else:
+        shards = [_run_shard(*a) for a in args]
+    elapsed = time.perf_counter() - started
+    approvals = np.concatenate([a for a, _ in shards]) if shards else np.zeros((0, n_types))
+    volume = np.concatenate([v for _, v in shards]) if shards else np.zeros((0, n_types))
+
+    counts = np.bincount(columns.type_codes, minlength=n_types)
+    requested = np.bincount(columns.type_codes, weights=columns.amounts, minlength=n_types)
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+
+    def summarize(name, size, requested_total, approved, booked, expected):
+        rates = approved / size if size else np.zeros(len(approved))
+        mean = float(rates.mean()) if len(rates) else 0.0
+        stderr = float(rates.std(ddof=1) / math.sqrt(len(rates))) if len(rates) > 1 else 0.0
+        return {
+            "loan_type": name,
+            "applications": int(size),
+            "requested_volume": round(float(requested_total), 2),
+            "expected_approval_rate": round(float(expected), 6),
+            "approval_rate_mean": round(mean, 6),
+            "approval_rate_std": round(float(rates.std(ddof=1)) if len(rates) > 1 else 0.0, 6),
+            "approval_rate_interval": [round(v, 6) for v in _interval(rates, confidence)] if len(rates) else None,
+            "approval_rate_mean_ci": [round(mean - z * stderr, 6), round(mean + z * stderr, 6)],
+            "approved_volume_mean": round(float(booked.mean()), 2) if len(booked) else 0.0,
+            "approved_volume_interval": [round(v, 2) for v in _interval(booked, confidence)] if len(booked) else None,
+        }
+
+    expected_by_type = np.bincount(columns.type_codes, weights=probabilities, minlength=n_types)
+    by_type = [
+        summarize(name, counts[i], requested[i], approvals[:, i], volume[:, i],
+                  expected_by_type[i] / counts[i] if counts[i] else 0.0)
+        for i, name in enumerate(columns.loan_types)
+    ]
+    total = summarize("ALL", len(columns), requested.sum(), approvals.sum(axis=1), volume.sum(axis=1),
+                      probabilities.mean() if len(columns) else 0.0)
+    return {
+        "seed": seed,
+        "trials": trials,
+        "trials_per_shard": trials_per_shard,
+        "workers": workers,
+        "confidence": confidence,
+        "curve": curve.to_dict(),
+        "eligibility_weight": eligibility_weight,
+        "elapsed_s": round(elapsed, 3),
+        "overall": total,
+        "by_loan_type": sorted(by_type, key=lambda r: -r["applications"]),
+    }
+
+
+def print_simulation(report, out=click.echo):
+    out(f"trials={report['trials']} seed={report['seed']} workers={report['workers']} "
+        f"curve={report['curve']} eligibility_weight={report['eligibility_weight']} ({report['elapsed_s']} s)")
+    pct = int(report["confidence"] * 100)
+    out(f"{'loan type':<28} {'apps':>9} {'expected':>9} {'mean':>9} {f'{pct}% interval':>21} {'approved volume (mean)':>24}")
+    for row in report["by_loan_type"] + [report["overall"]]:
+        low, high = row["approval_rate_interval"] or (0.0, 0.0)
+        out(f"{row['loan_type'][:28]:<28} {row['applications']:>9} {row['expected_approval_rate']:>9.4f} "
+            f"{row['approval_rate_mean']:>9.4f} {f'[{low:.4f}, {high:.4f}]':>21} {row['approved_volume_mean']:>24,.2f}")
+
+
+@click.command("simulate-approvals")
+@click.option("--trials", type=click.IntRange(min=1), default=1000, show_default=True)
+@click.option("--seed", type=int, default=0, show_default=True)
+@click.option("--workers", type=click.IntRange(min=1), default=1, show_default=True, help="Processes to shard trials across.")
+@click.option("--trials-per-shard", type=click.IntRange(min=1), default=250, show_default=True)
+@click.option("--status", "statuses", multiple=True, type=click.Choice([s.name for s in ApplicationStatus]),
+              help="Only applications in these statuses (repeatable). Default: all.")
+@click.option("--base", type=float, default=APPROVAL_BASE, show_default=True)
+@click.option("--slope", type=float, default=APPROVAL_SLOPE, show_default=True)
+@click.option("--floor", type=float, default=APPROVAL_FLOOR, show_default=True)
+@click.option("--cap", type=float, default=APPROVAL_CAP, show_default=True)
+@click.option("--eligibility-weight", type=float, default=None,
+              help="Re-score with this eligibility weight (income gets the rest) instead of the stored score.")
+@click.option("--confidence", type=float, default=0.95, show_default=True)
+@click.option("--json", "as_json", is_flag=True, help="Print the full report as JSON.")
+@with_appcontext
+def simulate_approvals_command(trials, seed, workers, trials_per_shard, statuses, base, slope, floor, cap,
+                               eligibility_weight, confidence, as_json):
+    """Monte Carlo approval rates and booked volume per loan type."""
+    started = time.perf_counter()
+    columns = load_application_columns([ApplicationStatus[s] for s in statuses] or None)
+    current_app.logger.info(f"simulate-approvals loaded {len(columns)} applications in {time.perf_counter() - started:.2f}s")
+    report = simulate_approvals(columns, trials=trials, seed=seed, curve=ApprovalCurve(base, slope, floor, cap),
+                                eligibility_weight=eligibility_weight, workers=workers,
+                                trials_per_shard=trials_per_shard, confidence=confidence)
+    if as_json:
+        click.echo(json.dumps(report, indent=2))
+    else:
+        print_simulation(report)
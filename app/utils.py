@@ -1,10 +1,18 @@
-from flask import jsonify, current_app, request
+from flask import jsonify, current_app, request, has_app_context, g
 from werkzeug.exceptions import HTTPException
 import bcrypt
 import jwt
+import hmac
+import hashlib
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from datetime import datetime, timedelta
 from config import Config
 from functools import wraps
+from .cache import LRUCache
+from .metrics import instrumented
 
 class AppError(Exception):
     def __init__(self, message, code=400):
@@ -32,10 +40,15 @@ def register_error_handlers(app):
         return response
 
 # bcrypt helpers (use bcrypt only)
-def hash_password(password: str) -> str:
+def _configured_rounds():
+    if has_app_context():
+        return current_app.config.get("BCRYPT_LOG_ROUNDS", Config.BCRYPT_LOG_ROUNDS)
+    return Config.BCRYPT_LOG_ROUNDS
+
+def hash_password(password: str, rounds: int = None) -> str:
     if isinstance(password, str):
         password = password.encode("utf-8")
-    hashed = bcrypt.hashpw(password, bcrypt.gensalt())
+    hashed = bcrypt.hashpw(password, bcrypt.gensalt(rounds or _configured_rounds()))
     return hashed.decode("utf-8")
 
 def check_password(password: str, hashed: str) -> bool:
@@ -45,6 +58,97 @@ def check_password(password: str, hashed: str) -> bool:
         hashed = hashed.encode("utf-8")
     return bcrypt.checkpw(password, hashed)
 
+def password_needs_rehash(hashed: str, rounds: int = None) -> bool:
+    # bcrypt hashes look like $2b$12$<salt+digest>; the second field is the cost
+    try:
+        cost = int(hashed.split("$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return True
+    return cost != (rounds or _configured_rounds())
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a dedicated, bounded pool so a login storm cannot occupy
+    every request worker with hashing. At most `workers` hashes run at once
+    and at most `max_pending` more may wait; beyond that callers get a 503
+    instead of queueing without limit.
+
+    Successful verifications are remembered for credential_ttl seconds,
+    keyed by an HMAC of (stored hash, password) under SECRET_KEY, so a
+    repeated login skips bcrypt. Failed checks are never cached, and a
+    rehash or password change produces a new key.
+    """
+
+    def __init__(self, workers=4, max_pending=64, executor="thread", credential_ttl=300, credential_cache_size=10000, secret="", timeout=30.0):
+        self.workers = workers
+        self.executor_kind = executor
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._secret = secret.encode("utf-8") if isinstance(secret, str) else secret
+        self.verified = LRUCache(maxsize=credential_cache_size, ttl=credential_ttl) if credential_ttl else None
+
+    def _get_executor(self):
+        # pools do not survive fork(); each worker process builds its own
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    cls = ProcessPoolExecutor if self.executor_kind == "process" else ThreadPoolExecutor
+                    self._executor = cls(max_workers=self.workers)
+                    self._pid = os.getpid()
+        return self._executor
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise AppError("Too many concurrent password operations, retry shortly", 503)
+        try:
+            return self._get_executor().submit(fn, *args).result(timeout=self.timeout)
+        finally:
+            self._slots.release()
+
+    def _cache_key(self, password, hashed):
+        return hmac.new(self._secret, f"{hashed}\0{password}".encode("utf-8"), hashlib.sha256).digest()
+
+    def hash(self, password, rounds):
+        return self._run(hash_password, password, rounds)
+
+    def verify(self, password, hashed):
+        key = self._cache_key(password, hashed) if self.verified is not None else None
+        if key is not None and self.verified.get(key):
+            return True
+        ok = self._run(check_password, password, hashed)
+        if ok and key is not None:
+            self.verified.set(key, True)
+        return ok
+
+    def shutdown(self):
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=False)
+
+
+def init_password_hasher(app):
+    hasher = PasswordHasher(
+        workers=app.config.get("PASSWORD_HASH_WORKERS", 4),
+        max_pending=app.config.get("PASSWORD_HASH_MAX_PENDING", 64),
+        executor=app.config.get("PASSWORD_HASH_EXECUTOR", "thread"),
+        credential_ttl=app.config.get("CREDENTIAL_CACHE_TTL", 300),
+        credential_cache_size=app.config.get("CREDENTIAL_CACHE_SIZE", 10000),
+        secret=app.config["SECRET_KEY"],
+    )
+    app.extensions["password_hasher"] = hasher
+    return hasher
+
+@instrumented("auth.hash_password_offloaded")
+def hash_password_offloaded(password: str) -> str:
+    return current_app.extensions["password_hasher"].hash(password, _configured_rounds())
+
+@instrumented("auth.verify_password")
+def verify_password(password: str, hashed: str) -> bool:
+    return current_app.extensions["password_hasher"].verify(password, hashed)
+
 # JWT helpers
 def create_token(identity: dict):
 
@@ -60,18 +164,48 @@ def create_token(identity: dict):
     token = jwt.encode(payload, secret, algorithm=algo)
     return token
 
-def decode_token(token: str):
+def _decode_payload(token: str):
     secret = current_app.config.get("JWT_SECRET")
     algo = current_app.config.get("JWT_ALGORITHM", "HS256")
     try:
         payload = jwt.decode(token, secret, algorithms=[algo])
-        user_id = int(payload.get("sub"))
-        return user_id
+        return int(payload.get("sub")), payload.get("exp")
     except jwt.ExpiredSignatureError:
         raise AppError("Token expired", 401)
     except Exception as e:
         raise AppError(f"Invalid token {e}", 401)
 
+def decode_token(token: str):
+    return _decode_payload(token)[0]
+
+def init_token_cache(app):
+    app.extensions["token_cache"] = LRUCache(
+        maxsize=app.config.get("TOKEN_CACHE_SIZE", 10000),
+        ttl=app.config.get("TOKEN_CACHE_TTL", 60),
+    )
+
+def authenticate_token(token: str):
+    """
+    decode_token with a cache of verified tokens. An entry never outlives the
+    token's own exp, so expiry is still enforced; bad tokens are not cached.
+    """
+    cache = current_app.extensions["token_cache"]
+    user_id = cache.get(token)
+    if user_id is not None:
+        return user_id
+    user_id, exp = _decode_payload(token)
+    ttl = cache.ttl
+    if exp is not None:
+        remaining = exp - time.time()
+        ttl = remaining if ttl is None else min(ttl, remaining)
+    if ttl is None or ttl > 0:
+        cache.set(token, user_id, ttl=ttl)
+    return user_id
+
+def forget_token(token: str):
+    """Drop a token from the verified-token cache (on logout)."""
+    current_app.extensions["token_cache"].pop(token)
+
 def get_token_from_request():
     # check Authorization header first, then cookie
     auth = request.headers.get("Authorization", None)
@@ -86,12 +220,30 @@ def token_required(fn):
         token = get_token_from_request()
         if not token:
             raise AppError("Missing token", 401)
-        user = decode_token(token)
-        if not user:
+        user_id = authenticate_token(token)  # returns int
+        if not user_id:
             raise AppError("Invalid authentication", 401)
         # attach user to flask.g for route usage
-        from flask import g
-        user_id = decode_token(token)  # returns int
         g.current_user = user_id
         return fn(*args, **kwargs)
     return wrapper
+
+def is_admin(account):
+    return account.email.lower() in current_app.config.get("ADMIN_EMAILS", ())
+
+def admin_required(fn):
+    """Back-office only; goes under @token_required."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not is_admin(current_account()):
+            raise AppError("Forbidden", 403)
+        return fn(*args, **kwargs)
+    return wrapper
+
+def current_account():
+    """The authenticated Account, loaded at most once per request."""
+    account = g.get("current_account")
+    if account is None:
+        from .models import Account
+        account = g.current_account = Account.query.get_or_404(g.current_user)
+    return account
@@ -0,0 +1,75 @@
+"""
+EMI / affordability maths on large inputs.
+
+Compares the old flat approximation, a direct NumPy annuity formula, and
+emi_batch (cached factor per distinct (rate, tenure) pair), plus bulk
+scoring, the scalar path and full amortization schedules.
+
+    python -m benchmarks.bench_affordability --rows 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.affordability import amortization_schedules, annuity_factor, emi, emi_batch
+from app.services import score_applications_batch
+
+
+def clock(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - t0, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--scalar-rows", type=int, default=100_000)
+    parser.add_argument("--schedule-rows", type=int, default=10_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    n = args.rows
+    amounts = rng.uniform(5_000, 5_000_000, n).round(2)
+    rates = rng.choice([8.5, 9.9, 10.0, 14.5, 16.0], n)
+    tenures = rng.choice([6, 12, 24, 36, 60, 120, 240, 360], n)
+    incomes = rng.uniform(20_000, 200_000, n)
+    eligibility = rng.choice([0.5, 0.6, 0.65, 0.7, 0.8], n)
+
+    def old_formula():
+        r = rates / 100 / 12
+        return amounts / np.maximum(1, tenures) + amounts * r
+
+    def direct():
+        r = rates / 100 / 12
+        return amounts * r / (1.0 - (1.0 + r) ** -np.maximum(1, tenures))
+
+    rows = []
+    rows.append(("old flat approximation", *clock(old_formula)))
+    rows.append(("direct numpy annuity", *clock(direct)))
+    annuity_factor.cache_clear()
+    rows.append(("emi_batch (cold factor cache)", *clock(lambda: emi_batch(amounts, rates, tenures))))
+    rows.append(("emi_batch (warm)", *clock(lambda: emi_batch(amounts, rates, tenures))))
+    rows.append(("score_applications_batch", *clock(lambda: score_applications_batch(incomes, eligibility, rates, amounts, tenures))))
+
+    m = args.scalar_rows
+    a, r, t = amounts[:m].tolist(), rates[:m].tolist(), tenures[:m].tolist()
+    scalar_s, scalar = clock(lambda: [emi(x, y, z) for x, y, z in zip(a, r, t)])
+
+    k = args.schedule_rows
+    schedule_s, schedules = clock(lambda: amortization_schedules(amounts[:k], rates[:k], tenures[:k]))
+
+    batch = rows[3][2]
+    print(f"rows: {n:,}  distinct (rate, tenure) pairs: {len(set(zip(rates.tolist(), tenures.tolist())))}")
+    for name, seconds, _ in rows:
+        print(f"{name:<32} {seconds * 1000:9.1f} ms  ({n / seconds / 1e6:6.1f} M rows/s)")
+    print(f"{'scalar emi() loop':<32} {scalar_s * 1000:9.1f} ms  ({m / scalar_s / 1e6:6.1f} M rows/s, {m:,} rows)")
+    print(f"{'amortization_schedules':<32} {schedule_s * 1000:9.1f} ms  ({k:,} loans x {schedules['balance'].shape[1]} months)")
+    print(f"batch == scalar (bitwise)        : {bool(np.array_equal(batch[:m], np.array(scalar)))}")
+    print(f"max |batch - direct| / emi        : {float(np.max(np.abs(batch - rows[1][2]) / batch)):.2e}")
+    print(f"schedules pay off (max |balance|) : {float(np.abs(schedules['balance'][:, -1]).max()):.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+analyze_logs.py engines on a generated activity log.
+
+Each engine runs in its own process so wall time and peak RSS are isolated.
+The incremental cases show the cost of a rerun after a small append.
+
+    python -m benchmarks.bench_analyze_logs --rows 10000000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.common import write_synthetic_activity
+from config import BASE_DIR
+
+LEGACY = (
+    "import sys, analyze_logs as a\n"
+    "a.activity_path = lambda: sys.argv[1]\n"
+    "rows = a.load_activity()\n"
+    "a.analyze_recommended_pick(rows)\n"
+    "a.analyze_logins(rows)\n"
+)
+
+
+def run(cmd):
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=BASE_DIR, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    out = proc.stdout.read().decode()
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    elapsed = time.perf_counter() - t0
+    if proc.returncode:
+        raise SystemExit(f"{cmd} failed:\n{out}")
+    return elapsed, usage.ru_maxrss / 1024, out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--append", type=int, default=10_000, help="rows appended before the incremental rerun")
+    parser.add_argument("--skip-legacy", action="store_true", help="skip the load-everything baseline")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="loan-logs-")
+    path = os.path.join(workdir, "activity.csv")
+    t0 = time.perf_counter()
+    write_synthetic_activity(path, args.rows)
+    print(f"generated {args.rows} rows ({os.path.getsize(path) / 1e6:.0f} MB) in {time.perf_counter() - t0:.1f}s")
+
+    parquet_dir = os.path.join(workdir, "parquet")
+    cases = []
+    if not args.skip_legacy:
+        cases.append(("legacy load_activity", [sys.executable, "-c", LEGACY, path]))
+    cases += [
+        ("stream (csv.reader, one pass)", [sys.executable, "analyze_logs.py", "--path", path, "--engine", "stream"]),
+        ("pandas chunked, pruned columns", [sys.executable, "analyze_logs.py", "--path", path, "--engine", "pandas"]),
+        ("compact to parquet", [sys.executable, "analyze_logs.py", "--path", path, "--engine", "parquet",
+                                "--compact", "--parquet-dir", parquet_dir]),
+        ("query compacted parquet", [sys.executable, "analyze_logs.py", "--engine", "parquet", "--parquet-dir", parquet_dir]),
+    ]
+    print(f"{'engine':<34} {'wall s':>8} {'peak RSS MB':>12}")
+    outputs = {}
+    for name, cmd in cases:
+        elapsed, rss, out = run(cmd)
+        outputs[name] = [l for l in out.splitlines() if not l.startswith("Compacted")]
+        print(f"{name:<34} {elapsed:>8.2f} {rss:>12.0f}")
+    reference = next(iter(outputs.values()))
+    print("all engines agree:", all(o == reference for o in outputs.values()))
+    print("\n".join(reference))
+
+    # incremental mode: full first run, then a rerun after a small append
+    state = os.path.join(workdir, "state.json")
+    incremental = [sys.executable, "analyze_logs.py", "--path", path, "--incremental", "--state", state]
+    elapsed, rss, _ = run(incremental)
+    print(f"{'incremental, first run':<34} {elapsed:>8.2f} {rss:>12.0f}")
+    write_synthetic_activity(path, args.append, seed=1, header=False, start=datetime(2025, 2, 1))
+    elapsed, rss, _ = run(incremental)
+    print(f"{f'incremental, +{args.append} rows':<34} {elapsed:>8.2f} {rss:>12.0f}")
+    elapsed, rss, _ = run(incremental + ["--rollup", "hour"])
+    print(f"{'incremental, no new rows + rollup':<34} {elapsed:>8.2f} {rss:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Walk GET /api/applications with keyset pages over a large seeded table and
+compare a page against the ORM offset + to_dict() approach.
+
+    python -m benchmarks.bench_api_pagination --rows 1000000 --limit 500
+"""
+import argparse
+import json
+import resource
+import shutil
+import time
+
+from sqlalchemy import event
+
+from app import db
+from app.models import LoanApplication, ApplicationStatus
+from benchmarks.common import make_app, seed_applications, login_client
+
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def count_queries(app, fn):
+    counter = {"n": 0}
+
+    def on_execute(*_):
+        counter["n"] += 1
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        result = fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+    return result, counter["n"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=500)
+    parser.add_argument("--status", default="APPROVED")
+    args = parser.parse_args()
+
+    app, workdir = make_app(BCRYPT_LOG_ROUNDS=4, ADMIN_EMAILS=["bench@example.com"])  # the walk covers every account
+    t0 = time.perf_counter()
+    seed_applications(app, args.rows)
+    print(f"seeded {args.rows} applications in {time.perf_counter() - t0:.1f}s")
+    client = login_client(app)
+
+    # full keyset walk
+    rss_before = rss_mb()
+    pages, rows, after = 0, 0, 0
+    page_times = []
+    t0 = time.perf_counter()
+    while True:
+        p0 = time.perf_counter()
+        body = client.get(f"/api/applications?status={args.status}&limit={args.limit}&after={after}").data
+        page_times.append(time.perf_counter() - p0)
+        page = json.loads(body)
+        pages += 1
+        rows += page["count"]
+        if page["next_after"] is None:
+            break
+        after = page["next_after"]
+    elapsed = time.perf_counter() - t0
+    page_times.sort()
+    print(f"keyset walk: {pages} pages, {rows} rows in {elapsed:.2f}s ({rows / elapsed:,.0f} rows/s)")
+    print(f"  page latency p50 {page_times[len(page_times) // 2] * 1000:.2f} ms, "
+          f"max {page_times[-1] * 1000:.2f} ms; peak RSS +{rss_mb() - rss_before:.0f} MB")
+
+    _, keyset_queries = count_queries(app, lambda: client.get(f"/api/applications?status={args.status}&limit={args.limit}&after={after // 2}").data)
+
+    # the pre-existing way: ORM offset page + to_dict() per row (lazy account/selected_loan loads)
+    def orm_page(offset):
+        with app.app_context():
+            items = (LoanApplication.query.filter_by(status=ApplicationStatus(args.status))
+                     .order_by(LoanApplication.id).offset(offset).limit(args.limit).all())
+            return json.dumps([a.to_dict() for a in items])
+    for label, offset in (("first page", 0), ("middle page", rows // 2)):
+        t0 = time.perf_counter()
+        _, queries = count_queries(app, lambda: orm_page(offset))
+        print(f"ORM offset + to_dict, {label}: {(time.perf_counter() - t0) * 1000:.1f} ms, {queries} queries")
+    print(f"keyset API page: {keyset_queries} queries (+ auth/account checks)")
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
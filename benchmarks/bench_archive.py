@@ -0,0 +1,146 @@
+"""
+Hot-path queries before and after archiving a long application history.
+
+Seeds `--rows` applications spread over two years (90% decided), times
+the queries the request path runs against loan_applications, archives
+everything decided and older than `--older-than-days` with the same code
+as `flask archive-applications`, VACUUMs, and times the queries again.
+Also reports the main and archive database file sizes and the archiving
+rate.
+
+    python -m benchmarks.bench_archive --rows 5000000
+    python -m benchmarks.bench_archive --rows 5000000 --same-database
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import make_app, seed_applications, summarize, timed, print_table
+
+
+def hot_queries(app, repeat, seed=0):
+    """name -> zero-argument callable, each one request-path query."""
+    from sqlalchemy import select, func
+    from sqlalchemy.orm import joinedload
+    from app import db
+    from app.listing import applications_page_query
+    from app.models import LoanApplication, ApplicationStatus
+
+    rng = random.Random(seed)
+    with app.app_context():
+        active_ids = db.session.execute(
+            select(LoanApplication.id).where(LoanApplication.status.in_([ApplicationStatus.PENDING, ApplicationStatus.SUGGESTED]))
+            .order_by(LoanApplication.id.desc()).limit(5000)).scalars().all()
+        max_account = db.session.execute(select(func.max(LoanApplication.account_id))).scalar()
+        account_ids = [rng.randrange(1, max_account + 1) for _ in range(repeat)]
+        picks = [rng.choice(active_ids) for _ in range(repeat)]
+
+    def load_active():
+        app_id = picks[rng.randrange(len(picks))]
+        db.session.query(LoanApplication).options(joinedload(LoanApplication.account)).filter_by(id=app_id).first()
+        db.session.rollback()
+
+    def account_history():
+        db.session.execute(select(LoanApplication.id, LoanApplication.status, LoanApplication.created_at)
+                           .where(LoanApplication.account_id == account_ids[rng.randrange(len(account_ids))])
+                           .order_by(LoanApplication.created_at.desc()).limit(20)).all()
+        db.session.rollback()
+
+    def pending_queue():
+        db.session.execute(select(LoanApplication.id).where(LoanApplication.status == ApplicationStatus.PENDING)
+                           .order_by(LoanApplication.created_at).limit(50)).all()
+        db.session.rollback()
+
+    def status_counts():
+        db.session.execute(select(LoanApplication.status, func.count()).group_by(LoanApplication.status)).all()
+        db.session.rollback()
+
+    def pending_page():
+        db.session.execute(applications_page_query(0, 100, status="PENDING")).all()
+        db.session.rollback()
+
+    def insert_application():
+        db.session.add(LoanApplication(account_id=account_ids[0], requested_amount=100000.0, requested_tenure=24,
+                                       status=ApplicationStatus.PENDING))
+        db.session.commit()
+
+    return {
+        "load active application by id": load_active,
+        "account history (20 newest)": account_history,
+        "PENDING queue (50 oldest)": pending_queue,
+        "PENDING keyset page (100)": pending_page,
+        "count by status": status_counts,
+        "insert + commit application": insert_application,
+    }
+
+
+def measure(app, label, repeat):
+    from app import db
+    rows = []
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()  # fresh connections, so no page cache carries over
+        for name, query in hot_queries(app, repeat).items():
+            n = 5 if name == "count by status" else repeat
+            query()
+            rows.append(summarize(f"{label:<7} {name}", timed(query, n)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--accounts", type=int, default=50_000)
+    parser.add_argument("--older-than-days", type=int, default=180)
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--same-database", action="store_true", help="archive table in the main database instead of archive.db")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary directory")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="loan-archive-")
+    overrides = {"METRICS_ENABLED": False, "DECISION_WORKERS": 0}
+    if not args.same_database:
+        overrides["ARCHIVE_DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'archive.db')}"
+    try:
+        app, _ = make_app(workdir, **overrides)
+        from app import db
+        from app.archive import archive_applications, database_file_sizes, vacuum_main_database
+
+        started = time.perf_counter()
+        seed_applications(app, args.rows, accounts=args.accounts,
+                          start=datetime.utcnow() - timedelta(days=730), days=730)
+        print(f"seeded {args.rows} applications in {time.perf_counter() - started:.1f}s")
+        with app.app_context():
+            sizes_before = database_file_sizes()
+        before = measure(app, "before", args.repeat)
+
+        with app.app_context():
+            report = archive_applications(older_than_days=args.older_than_days, batch_size=args.batch_size)
+            sizes_archived = database_file_sizes()
+            started = time.perf_counter()
+            vacuum_main_database()
+            vacuum_s = time.perf_counter() - started
+            sizes_after = database_file_sizes()
+        after = measure(app, "after", args.repeat)
+
+        print(f"archived {report['moved']} applications in {report['batches']} batches: {report['seconds']:.1f}s "
+              f"({report['moved'] / max(report['seconds'], 1e-9):,.0f} rows/s); VACUUM {vacuum_s:.1f}s")
+        for key in sizes_after:
+            print(f"{key:>8} file: {sizes_before.get(key, 0) / 2**20:8.1f} MiB before, "
+                  f"{sizes_archived.get(key, 0) / 2**20:8.1f} MiB after archiving, {sizes_after[key] / 2**20:8.1f} MiB after VACUUM")
+        print_table([row for pair in zip(before, after) for row in pair])
+        app.extensions["activity_writer"].close()
+    finally:
+        if args.keep:
+            print(f"kept {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Authentication overhead per protected request, before and after the
+single-decode token cache and request-scoped account.
+
+"legacy" re-implements the old token_required body (decode_token twice,
+then Account.query.get_or_404 in the handler). "current" is the shipped
+token_required + current_account(). Both run against a no-op view inside a
+request context, so the numbers are auth cost only. End-to-end GETs of the
+protected pages follow.
+
+    python -m benchmarks.bench_auth --requests 2000
+"""
+import argparse
+import re
+import shutil
+
+from flask import g
+
+from app.models import Account
+from app.utils import decode_token, get_token_from_request, token_required, current_account
+from benchmarks.common import make_app, timed, summarize, print_table
+
+
+def legacy_auth():
+    token = get_token_from_request()
+    user = decode_token(token)
+    if not user:
+        raise RuntimeError("invalid")
+    g.current_user = decode_token(token)
+    return Account.query.get_or_404(g.current_user)
+
+
+@token_required
+def current_auth():
+    return current_account()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    app, workdir = make_app(BCRYPT_LOG_ROUNDS=4)
+    client = app.test_client()
+    client.post("/account/create", data={"name": "Bench", "email": "bench@example.com", "password": "pw", "monthly_income": "80000"})
+    client.post("/login", data={"email": "bench@example.com", "password": "pw"})
+    token = client.get_cookie("access_token").value
+    html = client.post("/loan/request", data={"amount": "250000", "tenure": "36"}).data.decode()
+    app_id = int(re.search(r"Application id: (\d+)", html).group(1))
+
+    def in_request(fn):
+        def call():
+            with app.test_request_context(headers={"Authorization": f"Bearer {token}"}):
+                fn()
+        return call
+
+    rows = [
+        summarize("legacy: 2x decode + account load", timed(in_request(legacy_auth), args.requests)),
+        summarize("current: cached decode + g account", timed(in_request(current_auth), args.requests)),
+        summarize("GET /loan/request", timed(lambda: client.get("/loan/request"), args.requests)),
+        summarize(f"GET /manager/review/{app_id}", timed(lambda: client.get(f"/manager/review/{app_id}"), args.requests)),
+    ]
+    print_table(rows)
+    print("token cache:", app.extensions["token_cache"].stats())
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Bulk application ingestion vs creating the same applications one by one.
+
+    python -m benchmarks.bench_bulk_ingest --rows 50000 --compare 500
+"""
+import argparse
+import io
+import random
+import shutil
+import time
+
+from benchmarks.common import make_app, login_client, seed_applications
+
+
+def synthetic_csv(rows, accounts, seed=0):
+    rng = random.Random(seed)
+    out = io.StringIO()
+    out.write("account_id,amount,tenure,flexible\n")
+    for _ in range(rows):
+        out.write(f"{rng.randint(2, accounts + 1)},{rng.uniform(5000, 3_000_000):.2f},{rng.choice((12, 24, 36, 60, 120))},{rng.random() < 0.5}\n")
+    return out.getvalue().encode()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--compare", type=int, default=500, help="applications created one at a time through /loan/request")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    app, workdir = make_app(BCRYPT_LOG_ROUNDS=4, BULK_INGEST_CHUNK_SIZE=args.chunk_size, ADMIN_EMAILS=["bench@example.com"])
+    client = login_client(app)  # account id 1
+    seed_applications(app, 0, accounts=args.accounts)
+    body = synthetic_csv(args.rows, args.accounts)
+
+    t0 = time.perf_counter()
+    report = client.post("/api/applications/bulk", data=body, content_type="text/csv").get_json()
+    bulk_s = time.perf_counter() - t0
+    app.extensions["activity_writer"].flush()
+    print(f"bulk: {report['inserted']} inserted, {report['failed']} failed in {bulk_s:.2f}s "
+          f"({report['inserted'] / bulk_s:,.0f} rows/s, server-side {report['rows_per_sec']:,.0f} rows/s)")
+
+    rng = random.Random(1)
+    t0 = time.perf_counter()
+    for _ in range(args.compare):
+        client.post("/loan/request", data={"amount": f"{rng.uniform(5000, 3_000_000):.2f}", "tenure": "36"})
+    single_s = time.perf_counter() - t0
+    print(f"one at a time: {args.compare} in {single_s:.2f}s ({args.compare / single_s:,.0f} rows/s)")
+    print(f"speedup: {(report['inserted'] / bulk_s) / (args.compare / single_s):.1f}x")
+    app.extensions["activity_writer"].close()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Top-k recommendations: exhaustive scoring vs the catalog interval index,
+sweeping the catalog size.
+
+    python -m benchmarks.bench_catalog_index --sizes 5,50,500,5000,20000,100000 --requests 300
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from app.catalog import CatalogOption, CatalogSnapshot, read_dataset
+from app.catalog_index import CatalogIndex
+from app.services import _rank_catalog
+from benchmarks.common import random_requests, write_synthetic_catalog
+
+
+def synthetic_snapshot(size, seed=0):
+    fd, path = tempfile.mkstemp(suffix=".csv")
+    os.close(fd)
+    try:
+        write_synthetic_catalog(path, size, seed=seed)
+        records = read_dataset(path)
+    finally:
+        os.remove(path)
+    return CatalogSnapshot(1, (CatalogOption(id=i + 1, **r) for i, r in enumerate(records)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="5,50,500,5000,20000,100000")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("-k", type=int, default=3)
+    args = parser.parse_args()
+
+    amounts, tenures, _ = random_requests(args.requests)
+    print(f"{'options':>8} {'build ms':>9} {'exhaustive ms':>14} {'index ms':>9} {'speedup':>8} {'mismatches':>11}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        snapshot = synthetic_snapshot(size)
+        t0 = time.perf_counter()
+        index = CatalogIndex(snapshot)
+        build = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        expected = [_rank_catalog(snapshot, a, t)[:args.k] for a, t in zip(amounts, tenures)]
+        exhaustive = (time.perf_counter() - t0) / args.requests
+
+        t0 = time.perf_counter()
+        got = [index.top_k(a, t, args.k) for a, t in zip(amounts, tenures)]
+        indexed = (time.perf_counter() - t0) / args.requests
+
+        mismatches = sum(
+            [(p, s) for p, _, s in e] != [(p, s) for p, _, s in g] for e, g in zip(expected, got))
+        print(f"{size:>8} {build * 1000:>9.1f} {exhaustive * 1000:>14.3f} {indexed * 1000:>9.3f} "
+              f"{exhaustive / indexed:>7.1f}x {mismatches:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Per-request cost of the catalog import.
+
+Compares the old behaviour (pandas re-read + one query per row + commit on
+every request) with the change-detecting sync that now runs in init_app.
+
+    python -m benchmarks.bench_catalog_sync --requests 500
+"""
+import argparse
+import shutil
+
+import pandas as pd
+
+from app import db
+from app.catalog import refresh_catalog_if_stale, sync_catalog
+from app.models import LoanOption
+from benchmarks.common import make_app, timed, summarize, print_table
+
+
+def legacy_load_dataset_into_db(path):
+    # the pre-catalog loader, kept here only as the baseline
+    df = pd.read_csv(path)
+    df = df.dropna(subset=["loan_type", "min_amount", "max_amount"])
+    df["interest_rate"] = df["interest_rate"].astype(float)
+    df["eligibility_score"] = df["eligibility_score"].astype(float)
+    for _, row in df.iterrows():
+        existing = LoanOption.query.filter_by(loan_type=row["loan_type"]).first()
+        existing.min_amount = row["min_amount"]
+        existing.max_amount = row["max_amount"]
+        existing.interest_rate = row["interest_rate"]
+        existing.eligibility_score = row["eligibility_score"]
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    app, workdir = make_app()
+    path = app.config["DATASET_PATH"]
+    rows = []
+    with app.app_context():
+        rows.append(summarize("legacy loader (per request)", timed(lambda: legacy_load_dataset_into_db(path), args.requests)))
+        rows.append(summarize("refresh_catalog_if_stale (unchanged)", timed(refresh_catalog_if_stale, args.requests)))
+        app.config["CATALOG_CHECK_INTERVAL"] = 0
+        rows.append(summarize("refresh, stat on every call (unchanged)", timed(refresh_catalog_if_stale, args.requests)))
+        rows.append(summarize("forced full sync", timed(lambda: sync_catalog(force=True), max(1, args.requests // 10))))
+
+    client = app.test_client()
+    app.config["CATALOG_CHECK_INTERVAL"] = 2.0
+    rows.append(summarize("GET / end to end", timed(lambda: client.get("/"), args.requests)))
+    print_table(rows)
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Concurrent create-application -> select -> decide flows against one app.
+
+Each thread logs in as its own account and runs the three-step flow
+repeatedly through the Flask test client. Reports flows/sec and per-flow
+latency percentiles, with the connect-time SQLite PRAGMAs on and off.
+
+    python -m benchmarks.bench_concurrency --threads 8 --flows 50
+"""
+import argparse
+import re
+import threading
+import time
+
+from benchmarks.common import make_app, close_app, percentile
+
+
+def run(threads, flows, pragmas):
+    overrides = {"BCRYPT_LOG_ROUNDS": 4}
+    if not pragmas:
+        overrides["SQLITE_PRAGMAS"] = {}
+    app, workdir = make_app(**overrides)
+    clients = []
+    for i in range(threads):
+        client = app.test_client()
+        client.post("/account/create", data={"name": f"U{i}", "email": f"u{i}@example.com", "password": "pw", "monthly_income": "90000"})
+        client.post("/login", data={"email": f"u{i}@example.com", "password": "pw"})
+        clients.append(client)
+
+    latencies, errors = [], []
+    lock = threading.Lock()
+    start = threading.Barrier(threads + 1)
+
+    def worker(client, seed):
+        local = []
+        start.wait()
+        for n in range(flows):
+            t0 = time.perf_counter()
+            try:
+                html = client.post("/loan/request", data={"amount": str(50000 + 1000 * ((seed * flows + n) % 400)), "tenure": "36"}).data.decode()
+                app_id = re.search(r"Application id: (\d+)", html).group(1)
+                choice = re.search(r'name="choice" value="(\d+)"', html).group(1)
+                client.post(f"/loan/options/{app_id}/select", data={"choice": choice})
+                resp = client.post(f"/manager/review/{app_id}")
+                if resp.status_code >= 400:
+                    raise RuntimeError(resp.status_code)
+            except Exception as e:  # noqa: BLE001 - counted and reported
+                with lock:
+                    errors.append(repr(e))
+                continue
+            local.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(local)
+
+    pool = [threading.Thread(target=worker, args=(c, i)) for i, c in enumerate(clients)]
+    for t in pool:
+        t.start()
+    t0 = time.perf_counter()
+    start.wait()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    close_app(app, workdir)
+    return {
+        "flows_per_sec": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "errors": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--flows", type=int, default=50, help="flows per thread")
+    args = parser.parse_args()
+    print(f"{'setup':<22} {'flows/s':>10} {'p50 ms':>10} {'p99 ms':>10} {'errors':>8}")
+    for label, pragmas in (("default journal", False), ("WAL + tuned pragmas", True)):
+        r = run(args.threads, args.flows, pragmas)
+        print(f"{label:<22} {r['flows_per_sec']:>10.1f} {r['p50_ms']:>10.2f} {r['p99_ms']:>10.2f} {r['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Custom-option generation: unseeded random draws vs the seeded generator,
+the precomputed grid, and the per-application cache.
+
+    python -m benchmarks.bench_custom_options --requests 50000
+"""
+import argparse
+import random
+import shutil
+import time
+
+from app.catalog import get_catalog_snapshot
+from app.services import (
+    custom_options_rng, generate_custom_options, grid_custom_options, option_grid, custom_options_for,
+)
+from app.models import LoanApplication
+from benchmarks.common import make_app, random_requests, seed_applications
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=50000)
+    parser.add_argument("--applications", type=int, default=2000)
+    parser.add_argument("--grid-size", type=int, default=21)
+    args = parser.parse_args()
+
+    app, workdir = make_app(CUSTOM_OPTIONS_GRID_SIZE=args.grid_size, CUSTOM_OPTIONS_CACHE_SIZE=args.requests)
+    seed_applications(app, args.applications, accounts=200)
+    with app.app_context():
+        snapshot = get_catalog_snapshot()
+        amounts, tenures, _ = random_requests(args.requests)
+        picks = random.Random(0)
+        bases = [snapshot.options[picks.randrange(len(snapshot))] for _ in range(args.requests)]
+        app_ids = [picks.randrange(1, args.applications + 1) for _ in range(args.requests)]
+
+        rows = []
+
+        def run(name, fn):
+            t0 = time.perf_counter()
+            for i in range(args.requests):
+                fn(i)
+            elapsed = time.perf_counter() - t0
+            rows.append((name, elapsed))
+
+        run("global random", lambda i: generate_custom_options(bases[i], amounts[i], tenures[i]))
+        run("seeded random", lambda i: generate_custom_options(
+            bases[i], amounts[i], tenures[i], rng=custom_options_rng(app_ids[i], bases[i].id, amounts[i], tenures[i])))
+        run("seeded grid", lambda i: grid_custom_options(
+            bases[i], option_grid(snapshot, bases[i], args.grid_size), amounts[i], tenures[i],
+            rng=custom_options_rng(app_ids[i], bases[i].id, amounts[i], tenures[i])))
+
+        applications = {a.id: a for a in LoanApplication.query.all()}
+        for mode in ("random", "grid"):
+            app.config["CUSTOM_OPTIONS_MODE"] = mode
+            app.extensions["custom_options_cache"].clear()
+            run(f"custom_options_for ({mode}, cold)", lambda i: custom_options_for(applications[app_ids[i]], bases[i]))
+            run(f"custom_options_for ({mode}, warm)", lambda i: custom_options_for(applications[app_ids[i]], bases[i]))
+
+        # same inputs, same seed -> same suggestions
+        first = custom_options_for(applications[1], bases[0])
+        app.extensions["custom_options_cache"].clear()
+        reproducible = first == custom_options_for(applications[1], bases[0])
+
+    print(f"catalog options: {len(snapshot)}  requests: {args.requests}  applications: {args.applications}")
+    for name, elapsed in rows:
+        print(f"{name:34s}: {elapsed:7.3f} s  ({args.requests / elapsed:10.0f} clicks/s)")
+    print(f"reproducible across cache clears : {reproducible}")
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Login throughput of the bcrypt pool at several cost and worker settings.
+
+Each case fires --logins verifications from --clients concurrent request
+threads through PasswordHasher (credential cache off), then once more with
+the cache on to show the repeat-login path.
+
+    python -m benchmarks.bench_password_hashing --rounds 4,8,10,12 --workers 1,2,4,8
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.utils import PasswordHasher, hash_password
+
+
+def run_case(rounds, workers, logins, clients, executor, cache_ttl=0):
+    hashed = hash_password("correct horse", rounds)
+    hasher = PasswordHasher(workers=workers, max_pending=logins, executor=executor, credential_ttl=cache_ttl, secret="bench")
+    hasher.verify("correct horse", hashed)  # start the pool outside the timing
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        results = list(pool.map(lambda _: hasher.verify("correct horse", hashed), range(logins)))
+    elapsed = time.perf_counter() - t0
+    hasher.shutdown()
+    assert all(results)
+    return logins / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", default="4,8,10,12")
+    parser.add_argument("--workers", default="1,2,4,8")
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--executor", choices=("thread", "process"), default="thread")
+    args = parser.parse_args()
+
+    rounds_list = [int(r) for r in args.rounds.split(",")]
+    workers_list = [int(w) for w in args.workers.split(",")]
+    print(f"cpus: {os.cpu_count()}  clients: {args.clients}  logins per case: {args.logins}  executor: {args.executor}")
+    print("logins/sec" + "".join(f"{f'workers={w}':>14}" for w in workers_list) + f"{'cached':>14}")
+    for rounds in rounds_list:
+        row = [run_case(rounds, w, args.logins, args.clients, args.executor) for w in workers_list]
+        cached = run_case(rounds, workers_list[-1], args.logins, args.clients, args.executor, cache_ttl=60)
+        print(f"cost={rounds:<5}" + "".join(f"{r:>14.1f}" for r in row) + f"{cached:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
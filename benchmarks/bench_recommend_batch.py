@@ -0,0 +1,54 @@
+"""
+Batch re-scoring: recommend_loans in a Python loop vs recommend_batch.
+
+    python -m benchmarks.bench_recommend_batch --requests 20000 --catalog-size 50
+"""
+import argparse
+import shutil
+import time
+
+from app.catalog import sync_catalog, get_catalog_snapshot
+from app.recommender import recommend_batch
+from app.services import recommend_loans
+from benchmarks.common import make_app, write_synthetic_catalog, random_requests
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--catalog-size", type=int, default=0, help="0 keeps the shipped dataset")
+    parser.add_argument("-k", type=int, default=3)
+    args = parser.parse_args()
+
+    app, workdir = make_app()
+    with app.app_context():
+        if args.catalog_size:
+            write_synthetic_catalog(app.config["DATASET_PATH"], args.catalog_size)
+            sync_catalog(force=True)
+        snapshot = get_catalog_snapshot()
+        amounts, tenures, flexible = random_requests(args.requests)
+
+        t0 = time.perf_counter()
+        loop = [recommend_loans(a, t, flexible=f)[:args.k] for a, t, f in zip(amounts, tenures, flexible)]
+        loop_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        indices, scores = recommend_batch(amounts, tenures, flexible=flexible, k=args.k, snapshot=snapshot)
+        batch_s = time.perf_counter() - t0
+
+        mismatches = 0
+        for recs, idx_row, score_row in zip(loop, indices.tolist(), scores.tolist()):
+            expected = [(r["loan"].id, r["score"]) for r in recs]
+            got = [(snapshot.options[i].id, round(s, 4)) for i, s in zip(idx_row, score_row)]
+            mismatches += expected != got
+
+    print(f"catalog options: {len(snapshot)}  requests: {args.requests}  k: {args.k}")
+    print(f"per-request loop : {loop_s:8.3f} s  ({args.requests / loop_s:12.0f} req/s)")
+    print(f"recommend_batch  : {batch_s:8.3f} s  ({args.requests / batch_s:12.0f} req/s)")
+    print(f"speedup          : {loop_s / batch_s:8.1f}x")
+    print(f"mismatched rows  : {mismatches}")
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
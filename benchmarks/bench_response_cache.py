@@ -0,0 +1,124 @@
+"""
+Response, fragment and template bytecode caching.
+
+Per-route latency of the cacheable GET pages and of the /loan/request form
+(whose options table is a cached fragment) with the caches on and off, on
+a large synthetic catalog, plus revalidation requests answered with 304.
+The bytecode rows time compiling every template in a fresh interpreter
+without a bytecode cache, with an empty one and with a populated one.
+
+    python -m benchmarks.bench_response_cache --catalog 2000 --repeat 500
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.common import make_app, login_client, print_table, summarize, timed, write_synthetic_catalog
+from config import BASE_DIR
+
+ROUTES = ("/", "/account/check", "/login?email=someone@example.com", "/account/create?email=someone@example.com")
+
+COMPILE_CHILD = r"""
+import json, sys, time
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
+cache_dir = sys.argv[2] or None
+env = Environment(loader=FileSystemLoader(sys.argv[1]),
+                  bytecode_cache=FileSystemBytecodeCache(cache_dir) if cache_dir else None)
+started = time.perf_counter()
+for name in env.list_templates(extensions=("html",)):
+    env.get_template(name)
+print(json.dumps(time.perf_counter() - started))
+"""
+
+
+def wsgi_get(app, path, headers=None, cookie=None):
+    """
+    Callable issuing GET path straight into the WSGI app, without the test
+    client's per-request overhead (which dwarfs a small template render).
+    """
+    from werkzeug.test import EnvironBuilder
+    headers = dict(headers or {})
+    if cookie:
+        headers["Cookie"] = f"access_token={cookie}"
+    environ = EnvironBuilder(path=path, headers=headers).get_environ()
+    statuses = []
+
+    def start_response(status, response_headers, exc_info=None):
+        statuses.append(status)
+
+    def call():
+        body = app(dict(environ), start_response)
+        try:
+            for _ in body:
+                pass
+        finally:
+            if hasattr(body, "close"):
+                body.close()
+        return int(statuses[-1].split()[0])
+    return call
+
+
+def route_cases(catalog, repeat):
+    rows = []
+    for enabled in (False, True):
+        workdir = tempfile.mkdtemp(prefix="loan-respcache-")
+        try:
+            write_synthetic_catalog(os.path.join(workdir, "catalog.csv"), catalog)
+            app, _ = make_app(workdir, DATASET_PATH=os.path.join(workdir, "catalog.csv"),
+                              RESPONSE_CACHE_ENABLED=enabled, BCRYPT_LOG_ROUNDS=4, METRICS_ENABLED=False)
+            label = "cached" if enabled else "uncached"
+            token = login_client(app).get_cookie("access_token").value
+            for route in ROUTES + ("/loan/request",):
+                get = wsgi_get(app, route, cookie=token)
+                assert get() == 200
+                rows.append(summarize(f"{label:<9} GET {route}", timed(get, repeat)))
+            if enabled:
+                client = app.test_client()
+                for route in ROUTES:
+                    get = wsgi_get(app, route, headers={"If-None-Match": client.get(route).headers["ETag"]})
+                    assert get() == 304
+                    rows.append(summarize(f"304       GET {route}", timed(get, repeat)))
+            app.extensions["activity_writer"].close()
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return rows
+
+
+def compile_templates(cache_dir):
+    out = subprocess.run([sys.executable, "-c", COMPILE_CHILD, os.path.join(BASE_DIR, "templates"), cache_dir or ""],
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout)
+
+
+def bytecode_cases(runs):
+    cache_dir = tempfile.mkdtemp(prefix="loan-jinja-")
+    try:
+        rows = [summarize("templates: no bytecode cache", [compile_templates(None) for _ in range(runs)])]
+        cold = []
+        for _ in range(runs):
+            for name in os.listdir(cache_dir):
+                os.remove(os.path.join(cache_dir, name))
+            cold.append(compile_templates(cache_dir))
+        rows.append(summarize("templates: empty bytecode cache", cold))
+        rows.append(summarize("templates: warm bytecode cache", [compile_templates(cache_dir) for _ in range(runs)]))
+        return rows
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--catalog", type=int, default=2000, help="loan options in the synthetic catalog")
+    parser.add_argument("--repeat", type=int, default=500)
+    parser.add_argument("--compile-runs", type=int, default=5)
+    args = parser.parse_args()
+    print(f"catalog={args.catalog} repeat={args.repeat}")
+    print_table(route_cases(args.catalog, args.repeat) + bytecode_cases(args.compile_runs))
+
+
+if __name__ == "__main__":
+    main()
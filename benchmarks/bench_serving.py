@@ -0,0 +1,226 @@
+"""
+Serving setups compared: the development server from run.py against
+serve.py (gunicorn, pre-forked workers, preloaded app) with a few worker
+and thread counts, all on the same seeded database.
+
+Each server runs as its own process tree. Load comes from keep-alive HTTP
+client threads cycling through /, /login and the authenticated
+/loan/request form. After the load phase the RSS, PSS (RSS with shared
+pages split between the processes sharing them) and private memory of
+every process in the tree are read from /proc.
+
+    python -m benchmarks.bench_serving --duration 10 --clients 8
+"""
+import argparse
+import http.client
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.common import make_app, login_client, percentile
+from config import BASE_DIR
+
+DEV_SERVER = """
+import sys
+sys.path.insert(0, {base!r})
+from run import app
+app.run(host="127.0.0.1", port=int(sys.argv[1]), debug=True)
+"""
+
+PATHS = ("/", "/login", "/loan/request")
+
+
+# label -> serve.py arguments; None runs run.py's development server
+VARIANTS = (
+    ("run.py dev server (debug, reloader)", None),
+    ("serve.py 1 worker x 4 threads", ["--workers", "1", "--threads", "4"]),
+    ("serve.py 2 workers x 4 threads", ["--workers", "2", "--threads", "4"]),
+    ("serve.py 4 workers x 1 thread", ["--workers", "4", "--threads", "1"]),
+    ("serve.py 4 workers x 4 threads", ["--workers", "4", "--threads", "4"]),
+    ("serve.py 4 x 4, --no-preload", ["--workers", "4", "--threads", "4", "--no-preload"]),
+)
+
+
+def prepare(workdir):
+    """Seed the database with one account and return its access token."""
+    app, _ = make_app(workdir, BCRYPT_LOG_ROUNDS=4)
+    client = login_client(app)
+    token = client.get_cookie("access_token").value
+    app.extensions["activity_writer"].close()
+    return token
+
+
+def server_env(workdir):
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "DATASET_PATH": os.path.join(workdir, "dataset", "loans.csv"),
+        "LOG_DIR": os.path.join(workdir, "logs"),
+        "BCRYPT_LOG_ROUNDS": "4",
+        "CATALOG_CHECK_INTERVAL": "-1",
+    })
+    return env
+
+
+def wait_ready(port, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/")
+            if conn.getresponse().status == 200:
+                conn.close()
+                return
+        except OSError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not come up")
+
+
+def process_tree(pid):
+    pids, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        pids.append(current)
+        for task in os.listdir(f"/proc/{current}/task"):
+            try:
+                with open(f"/proc/{current}/task/{task}/children") as f:
+                    pending.extend(int(p) for p in f.read().split())
+            except OSError:
+                pass
+    return pids
+
+
+def memory(pid):
+    """RSS, PSS and private KiB of one process."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:", "Private_Clean:", "Private_Dirty:"):
+                values[parts[0][:-1]] = int(parts[1])
+    return {"rss": values["Rss"], "pss": values["Pss"], "private": values["Private_Clean"] + values["Private_Dirty"]}
+
+
+def run_load(port, token, clients, duration):
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client(offset):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        headers = {"Cookie": f"access_token={token}"}
+        mine, failed, i = [], 0, offset
+        while time.monotonic() < stop_at:
+            path = PATHS[i % len(PATHS)]
+            i += 1
+            started = time.perf_counter()
+            try:
+                conn.request("GET", path, headers=headers)
+                resp = conn.getresponse()
+                resp.read()
+                if resp.status != 200:
+                    failed += 1
+                if resp.will_close:
+                    conn.close()
+                    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+                continue
+            mine.append(time.perf_counter() - started)
+        conn.close()
+        with lock:
+            latencies.extend(mine)
+            errors[0] += failed
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "rps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def measure(label, serve_args, workdir, token, port, clients, duration):
+    if serve_args is None:
+        script = os.path.join(workdir, "dev_server.py")
+        with open(script, "w") as f:
+            f.write(DEV_SERVER.format(base=BASE_DIR))
+        command = [sys.executable, script, str(port)]
+    else:
+        command = [sys.executable, os.path.join(BASE_DIR, "serve.py"), "--bind", f"127.0.0.1:{port}"] + serve_args
+    proc = subprocess.Popen(command, cwd=workdir, env=server_env(workdir), start_new_session=True,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        started = time.perf_counter()
+        wait_ready(port)
+        ready_s = time.perf_counter() - started
+        result = run_load(port, token, clients, duration)
+        tree = {pid: memory(pid) for pid in process_tree(proc.pid)}
+    finally:
+        os.killpg(proc.pid, signal.SIGTERM)
+        try:
+            proc.wait(30)
+        except subprocess.TimeoutExpired:
+            os.killpg(proc.pid, signal.SIGKILL)
+            proc.wait()
+    # the serving processes: gunicorn workers, or the reloader's child for run.py
+    children = [m for pid, m in tree.items() if pid != proc.pid] or list(tree.values())
+    result.update({
+        "variant": label,
+        "ready_s": ready_s,
+        "processes": len(tree),
+        "worker_rss_mib": sum(m["rss"] for m in children) / len(children) / 1024,
+        "worker_private_mib": sum(m["private"] for m in children) / len(children) / 1024,
+        "total_pss_mib": sum(m["pss"] for m in tree.values()) / 1024,
+        "total_rss_mib": sum(m["rss"] for m in tree.values()) / 1024,
+    })
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load per variant")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent keep-alive client threads")
+    parser.add_argument("--port", type=int, default=18765)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="loan-serving-")
+    try:
+        token = prepare(workdir)
+        rows = [measure(label, serve_args, workdir, token, args.port + i, args.clients, args.duration)
+                for i, (label, serve_args) in enumerate(VARIANTS)]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    print(f"cpus={os.cpu_count()} clients={args.clients} duration={args.duration}s")
+    print(f"{'variant':<38} {'ready s':>8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} "
+          f"{'procs':>6} {'RSS/worker':>11} {'priv/worker':>12} {'PSS total':>10} {'RSS total':>10}")
+    for r in rows:
+        print(f"{r['variant']:<38} {r['ready_s']:>8.2f} {r['rps']:>8.1f} {r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f} "
+              f"{r['errors']:>7} {r['processes']:>6} {r['worker_rss_mib']:>10.1f}M {r['worker_private_mib']:>11.1f}M "
+              f"{r['total_pss_mib']:>9.1f}M {r['total_rss_mib']:>9.1f}M")
+
+
+if __name__ == "__main__":
+    main()
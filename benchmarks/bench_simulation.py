@@ -0,0 +1,56 @@
+"""
+Monte Carlo approval simulation: a Python loop over approval_probability
+(what replaying manager_decision row by row costs) vs the vectorized
+engine on 1 and N processes.
+
+    python -m benchmarks.bench_simulation --applications 200000 --trials 1000 --workers 4
+"""
+import argparse
+import random
+import shutil
+import time
+
+from app.services import approval_probability
+from app.simulation import load_application_columns, simulate_approvals
+from benchmarks.common import make_app, seed_applications
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--applications", type=int, default=200_000)
+    parser.add_argument("--trials", type=int, default=1000)
+    parser.add_argument("--loop-trials", type=int, default=5, help="trials timed for the Python loop baseline")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    app, workdir = make_app()
+    seed_applications(app, args.applications, accounts=5000)
+    with app.app_context():
+        t0 = time.perf_counter()
+        columns = load_application_columns()
+        load_s = time.perf_counter() - t0
+
+    scores = columns.scores.tolist()
+    rng = random.Random(args.seed)
+    t0 = time.perf_counter()
+    for _ in range(args.loop_trials):
+        sum(rng.random() < approval_probability(s) for s in scores)
+    loop_per_trial = (time.perf_counter() - t0) / args.loop_trials
+
+    single = simulate_approvals(columns, trials=args.trials, seed=args.seed, workers=1)
+    sharded = simulate_approvals(columns, trials=args.trials, seed=args.seed, workers=args.workers)
+
+    draws = len(columns) * args.trials
+    print(f"applications: {len(columns):,}  trials: {args.trials}  loaded in {load_s:.2f}s")
+    print(f"python loop      : {loop_per_trial * args.trials:8.2f} s (extrapolated from {args.loop_trials} trials)")
+    for label, report in (("vectorized x1", single), (f"vectorized x{args.workers}", sharded)):
+        print(f"{label:<17}: {report['elapsed_s']:8.2f} s  ({draws / report['elapsed_s'] / 1e6:7.1f} M decisions/s)")
+    print(f"same results for 1 and {args.workers} workers: {single['by_loan_type'] == sharded['by_loan_type']}")
+    overall = sharded["overall"]
+    print(f"overall approval rate {overall['approval_rate_mean']:.4f} interval {overall['approval_rate_interval']}")
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Cold-start cost of the app factory: wall time and RSS of
+`from app import create_app; create_app()` in a fresh interpreter.
+
+Each variant runs in its own subprocess so imports are never warm. The
+"eager pandas" row pre-imports pandas the way the factory used to.
+
+    python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import json
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from config import BASE_DIR
+
+CHILD = r"""
+import json, os, resource, sys, time
+t0 = time.perf_counter()
+for name in {preload!r}:
+    __import__(name)
+sys.path.insert(0, {base!r})
+from benchmarks.common import make_config
+from app import create_app
+t_import = time.perf_counter() - t0
+app = create_app(make_config({workdir!r}, **{overrides!r}))
+elapsed = time.perf_counter() - t0
+with open("/proc/self/status") as f:
+    rss = next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+app.extensions["activity_writer"].close()
+print(json.dumps({{"import_s": t_import, "total_s": elapsed, "rss_kib": rss,
+                  "maxrss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                  "heavy": sorted(m for m in ("pandas", "numpy", "flasgger", "pyarrow") if m in sys.modules)}}))
+"""
+
+VARIANTS = (
+    ("eager pandas + swagger (old)", ("pandas",), {}),
+    ("default (swagger on)", (), {}),
+    ("SWAGGER_ENABLED=False", (), {"SWAGGER_ENABLED": False}),
+)
+
+
+def run_child(preload, overrides):
+    workdir = tempfile.mkdtemp(prefix="loan-startup-")
+    try:
+        code = CHILD.format(preload=tuple(preload), base=BASE_DIR, workdir=workdir, overrides=overrides)
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=BASE_DIR)
+        return json.loads(out.stdout.strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    run_child((), {})  # populate __pycache__ so every variant starts from bytecode
+    print(f"{'variant':<30} {'import ms':>10} {'create_app ms':>14} {'RSS MiB':>9}  heavy modules loaded")
+    for label, preload, overrides in VARIANTS:
+        runs = [run_child(preload, overrides) for _ in range(args.runs)]
+        imp = statistics.median(r["import_s"] for r in runs) * 1000
+        total = statistics.median(r["total_s"] for r in runs) * 1000
+        rss = statistics.median(r["rss_kib"] for r in runs) / 1024
+        print(f"{label:<30} {imp:>10.0f} {total:>14.0f} {rss:>9.1f}  {', '.join(runs[-1]['heavy']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
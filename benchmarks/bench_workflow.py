@@ -0,0 +1,358 @@
+"""
+End-to-end workflow benchmark with JSON results and baseline comparison.
+
+Seeds a synthetic catalog, accounts/applications and activity log, then runs
+account-create -> login -> loan_request -> loan_select -> manager_review
+flows through the Flask test client (or a local threaded WSGI server with
+--server). Reports per-step throughput, latency percentiles, SQL statements
+per request and peak Python allocations above the pre-request level.
+
+    python -m benchmarks.bench_workflow --flows 200 --threads 4 --output benchmarks/results/run.json
+    python -m benchmarks.bench_workflow --baseline benchmarks/results/run.json --threshold 0.15
+
+Exits with status 1 when --baseline is given and a step regressed by more
+than --threshold.
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import platform
+import re
+import resource
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime, timezone
+
+from benchmarks.common import (
+    close_app, make_app, percentile, seed_applications, write_synthetic_activity, write_synthetic_catalog,
+)
+
+# step name -> URL rule it hits, to read query counts from the app's metrics
+STEPS = (
+    ("account_create", "/account/create"),
+    ("login", "/login"),
+    ("loan_request_form", "/loan/request"),
+    ("loan_request", "/loan/request"),
+    ("loan_select_custom", "/loan/options/<int:app_id>/select"),
+    ("loan_select", "/loan/options/<int:app_id>/select"),
+    ("manager_review_form", "/manager/review/<int:app_id>"),
+    ("manager_review", "/manager/review/<int:app_id>"),
+    ("decision_result", "/manager/review/<int:app_id>/result"),
+)
+# lower is better for these, higher for flows_per_sec / rps
+COMPARED = ("p50_ms", "p90_ms", "queries_per_request")
+
+
+class TestClientSession:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, data=None):
+        resp = self.client.open(path, method=method, data=data)
+        return resp.status_code, resp.get_data(as_text=True), resp.headers.get("Location")
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HTTPSession:
+    """Cookie-keeping HTTP client for --server mode; redirects are returned, not followed."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect())
+
+    def request(self, method, path, data=None):
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        req = urllib.request.Request(self.base_url + path, data=body, method=method)
+        try:
+            with self.opener.open(req) as resp:
+                return resp.status, resp.read().decode(), resp.headers.get("Location")
+        except urllib.error.HTTPError as e:
+            return e.code, e.read().decode(), e.headers.get("Location")
+
+
+class StepStats:
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.peak_alloc = 0
+        self.lock = threading.Lock()
+
+    def add(self, seconds):
+        with self.lock:
+            self.latencies.append(seconds)
+
+
+def run_flow(session, stats, n, amount, tenure, trace=False):
+    """One full workflow; returns False if any step failed."""
+    email = f"flow{n}@bench.example.com"
+
+    def step(name, method, path, data=None, expect=(200, 302)):
+        if trace:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        t0 = time.perf_counter()
+        status, body, location = session.request(method, path, data)
+        elapsed = time.perf_counter() - t0
+        entry = stats[name]
+        if trace:
+            entry.peak_alloc = max(entry.peak_alloc, tracemalloc.get_traced_memory()[1] - baseline)
+        if status not in expect:
+            with entry.lock:
+                entry.errors += 1
+            raise RuntimeError(f"{name}: HTTP {status}")
+        entry.add(elapsed)
+        return body, location
+
+    try:
+        step("account_create", "POST", "/account/create",
+             {"name": f"Flow {n}", "email": email, "password": "pw", "monthly_income": str(40000 + n % 100 * 1000)})
+        step("login", "POST", "/login", {"email": email, "password": "pw"})
+        step("loan_request_form", "GET", "/loan/request")
+        html, _ = step("loan_request", "POST", "/loan/request", {"amount": str(amount), "tenure": str(tenure)})
+        app_id = re.search(r"Application id: (\d+)", html).group(1)
+        choice = re.search(r'name="choice" value="(\d+)"', html).group(1)
+        step("loan_select_custom", "POST", f"/loan/options/{app_id}/select", {"choice": "custom", "base_loan_id": choice})
+        step("loan_select", "POST", f"/loan/options/{app_id}/select", {"choice": choice})
+        step("manager_review_form", "GET", f"/manager/review/{app_id}")
+        _, location = step("manager_review", "POST", f"/manager/review/{app_id}", expect=(200, 202, 302))
+        if location:
+            path = urllib.parse.urlsplit(location).path
+            step("decision_result", "GET", path, expect=(200, 202))
+    except (RuntimeError, AttributeError):
+        return False
+    return True
+
+
+def route_queries(app):
+    """(sum, count) of the per-request query histogram, keyed by URL rule."""
+    registry = app.extensions.get("metrics")
+    if registry is None:
+        return {}
+    totals = {}
+    for (route,), child in list(registry.request_queries.children.items()):
+        _, total, count = child.snapshot()
+        totals[route] = (total, count)
+    return totals
+
+
+def seed(app, args):
+    from app.catalog import sync_catalog
+    if args.catalog_size:
+        write_synthetic_catalog(app.config["DATASET_PATH"], args.catalog_size)
+        with app.app_context():
+            sync_catalog(force=True)
+    if args.seed_applications:
+        seed_applications(app, args.seed_applications, accounts=args.seed_accounts)
+    if args.activity_rows:
+        app.extensions["activity_writer"].flush()
+        write_synthetic_activity(os.path.join(app.config["LOG_DIR"], "activity.csv"), args.activity_rows)
+
+
+def start_server(app):
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def run(args):
+    overrides = {"BCRYPT_LOG_ROUNDS": args.bcrypt_rounds, "SLOW_REQUEST_MS": None, "CATALOG_CHECK_INTERVAL": -1}
+    if args.decision_workers is not None:
+        overrides["DECISION_WORKERS"] = args.decision_workers
+    app, workdir = make_app(**overrides)
+    t0 = time.perf_counter()
+    seed(app, args)
+    seed_s = time.perf_counter() - t0
+
+    server = None
+    if args.server:
+        server, base_url = start_server(app)
+        new_session = lambda: HTTPSession(base_url)  # noqa: E731
+    else:
+        new_session = lambda: TestClientSession(app)  # noqa: E731
+
+    import random
+    rng = random.Random(args.seed)
+    inputs = [(round(rng.uniform(10_000, 3_000_000), -3), rng.choice((12, 24, 36, 60, 120, 240))) for _ in range(args.flows)]
+
+    # warm-up flows are not measured (first template compile, pool fill, ...)
+    warm = {name: StepStats() for name, _ in STEPS}
+    for n in range(args.warmup):
+        run_flow(new_session(), warm, args.flows + n, *inputs[n % len(inputs)])
+
+    stats = {name: StepStats() for name, _ in STEPS}
+    before = route_queries(app)
+    failed = []
+    counter = iter(range(args.flows))
+    counter_lock = threading.Lock()
+
+    def worker():
+        while True:
+            with counter_lock:
+                n = next(counter, None)
+            if n is None:
+                return
+            if not run_flow(new_session(), stats, n, *inputs[n]):
+                failed.append(n)
+
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    after = route_queries(app)
+
+    # separate, single-threaded pass for allocation peaks: tracemalloc slows
+    # everything down, so it never overlaps the timed run. It always uses the
+    # test client; over HTTP the server's socket/thread churn swamps the numbers.
+    if args.memory_flows:
+        traced = {name: StepStats() for name, _ in STEPS}
+        tracemalloc.start()
+        for n in range(args.memory_flows):
+            run_flow(TestClientSession(app), traced, 10 * args.flows + n, *inputs[n % len(inputs)], trace=True)
+        tracemalloc.stop()
+        for name, entry in traced.items():
+            stats[name].peak_alloc = entry.peak_alloc
+
+    if server is not None:
+        server.shutdown()
+    close_app(app, workdir)
+
+    steps = {}
+    for name, route in STEPS:
+        entry = stats[name]
+        samples = entry.latencies
+        if not samples:
+            continue
+        q_sum = after.get(route, (0, 0))[0] - before.get(route, (0, 0))[0]
+        q_count = after.get(route, (0, 0))[1] - before.get(route, (0, 0))[1]
+        steps[name] = {
+            "requests": len(samples),
+            "errors": entry.errors,
+            "rps": round(len(samples) / sum(samples), 1),
+            "mean_ms": round(sum(samples) / len(samples) * 1000, 3),
+            "p50_ms": round(percentile(samples, 50) * 1000, 3),
+            "p90_ms": round(percentile(samples, 90) * 1000, 3),
+            "p99_ms": round(percentile(samples, 99) * 1000, 3),
+            # shared by steps on the same URL rule (GET and POST)
+            "queries_per_request": round(q_sum / q_count, 2) if q_count else None,
+            "peak_alloc_kib": round(entry.peak_alloc / 1024, 1) if entry.peak_alloc else None,
+        }
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "mode": "server" if args.server else "test_client",
+            "args": vars(args),
+            "seed_seconds": round(seed_s, 3),
+        },
+        "flows": args.flows,
+        "failed_flows": len(failed),
+        "threads": args.threads,
+        "elapsed_s": round(elapsed, 3),
+        "flows_per_sec": round(args.flows / elapsed, 2),
+        "peak_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "steps": steps,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(result, baseline, threshold):
+    """Rows of (metric, baseline, current, change, regressed)."""
+    rows = []
+    base, cur = baseline.get("flows_per_sec"), result["flows_per_sec"]
+    if base:
+        change = cur / base - 1
+        rows.append(("flows_per_sec", base, cur, change, change < -threshold))
+    for name, current in result["steps"].items():
+        previous = baseline.get("steps", {}).get(name)
+        if not previous:
+            continue
+        for metric in COMPARED:
+            base, cur = previous.get(metric), current.get(metric)
+            if not base or cur is None:
+                continue
+            change = cur / base - 1
+            rows.append((f"{name}.{metric}", base, cur, change, change > threshold))
+    return rows
+
+
+def print_report(result):
+    print(f"mode={result['meta']['mode']} flows={result['flows']} threads={result['threads']} "
+          f"failed={result['failed_flows']} flows/s={result['flows_per_sec']} peak_rss={result['peak_rss_kib']} KiB")
+    print(f"{'step':<22} {'req':>6} {'err':>4} {'req/s':>9} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'queries':>8} {'alloc KiB':>10}")
+    for name, s in result["steps"].items():
+        queries = "-" if s["queries_per_request"] is None else s["queries_per_request"]
+        alloc = "-" if s["peak_alloc_kib"] is None else s["peak_alloc_kib"]
+        print(f"{name:<22} {s['requests']:>6} {s['errors']:>4} {s['rps']:>9} {s['p50_ms']:>9} {s['p90_ms']:>9} "
+              f"{s['p99_ms']:>9} {queries:>8} {alloc:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--flows", type=int, default=200, help="measured workflows")
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--memory-flows", type=int, default=5, help="extra traced flows for allocation peaks; 0 skips")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--catalog-size", type=int, default=0, help="synthetic loan options; 0 keeps the shipped dataset")
+    parser.add_argument("--seed-applications", type=int, default=10_000)
+    parser.add_argument("--seed-accounts", type=int, default=1_000)
+    parser.add_argument("--activity-rows", type=int, default=0)
+    parser.add_argument("--bcrypt-rounds", type=int, default=4)
+    parser.add_argument("--decision-workers", type=int, default=None, help="override DECISION_WORKERS")
+    parser.add_argument("--server", action="store_true", help="drive a local threaded WSGI server over HTTP")
+    parser.add_argument("--output", help="write JSON results here")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative regression (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    result = run(args)
+    print_report(result)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"results written to {args.output}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows = compare(result, baseline, args.threshold)
+        regressions = [row for row in rows if row[4]]
+        print(f"\ncompared with {args.baseline} (commit {baseline.get('meta', {}).get('commit')}), threshold {args.threshold:.0%}")
+        for metric, base, cur, change, regressed in rows:
+            print(f"{metric:<38} {base:>10} {cur:>10} {change:>+8.1%} {'REGRESSED' if regressed else ''}")
+        if regressions:
+            print(f"{len(regressions)} metric(s) regressed")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
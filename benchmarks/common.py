@@ -0,0 +1,192 @@
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from config import Config, BASE_DIR
+
+
+def make_config(workdir, **overrides):
+    """Config subclass that keeps the DB, dataset and logs inside workdir."""
+    dataset = os.path.join(workdir, "dataset", "loans.csv")
+    os.makedirs(os.path.dirname(dataset), exist_ok=True)
+    if not os.path.exists(dataset):
+        shutil.copy(os.path.join(BASE_DIR, "dataset", "loans.csv"), dataset)
+    attrs = {
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "DATASET_PATH": dataset,
+        "LOG_DIR": os.path.join(workdir, "logs"),
+        "TESTING": True,
+    }
+    attrs.update(overrides)
+    return type("BenchConfig", (Config,), attrs)
+
+
+def make_app(workdir=None, **overrides):
+    from app import create_app
+    workdir = workdir or tempfile.mkdtemp(prefix="loan-bench-")
+    return create_app(make_config(workdir, **overrides)), workdir
+
+
+def close_app(app, workdir):
+    """Stop the app's decision workers and activity writer, then remove workdir."""
+    # they would otherwise keep claiming jobs and writing logs in a deleted directory
+    app.extensions["decision_queue"].stop()
+    app.extensions["activity_writer"].close()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+def timed(fn, repeat):
+    """Call fn repeat times and return per-call latencies in seconds."""
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def summarize(name, samples):
+    total = sum(samples)
+    return {
+        "name": name,
+        "calls": len(samples),
+        "mean_ms": statistics.fmean(samples) * 1000 if samples else 0.0,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "per_sec": len(samples) / total if total else 0.0,
+    }
+
+
+def print_table(rows):
+    print(f"{'case':<44} {'calls':>7} {'mean ms':>10} {'p50 ms':>10} {'p99 ms':>10} {'ops/s':>12}")
+    for r in rows:
+        print(f"{r['name']:<44} {r['calls']:>7} {r['mean_ms']:>10.3f} {r['p50_ms']:>10.3f} {r['p99_ms']:>10.3f} {r['per_sec']:>12.1f}")
+
+
+def write_synthetic_catalog(path, size, seed=0):
+    """Write a loans.csv with `size` random but plausible loan products."""
+    import random
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("loan_type,min_amount,max_amount,min_tenure,max_tenure,interest_rate,eligibility_score\n")
+        for i in range(size):
+            min_amount = rng.choice([5000, 10000, 20000, 50000, 100000, 200000])
+            max_amount = min_amount * rng.choice([5, 10, 25, 50, 100])
+            min_tenure = rng.choice([3, 6, 12, 24, 60])
+            max_tenure = min_tenure * rng.choice([2, 4, 6, 10])
+            rate = round(rng.uniform(7.0, 18.0), 2)
+            eligibility = round(rng.uniform(0.4, 0.9), 3)
+            f.write(f"Product {i},{min_amount},{max_amount},{min_tenure},{max_tenure},{rate},{eligibility}\n")
+
+
+def random_requests(n, seed=0):
+    """Synthetic (amount, tenure, flexible) loan requests."""
+    import random
+    rng = random.Random(seed)
+    amounts = [round(rng.uniform(1000, 6_000_000), 2) for _ in range(n)]
+    tenures = [rng.randint(3, 400) for _ in range(n)]
+    flexible = [rng.random() < 0.5 for _ in range(n)]
+    return amounts, tenures, flexible
+
+
+ACTIVITY_HEADER = "timestamp,event,user_id,user_email,application_id,loan_amount,loan_status,recommended_picked,login_time,logout_time,ip,user_agent,extra\n"
+ACTIVITY_UA = '"Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/141.0 Safari/537.36"'
+
+
+def write_synthetic_activity(path, rows, users=50_000, days=30, seed=0, header=True, start=None):
+    """Append `rows` synthetic events in activity.csv layout, spread over `days` days."""
+    import random
+    from datetime import datetime, timedelta
+    rng = random.Random(seed)
+    start = start or datetime(2025, 1, 1)
+    step = timedelta(days=days) / max(1, rows)
+    events = ("LOGIN", "LOGIN", "APPLICATION_CREATED", "PICK_OPTION", "PICK_OPTION", "MANAGER_DECISION", "LOGOUT")
+    lines = []
+    with open(path, "a" if not header else "w", encoding="utf-8", newline="") as f:
+        if header:
+            f.write(ACTIVITY_HEADER)
+        for i in range(rows):
+            ts = (start + step * i).isoformat()
+            event = events[rng.randrange(len(events))]
+            uid = rng.randrange(users)
+            email = f"user{uid}@example.com"
+            if event == "LOGIN":
+                line = f"{ts},LOGIN,{uid},{email},,,,,{ts},,10.0.0.1,{ACTIVITY_UA},\n"
+            elif event == "LOGOUT":
+                line = f"{ts},LOGOUT,{uid},{email},,,,,,{ts},10.0.0.1,{ACTIVITY_UA},\n"
+            elif event == "PICK_OPTION":
+                picked = "True" if rng.random() < 0.7 else "False"
+                line = f"{ts},PICK_OPTION,{uid},{email},{i},250000.0,PENDING,{picked},,,10.0.0.1,{ACTIVITY_UA},\n"
+            else:
+                line = f"{ts},{event},{uid},{email},{i},250000.0,SUGGESTED,,,,10.0.0.1,{ACTIVITY_UA},\n"
+            lines.append(line)
+            if len(lines) >= 100_000:
+                f.writelines(lines)
+                lines.clear()
+        f.writelines(lines)
+
+
+def seed_applications(app, rows, accounts=1000, seed=0, decided_fraction=0.9, start=None, days=365):
+    """
+    Bulk-insert synthetic accounts and `rows` applications with raw executemany
+    (much faster than the ORM for millions of rows). Returns the account count.
+    """
+    import random
+    from datetime import datetime, timedelta
+    from app import db
+    from app.catalog import get_catalog_snapshot
+    rng = random.Random(seed)
+    start = start or datetime(2024, 1, 1)
+    span = timedelta(days=days).total_seconds()
+    with app.app_context():
+        loan_ids = [o.id for o in get_catalog_snapshot().options]
+        conn = db.engine.raw_connection()
+        try:
+            cur = conn.cursor()
+            base_account = (cur.execute("SELECT COALESCE(MAX(id), 0) FROM accounts").fetchone()[0])
+            cur.executemany(
+                "INSERT INTO accounts (id, name, email, monthly_income, created_at) VALUES (?, ?, ?, ?, ?)",
+                [(base_account + i + 1, f"Seed {i}", f"seed{base_account + i}@example.com", rng.uniform(20000, 200000),
+                  start.isoformat(sep=" ")) for i in range(accounts)])
+            statuses = ("APPROVED", "REJECTED")
+            batch = []
+            for i in range(rows):
+                created = start + timedelta(seconds=span * i / max(1, rows))
+                if rng.random() < decided_fraction:
+                    status = statuses[rng.random() < 0.35]
+                else:
+                    status = ("PENDING", "SUGGESTED")[rng.random() < 0.5]
+                batch.append((base_account + 1 + rng.randrange(accounts), rng.uniform(5000, 3_000_000), rng.choice((12, 24, 36, 60, 120)),
+                              rng.choice(loan_ids), "{}", round(rng.random(), 4), status, created.isoformat(sep=" "),
+                              rng.random() < 0.6))
+                if len(batch) >= 50_000:
+                    cur.executemany(
+                        "INSERT INTO loan_applications (account_id, requested_amount, requested_tenure, selected_loan_id, "
+                        "custom_preferences, score, status, created_at, picked_recommended) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", batch)
+                    batch.clear()
+            if batch:
+                cur.executemany(
+                    "INSERT INTO loan_applications (account_id, requested_amount, requested_tenure, selected_loan_id, "
+                    "custom_preferences, score, status, created_at, picked_recommended) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", batch)
+            conn.commit()
+        finally:
+            conn.close()
+    return accounts
+
+
+def login_client(app, email="bench@example.com", password="pw"):
+    """Test client with a fresh account logged in (needs a low BCRYPT_LOG_ROUNDS to be quick)."""
+    client = app.test_client()
+    client.post("/account/create", data={"name": "Bench", "email": email, "password": password, "monthly_income": "80000"})
+    client.post("/login", data={"email": email, "password": password})
+    return client
@@ -8,8 +8,74 @@ class Config:
     JWT_SECRET = "c2ccbd1fcbc19be676db3104d2bce2e9"
     JWT_ALGORITHM = "HS256"
     JWT_EXPIRES_DELTA = timedelta(hours=4)  # token lifetime
+    TOKEN_CACHE_SIZE = 10000  # verified tokens kept per process
+    TOKEN_CACHE_TTL = 60  # seconds, never beyond the token's exp
+    BCRYPT_LOG_ROUNDS = int(os.environ.get("BCRYPT_LOG_ROUNDS", 12))  # changing it rehashes passwords at next login
+    PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", 4))  # concurrent bcrypt operations per process
+    PASSWORD_HASH_MAX_PENDING = 64  # waiting bcrypt operations before logins get a 503
+    PASSWORD_HASH_EXECUTOR = "thread"  # "thread" (bcrypt releases the GIL) or "process"
+    CREDENTIAL_CACHE_TTL = 300  # seconds a successful password check is remembered; 0 disables
+    CREDENTIAL_CACHE_SIZE = 10000
     SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL", f"sqlite:///{os.path.join(BASE_DIR, 'loan_app.db')}")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    DATABASE_PROFILE = os.environ.get("DATABASE_PROFILE")  # "sqlite" or "server"; detected from the URI when unset
+    SQLALCHEMY_ENGINE_OPTIONS = {}  # merged over the profile's pool settings (see app/database.py)
+    SQLITE_PRAGMAS = None  # None uses app.database.DEFAULT_SQLITE_PRAGMAS; {} disables
+    SWAGGER_ENABLED = os.environ.get("SWAGGER_ENABLED", "1") != "0"  # /apidocs; flasgger adds ~0.3 s to startup
     SWAGGER = {"title": "Loan Approval API", "uiversion": 3}
     DATASET_PATH = os.environ.get("DATASET_PATH", os.path.join(BASE_DIR, "dataset", "loans.csv"))
+    CATALOG_CHECK_INTERVAL = float(os.environ.get("CATALOG_CHECK_INTERVAL", 2.0))  # seconds between dataset stat() checks; <0 disables
+    RECOMMENDATION_CACHE_SIZE = 4096  # cached rankings (or their top, on indexed catalogs), keyed on (amount, tenure, catalog version)
+    RECOMMENDATION_CACHE_TTL = 300  # seconds
+    RECOMMENDATION_LIMIT = None  # options shown per request; None lists the whole catalog
+    RECOMMENDATION_INDEX_MIN_OPTIONS = 256  # catalogs this large answer limited queries from the interval index
+    CUSTOM_OPTIONS_SEED = int(os.environ.get("CUSTOM_OPTIONS_SEED", 0))  # same seed -> same custom suggestions
+    CUSTOM_OPTIONS_MODE = os.environ.get("CUSTOM_OPTIONS_MODE", "random")  # "random" (seeded draws) or "grid" (precomputed lookup)
+    CUSTOM_OPTIONS_GRID_SIZE = 21  # points per axis of the per-option amount/tenure/rate grid
+    CUSTOM_OPTIONS_CACHE_SIZE = 4096
+    CUSTOM_OPTIONS_CACHE_TTL = 3600  # seconds
+    RESPONSE_CACHE_ENABLED = os.environ.get("RESPONSE_CACHE_ENABLED", "1") != "0"  # rendered public pages and the options-table fragment
+    RESPONSE_CACHE_SIZE = 1024  # pages kept per process
+    RESPONSE_CACHE_TTL = 3600  # seconds
+    RESPONSE_CACHE_DIR = os.environ.get("RESPONSE_CACHE_DIR")  # shared on-disk store for all workers; None keeps pages in-process only
+    RESPONSE_CACHE_DIR_MAX_ENTRIES = 10000
+    RESPONSE_CACHE_MAX_AGE = 0  # Cache-Control max-age; 0 makes browsers revalidate with ETag / If-Modified-Since
+    FRAGMENT_CACHE_SIZE = 256
+    JINJA_BYTECODE_CACHE = True  # compiled templates on disk, reused across restarts and workers
+    JINJA_BYTECODE_CACHE_DIR = os.environ.get("JINJA_BYTECODE_CACHE_DIR")  # None: jinja's per-user temp directory
+    ADMIN_EMAILS = [e.strip().lower() for e in os.environ.get("ADMIN_EMAILS", "").split(",") if e.strip()]  # back-office accounts allowed on the admin APIs
+    API_PAGE_DEFAULT_LIMIT = 500  # rows per page for the listing APIs
+    API_PAGE_MAX_LIMIT = 5000
+    BULK_INGEST_CHUNK_SIZE = 5000  # applications per transaction in bulk imports
+    BULK_INGEST_MAX_ERRORS = 1000  # per-row errors listed in an import report
+    ARCHIVE_DATABASE_URL = os.environ.get("ARCHIVE_DATABASE_URL")  # archived applications; None keeps them in the main database
+    ARCHIVE_AFTER_DAYS = int(os.environ.get("ARCHIVE_AFTER_DAYS", 180))  # decided applications older than this are archived
+    ARCHIVE_BATCH_SIZE = 5000  # id window per batch (one transaction); at most this many rows move at once
+    ARCHIVE_BATCH_PAUSE = 0.0  # seconds between batches, so request-path writes get the SQLite lock
+    DECISION_WORKERS = int(os.environ.get("DECISION_WORKERS", 2))  # decision worker threads per process; 0 decides inline
+    DECISION_MAX_ATTEMPTS = 3
+    DECISION_RETRY_DELAY = 1.0  # seconds, doubled per attempt
+    DECISION_POLL_INTERVAL = 1.0  # idle workers re-check the queue at least this often
+    DECISION_JOB_LEASE = 60  # seconds before a RUNNING job of a vanished worker is re-queued
+    DECISION_PAGE_WAIT = 2.0  # seconds the result page waits before showing "pending"
+    DECISION_MAX_WAIT = 30.0  # cap for ?wait= long-polls
+    METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") != "0"  # request/query/span timings, served at METRICS_PATH
+    METRICS_PATH = "/metrics"  # Prometheus text format; None to not expose it
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN")  # scrapers send "Authorization: Bearer <token>"; unset keeps METRICS_PATH closed
+    METRICS_QUEUE_DEPTH_TTL = 5.0  # seconds a scrape reuses the decision job counts instead of re-counting
+    SLOW_REQUEST_MS = float(os.environ["SLOW_REQUEST_MS"]) if os.environ.get("SLOW_REQUEST_MS") else 1000.0  # None disables the slow-request log
+    SERVER_BIND = os.environ.get("SERVER_BIND", "127.0.0.1:8000")  # serve.py listen address
+    SERVER_WORKERS = int(os.environ["SERVER_WORKERS"]) if os.environ.get("SERVER_WORKERS") else None  # None: 2 x CPUs + 1
+    SERVER_THREADS = int(os.environ.get("SERVER_THREADS", 4))  # threads per worker; 1 uses sync workers
+    SERVER_MAX_REQUESTS = int(os.environ.get("SERVER_MAX_REQUESTS", 10000))  # recycle a worker after this many; 0 never
+    SERVER_MAX_REQUESTS_JITTER = 1000  # random extra, so workers do not all restart together
+    SERVER_TIMEOUT = 30  # seconds a silent worker may live before it is killed
+    SERVER_GRACEFUL_TIMEOUT = 30  # seconds to finish in-flight requests on reload/stop
+    SERVER_KEEPALIVE = 5
+    SERVER_PRELOAD = os.environ.get("SERVER_PRELOAD", "1") != "0"  # build the app before forking (copy-on-write)
+    SERVER_WARM_CONNECTIONS = 2  # DB connections each worker opens before taking traffic
     LOG_DIR = os.environ.get("LOG_DIR", os.path.join(BASE_DIR, "logs"))
+    ACTIVITY_LOG_QUEUE_SIZE = 10000  # rows buffered for the background CSV writer
+    ACTIVITY_LOG_BATCH_SIZE = 256  # rows per write
+    ACTIVITY_LOG_FLUSH_INTERVAL = 0.5  # seconds a partial batch may wait
+    ACTIVITY_LOG_OVERFLOW = "block"  # full queue: "block", "inline" or "drop"
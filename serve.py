@@ -0,0 +1,24 @@
+# Production entry point: gunicorn with pre-forked workers, the app preloaded
+# and warmed in the master. `python run.py` remains the development server.
+import argparse
+
+from config import Config
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the loan app with gunicorn (settings default to SERVER_* config)")
+    parser.add_argument("--bind", help="host:port or unix:/path")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--threads", type=int, help="threads per worker; 1 uses sync workers")
+    parser.add_argument("--max-requests", type=int, help="recycle a worker after this many requests; 0 never")
+    parser.add_argument("--no-preload", dest="preload_app", action="store_false", default=None,
+                        help="build the app in every worker instead of once before forking")
+    args = parser.parse_args(argv)
+
+    from app.serving import run_server
+    run_server(Config, bind=args.bind, workers=args.workers, threads=args.threads,
+               max_requests=args.max_requests, preload_app=args.preload_app)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
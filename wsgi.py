@@ -0,0 +1,7 @@
+# WSGI module for running under an external server, e.g.
+#   gunicorn --preload --workers 4 --threads 4 wsgi:app
+from app import create_app
+from app.serving import warm_up
+
+app = create_app()
+warm_up(app)